@@ -0,0 +1,59 @@
+from openweather_pipeline.compaction import RawCompactor
+from openweather_pipeline.config_manager import get_config
+from openweather_pipeline.coverage_index import CoverageIndex
+from openweather_pipeline.s3_operations import S3Operations
+from openweather_pipeline.dynamodb_operations import DynamoDBOperations
+from openweather_pipeline.logger import get_logger
+from datetime import datetime
+from typing import List, Optional, Tuple
+import sys
+
+
+def build_coverage_index(months: Optional[List[Tuple[int, int]]] = None) -> CoverageIndex:
+    config_params = get_config().config
+    logger = get_logger(__name__)
+    source_bucket = config_params.get("s3", {}).get("buckets", {}).get("source_bucket")
+    source_prefix = config_params.get("s3", {}).get("buckets", {}).get("source_prefix")
+    compacted_prefix = config_params.get("s3", {}).get("buckets", {}).get("compacted_prefix")
+    index_key = config_params.get("s3", {}).get(
+        "coverage_index_key", "control/coverage_index.bin.gz"
+    )
+    region = config_params.get("aws", {}).get("region", "us-east-1")
+    control_table_queue: str = (
+        config_params.get("dynamodb", {}).get("tables", {}).get("control_table_queue")
+    )
+    start_dt = datetime.strptime(
+        config_params.get("app", {}).get("weather_start_dt"), "%Y-%m-%d"
+    ).date()
+    end_dt = datetime.strptime(
+        config_params.get("app", {}).get("weather_end_dt"), "%Y-%m-%d"
+    ).date()
+    zipcodes = config_params.get("app", {}).get("zipcodes", [])
+
+    s3Operations = S3Operations(source_bucket, region)
+    dynamodb = DynamoDBOperations(region)
+    try:
+        index = CoverageIndex.load(s3Operations, index_key, start_dt, end_dt)
+        # days whose raw objects were deleted after compaction only remain in the manifest
+        compacted_keys: List[str] = []
+        if compacted_prefix:
+            compactor = RawCompactor(s3Operations, source_prefix, compacted_prefix)
+            compacted_keys = list(compactor.load_manifest().sources)
+        index.update_from_s3(s3Operations, source_prefix, months, compacted_keys)
+        index.update_from_queue(dynamodb, control_table_queue, months)
+        index.save(s3Operations, index_key)
+
+        locations = [(z.get("country_code"), z.get("zip_code")) for z in zipcodes]
+        logger.info(f"Missing days: {int(index.missing(locations).sum())}")
+        logger.info(f"Duplicated days: {int(index.duplicated().sum())}")
+        logger.info(f"Stored but not completed in queue: {int(index.stored_not_completed().sum())}")
+        logger.info(f"Completed in queue but not stored: {int(index.completed_not_stored().sum())}")
+        return index
+    except Exception as e:
+        logger.error(f"Error : {str(e)}", exc_info=True)
+        raise
+
+
+if __name__ == "__main__":
+    # optional YYYY-MM arguments limit the S3 listing and queue query to those months
+    build_coverage_index([(int(arg[:4]), int(arg[5:7])) for arg in sys.argv[1:]] or None)
@@ -0,0 +1,10 @@
+from openweather_pipeline.process_historical_data import DataLoader
+import sys
+
+
+if __name__ == "__main__":
+    # optional YYYY-MM arguments limit compaction to those months
+    months = [(int(arg[:4]), int(arg[5:7])) for arg in sys.argv[1:] if not arg.startswith("--")]
+    DataLoader().compact_raw_objects(
+        months or None, delete_originals="--delete-originals" in sys.argv[1:]
+    )
@@ -1,50 +1,50 @@
-from openweather_pipeline.s3_operations import S3Operations;
+from openweather_pipeline.s3_operations import S3Operations
 from openweather_pipeline.config_manager import get_config
 from openweather_pipeline.logger import get_logger
-from openweather_pipeline.dynamodb_operations import DynamoDBOperations
+from openweather_pipeline.models.dataset_models import RepartitionCheckpoint
+from openweather_pipeline.s3_keys import repartitioned_raw_key
+import sys
 
-def repartition_s3_objects() -> None :
+
+def repartition_s3_objects(
+    delete_source: bool = False, restart: bool = False
+) -> RepartitionCheckpoint:
     config_params = get_config().config
     logger = get_logger(__name__)
-    source_bucket = "weatherdatastore-bucket-11-07-2025-12-20-avar"
+    source_bucket = config_params.get("s3", {}).get("buckets", {}).get("legacy_source_bucket")
     destination_bucket = config_params.get("s3", {}).get("buckets", {}).get("source_bucket")
     source_prefix = config_params.get("s3", {}).get("buckets", {}).get("source_prefix")
     region = config_params.get("aws", {}).get("region", "us-east-1")
-    s3Operations = S3Operations(source_bucket, region)
-    dynamodb= DynamoDBOperations(region)
+    country_code = config_params.get("app", {}).get("ISO3166_code", "US")
+    max_workers = config_params.get("s3", {}).get("copy_max_workers", 32)
+    multipart_threshold = (
+        config_params.get("s3", {}).get("copy_multipart_threshold_mb", 64) * 1024 * 1024
+    )
+    checkpoint_key = config_params.get("s3", {}).get(
+        "repartition_checkpoint_key", "control/repartition_checkpoint.json"
+    )
+    s3Operations = S3Operations(source_bucket, region, max_pool_connections=max(10, max_workers))
     try:
-        s3_object_list = s3Operations.list_all_objects(
-                source_prefix=source_prefix, extension='json'
+        return s3Operations.repartition_objects(
+            source_prefix,
+            lambda key: repartitioned_raw_key(key, country_code),
+            destination_bucket=destination_bucket,
+            checkpoint_key=checkpoint_key,
+            delete_source=delete_source,
+            max_workers=max_workers,
+            multipart_threshold=multipart_threshold,
+            part_size=multipart_threshold,
+            restart=restart,
         )
-
-        for obj in s3_object_list:
-            parts = obj.split("/")
-            year_part, month_part , day_part,zip_code_part = parts[4], parts[5], parts[6],parts[7]
-            country_code_part="US"
-            zip_code= zip_code_part.split("=")[1]
-            file_name = parts[-1]
-            source_s3_key = (
-                f"{source_prefix}/{year_part}/"
-                f"{month_part}/{day_part}/"
-                f"{zip_code_part}/{file_name}"
-                )
-            destination_s3_key = (
-                f"{source_prefix}/{year_part}/"
-                f"{month_part}/{day_part}/"
-                f"country_code={country_code_part}/"
-                f"zip_code={zip_code}/{file_name}"
-                )
-            logger.info(f"source file {source_bucket}/{source_s3_key}")
-            logger.info(f"target file {destination_bucket}/{destination_s3_key}")
-            s3Operations.copy_s3_key(
-                source_bucket_name= source_bucket,
-                source_object_key= source_s3_key,
-                destination_bucket_name= destination_bucket,
-                destination_object_key=destination_s3_key
-                )
-            logger.info(f"Copied {source_bucket}/{source_s3_key} to {destination_bucket}/{destination_s3_key}")
     except Exception as e:
-        logger.error(f"Error repartioning objects in {source_bucket}\{source_prefix}{str(e)}", exc_info=True)
+        logger.error(
+            f"Error repartioning objects in {source_bucket}/{source_prefix} {str(e)}",
+            exc_info=True,
+        )
         raise
-if __name__=="__main__":
-    repartition_s3_objects()
\ No newline at end of file
+
+
+if __name__ == "__main__":
+    repartition_s3_objects(
+        delete_source="--delete-source" in sys.argv[1:], restart="--restart" in sys.argv[1:]
+    )
@@ -1,75 +1,68 @@
 from openweather_pipeline.config_manager import get_config
+from openweather_pipeline.coverage_index import CoverageIndex
 from openweather_pipeline.s3_operations import S3Operations
 from openweather_pipeline.dynamodb_operations import DynamoDBOperations
-from datetime import datetime
+from openweather_pipeline.progress_counters import ShardedProgressCounter
+from openweather_pipeline.reconciliation import QueueReconciler
+from openweather_pipeline.models.collection_models import ReconciliationSummary
 from openweather_pipeline.logger import get_logger
-import json
-from boto3.dynamodb.conditions import Attr
-from botocore.exceptions import ClientError
+from datetime import datetime
+import sys
 
-def update_progress_queue_status() -> None:
+
+def update_progress_queue_status(
+    dry_run: bool = False, use_coverage_index: bool = False
+) -> ReconciliationSummary:
     config_params = get_config().config
     logger = get_logger(__name__)
     source_bucket = config_params.get("s3", {}).get("buckets", {}).get("source_bucket")
     source_prefix = config_params.get("s3", {}).get("buckets", {}).get("source_prefix")
     region = config_params.get("aws", {}).get("region", "us-east-1")
     s3Operations = S3Operations(source_bucket, region)
-    dynamodb= DynamoDBOperations(region)
+    dynamodb = DynamoDBOperations(region)
     control_table_queue: str = (
-    config_params.get("dynamodb", {}).get("tables", {}).get("control_table_queue")
+        config_params.get("dynamodb", {}).get("tables", {}).get("control_table_queue")
     )
     control_table_progress: str = (
-    config_params.get("dynamodb", {}).get("tables", {}).get("control_table_progress")
+        config_params.get("dynamodb", {}).get("tables", {}).get("control_table_progress")
+    )
+    progress_counter = ShardedProgressCounter(
+        dynamodb,
+        control_table_progress,
+        shard_count=config_params.get("dynamodb", {}).get("progress_counter_shards", 10),
     )
-    s3_object_list = s3Operations.list_all_objects(
-            source_prefix=source_prefix, extension='json'
+    reconciler = QueueReconciler(
+        s3Operations,
+        dynamodb,
+        control_table_queue,
+        control_table_progress,
+        progress_counter,
+        scan_segments=config_params.get("dynamodb", {}).get("scan_segments", 4),
+        write_workers=config_params.get("dynamodb", {}).get("write_workers", 4),
+        default_country_code=config_params.get("app", {}).get("ISO3166_code", "US"),
     )
-    logger.info(f"Count of s3 objects in list: {len(s3_object_list)}")
     try:
-        for object in s3_object_list:
-            parts = object.split("/")
-            zip_code_part = parts[7]
-            year_part, month_part , day_part = parts[4], parts[5], parts[6]
-            zip_code = zip_code_part.split("=")[1]
-            year = year_part.split("=")[1]
-            month = month_part.split("=")[1]
-            day = day_part.split("=")[1]
-            item_id = f"{zip_code}#US#{year}-{month}-{day}"
-
-            try:
-                result_query = dynamodb.update_item(
-                table_nm=control_table_queue,
-                key={"item_id": item_id},
-                update_expression="SET #status= :completed, completed_at = :now",
-                condition_expression=Attr('status').eq('pending') & Attr('item_id').exists(),
-                expression_attrib_values={":completed": "completed", ":now": datetime.now().isoformat()},
-                expression_attrib_names={"#status": "status"},
-                )
-
-                result_progress = dynamodb.update_item(
-                table_nm=control_table_progress,
-                key={"job_id": "historical_collection"},
-                update_expression="SET completed_items = completed_items + :inc , \
-                remaining_items = remaining_items - :inc ",
-                expression_attrib_values={":inc": 1},
-                )
-                if result_query and result_progress:
-                    logger.info(
-                        f"Update complete for {item_id} in {control_table_progress} ,{control_table_queue}"
-                    )
-                else:
-                    logger.error(f"Error in updating item  of id: {item_id} in {control_table_queue}")
-                    raise ValueError(f"Error in updating item  of id: {item_id}")
-            except ClientError as e:
-                if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
-                    logger.info(f"Skipping update of item_id :{item_id} as it is in a completed status.")
-                    continue
-                else:
-                    raise
-                
+        coverage_index = None
+        if use_coverage_index:
+            # the index kept current by build_coverage_index.py stands in for a full listing
+            start_dt = datetime.strptime(
+                config_params.get("app", {}).get("weather_start_dt"), "%Y-%m-%d"
+            ).date()
+            end_dt = datetime.strptime(
+                config_params.get("app", {}).get("weather_end_dt"), "%Y-%m-%d"
+            ).date()
+            index_key = config_params.get("s3", {}).get(
+                "coverage_index_key", "control/coverage_index.bin.gz"
+            )
+            coverage_index = CoverageIndex.load(s3Operations, index_key, start_dt, end_dt)
+        return reconciler.reconcile(source_prefix, dry_run=dry_run, coverage_index=coverage_index)
     except Exception as e:
         logger.error(f"Error : {str(e)}", exc_info=True)
         raise
 
-if __name__=="__main__":
-    update_progress_queue_status()
\ No newline at end of file
+
+if __name__ == "__main__":
+    update_progress_queue_status(
+        dry_run="--dry-run" in sys.argv[1:],
+        use_coverage_index="--coverage-index" in sys.argv[1:],
+    )
@@ -0,0 +1,32 @@
+from openweather_pipeline.config_manager import get_config
+from openweather_pipeline.s3_inventory import InventoryDiff, S3Inventory
+from openweather_pipeline.s3_operations import S3Operations
+from openweather_pipeline.logger import get_logger
+
+
+def update_s3_inventory() -> InventoryDiff:
+    config_params = get_config().config
+    logger = get_logger(__name__)
+    source_bucket = config_params.get("s3", {}).get("buckets", {}).get("source_bucket")
+    source_prefix = config_params.get("s3", {}).get("buckets", {}).get("source_prefix")
+    inventory_key = config_params.get("s3", {}).get("inventory_key", "control/inventory.tsv.gz")
+    max_workers = config_params.get("s3", {}).get("list_max_workers", 16)
+    region = config_params.get("aws", {}).get("region", "us-east-1")
+    s3Operations = S3Operations(source_bucket, region, max_pool_connections=max(10, max_workers))
+    try:
+        previous = S3Inventory.load(s3Operations, inventory_key)
+        inventory = S3Inventory.build(s3Operations, source_prefix, max_workers=max_workers)
+        diff = inventory.diff(previous)
+        logger.info(
+            f"Inventory of {len(inventory)} objects: {len(diff.added)} added, "
+            f"{len(diff.changed)} changed, {len(diff.removed)} removed"
+        )
+        inventory.save(s3Operations, inventory_key)
+        return diff
+    except Exception as e:
+        logger.error(f"Error : {str(e)}", exc_info=True)
+        raise
+
+
+if __name__ == "__main__":
+    update_s3_inventory()
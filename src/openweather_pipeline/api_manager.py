@@ -1,35 +1,135 @@
+import time
 import requests
-from typing import Dict, List, Any
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Any, Optional, Tuple, Union
+from openweather_pipeline.json_codec import STDLIB_CODEC, JsonCodec
 from openweather_pipeline.logger import get_logger
+from openweather_pipeline.http_transport import (
+    CircuitBreaker,
+    TransportConfig,
+    backoff_delay,
+    build_session,
+    parse_retry_after,
+)
+from openweather_pipeline.rate_limiter import QuotaExceededError, QuotaLedger, TokenBucket
 
 logger = get_logger(__name__)
 
 
 class APIManager:
-    def __init__(self, header_user_agent: str, header_accept: str) -> None:
+    def __init__(
+        self,
+        header_user_agent: str,
+        header_accept: str,
+        rate_limiter: Optional[TokenBucket] = None,
+        quota_ledger: Optional[QuotaLedger] = None,
+        transport: Optional[TransportConfig] = None,
+        json_codec: Optional[JsonCodec] = None,
+    ) -> None:
         logger.info("Initializing APIManager")
-        self.session = requests.Session()
+        self.transport = transport or TransportConfig()
+        self.session = build_session(self.transport)
         self.session.headers.update({"User-Agent": header_user_agent, "Accept": header_accept})
+        self.rate_limiter = rate_limiter
+        self.quota_ledger = quota_ledger
+        self.circuit_breaker = CircuitBreaker()
+        self.jsonCodec = json_codec or STDLIB_CODEC
 
-    def API_get(self, url: str, params: Dict[str, Any], timeout: int) -> requests.Response:
+    def API_get(
+        self,
+        url: str,
+        params: Dict[str, Any],
+        timeout: Optional[Union[float, Tuple[float, float]]] = None,
+    ) -> requests.Response:
+        if timeout is None:
+            timeout = (self.transport.connect_timeout, self.transport.read_timeout)
+        attempt = 0
+        while True:
+            self._acquire_call()
+            try:
+                logger.info(f"API GET request to url {url}")
+                response = self.session.get(url, params=params, timeout=timeout)
+                logger.info(f"API response status: {response.status_code}")
+                if response.status_code == 401:
+                    self.circuit_breaker.trip(f"API key rejected by {url}", cause="auth")
+                elif response.status_code in self.transport.retry_statuses:
+                    delay = self._retry_delay(response, attempt)
+                    if delay is not None:
+                        logger.warning(
+                            f"API returned {response.status_code}, retry {attempt + 1} "
+                            f"of {self.transport.max_retries} in {delay:.2f}s"
+                        )
+                        time.sleep(delay)
+                        attempt += 1
+                        continue
+                    if response.status_code == 429:
+                        self.circuit_breaker.trip(f"API rate limit or quota exceeded for {url}")
+                response.raise_for_status()
+
+                return response
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                if attempt < self.transport.max_retries:
+                    delay = backoff_delay(self.transport, attempt)
+                    logger.warning(
+                        f"API request failed: {str(e)}, retry {attempt + 1} "
+                        f"of {self.transport.max_retries} in {delay:.2f}s"
+                    )
+                    time.sleep(delay)
+                    attempt += 1
+                    continue
+                logger.error(f"API request failed: {str(e)}", exc_info=True)
+                raise
+            except requests.exceptions.RequestException as e:
+                logger.error(f"API request failed: {str(e)}", exc_info=True)
+                raise
+
+    def _acquire_call(self) -> None:
+        self.circuit_breaker.check()
+        if self.quota_ledger:
+            try:
+                self.quota_ledger.reserve()
+            except QuotaExceededError as e:
+                self.circuit_breaker.trip(str(e))
+                raise
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+
+    def _retry_delay(self, response: requests.Response, attempt: int) -> Optional[float]:
+        if attempt >= self.transport.max_retries:
+            return None
+        retry_after = None
+        if response.status_code in (429, 503):
+            retry_after = parse_retry_after(response)
+        if retry_after is None:
+            return backoff_delay(self.transport, attempt)
+        if retry_after > self.transport.retry_after_max_seconds:
+            logger.warning(f"Retry-After of {retry_after:.0f}s exceeds the configured maximum")
+            return None
+        return retry_after
+
+    def release_quota(self) -> None:
+        if self.quota_ledger:
+            self.quota_ledger.release()
+
+    @contextmanager
+    def quota_blocks(self, block_size: int) -> Iterator[None]:
+        # reserves calls in blocks of block_size while active, e.g. one at a time for a
+        # single item, and releases whatever is left unused on exit
+        if self.quota_ledger is None:
+            yield
+            return
+        default_block_size = self.quota_ledger.block_size
+        self.quota_ledger.block_size = max(1, block_size)
         try:
-            logger.info(f"API GET request to url {url}")
-            response = self.session.get(url, params=params, timeout=timeout)
-            logger.info(f"API response status: {response.status_code}")
-            response.raise_for_status()
-
-            return response
-        except requests.exceptions.Timeout as e:
-            logger.error(f"API request failed: {str(e)}", exc_info=True)
-            raise
-        except requests.exceptions.RequestException as e:
-            logger.error(f"API request failed: {str(e)}", exc_info=True)
-            raise
+            yield
+        finally:
+            self.quota_ledger.block_size = default_block_size
+            self.quota_ledger.release()
 
     def API_parse_json(self, response: requests.Response, keys: List[str] = []) -> Dict[str, Any]:
         try:
             logger.info("Parsing API response as JSON")
-            response_json = response.json()
+            response_json = self.jsonCodec.loads(response.content)
             if not isinstance(response_json, dict):
                 raise ValueError(f"Expected JSON object, got {type(response_json)}")
 
@@ -0,0 +1,243 @@
+import gzip
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+from openweather_pipeline.logger import get_logger
+from openweather_pipeline.models.dataset_models import CompactedSource, CompactionManifest
+from openweather_pipeline.payload_encoding import decode_payload, encode_payload
+from openweather_pipeline.s3_keys import parse_partition_values
+from openweather_pipeline.s3_operations import S3ObjectInfo, S3Operations
+
+logger = get_logger(__name__)
+
+MANIFEST_FILE_NAME = "_manifest.json.gz"
+
+# year, month, country_code, zip_code
+MonthGroup = Tuple[str, str, str, str]
+
+
+def month_group(key: str, default_country_code: str = "US") -> Optional[MonthGroup]:
+    values = parse_partition_values(key)
+    if not {"year", "month", "zip_code"} <= values.keys():
+        return None
+    country_code = values.get("country_code", default_country_code)
+    return values["year"], values["month"], country_code, values["zip_code"]
+
+
+def parse_compacted_file(
+    content: bytes, loads: Callable[[bytes], Any] = json.loads
+) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+    # one {"key", "etag", "data"} record per line
+    for line in decode_payload(content).splitlines():
+        if line:
+            record = loads(line)
+            yield record["key"], record["etag"], record["data"]
+
+
+# Merges the daily raw objects of each zip code and month into one NDJSON file under
+# compacted_prefix/year=/month=/country_code=/zip_code=, and keeps a manifest of the raw
+# key and ETag every record came from. Readers take a record from its compacted file
+# while the raw ETag still matches, so a month of one zip costs one GET instead of ~30.
+class RawCompactor:
+    def __init__(
+        self,
+        s3Operations: S3Operations,
+        source_prefix: str,
+        compacted_prefix: str,
+        max_workers: int = 16,
+        content_encoding: str = "gzip",
+        default_country_code: str = "US",
+    ) -> None:
+        self.s3Operations = s3Operations
+        self.source_prefix = source_prefix.rstrip("/")
+        self.compacted_prefix = compacted_prefix.rstrip("/")
+        self.manifest_key = f"{self.compacted_prefix}/{MANIFEST_FILE_NAME}"
+        self.max_workers = max_workers
+        self.content_encoding = content_encoding
+        self.default_country_code = default_country_code
+
+    def load_manifest(self) -> CompactionManifest:
+        if not self.s3Operations.object_exists(self.manifest_key):
+            logger.info(f"No compaction manifest found at {self.manifest_key}")
+            return CompactionManifest()
+        content = decode_payload(self.s3Operations.read_file_as_bytes(self.manifest_key))
+        return CompactionManifest.model_validate_json(content)
+
+    def save_manifest(self, manifest: CompactionManifest) -> None:
+        manifest.updated_at = datetime.now().isoformat()
+        self.s3Operations.put_bytes(
+            self.manifest_key,
+            gzip.compress(manifest.model_dump_json().encode("utf-8")),
+            content_type="application/json",
+            content_encoding="gzip",
+        )
+
+    def compacted_key(self, group: MonthGroup) -> str:
+        year, month, country_code, zip_code = group
+        return (
+            f"{self.compacted_prefix}/year={year}/month={month}/"
+            f"country_code={country_code}/zip_code={zip_code}/"
+            f"{country_code}_{zip_code}_{year}-{month}.ndjson"
+        )
+
+    def compact(
+        self, months: Optional[Iterable[Tuple[int, int]]] = None, delete_originals: bool = False
+    ) -> int:
+        manifest = self.load_manifest()
+        if months is None:
+            listings = [(self.source_prefix, 2)]
+        else:
+            listings = [(f"{self.source_prefix}/year={y}/month={m:02d}", 1) for y, m in months]
+        groups: Dict[MonthGroup, List[S3ObjectInfo]] = {}
+        for prefix, depth in listings:
+            for obj in self.s3Operations.iter_objects_parallel(
+                prefix, "json", self.max_workers, depth=depth
+            ):
+                group = month_group(obj.key, self.default_country_code)
+                if group is not None:
+                    groups.setdefault(group, []).append(obj)
+
+        # a group is rewritten when any of its raw objects is new or changed since compaction
+        stale = sorted(
+            (group, objects)
+            for group, objects in groups.items()
+            if any(not self._is_covered(manifest, obj) for obj in objects)
+        )
+        logger.info(f"Compacting {len(stale)} of {len(groups)} zip code months")
+        if stale:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                results = list(
+                    executor.map(
+                        lambda item: self._compact_group(item[0], item[1], manifest), stale
+                    )
+                )
+            for file_key, sources in results:
+                for key, etag in sources.items():
+                    manifest.sources[key] = CompactedSource(etag=etag, file=file_key)
+                if file_key not in manifest.files:
+                    manifest.files.append(file_key)
+            self.save_manifest(manifest)
+
+        if delete_originals:
+            # readers go through the manifest (available_etags) to see deleted originals, but
+            # a queue reconciliation without a coverage index still lists raw objects only,
+            # so originals are only removed on request and only once their copy is recorded
+            covered = [
+                obj.key
+                for objects in groups.values()
+                for obj in objects
+                if self._is_covered(manifest, obj)
+            ]
+            self.s3Operations.delete_objects(covered)
+        return len(stale)
+
+    def available_etags(
+        self, source_prefix: str, manifest: Optional[CompactionManifest] = None
+    ) -> Dict[str, str]:
+        # raw key -> ETag of every raw record available, whether as an object or only in a
+        # compacted file; a listed object wins since it may have been overwritten since
+        manifest = manifest if manifest is not None else self.load_manifest()
+        available = {key: source.etag for key, source in manifest.sources.items()}
+        available.update(
+            {
+                obj.key: obj.etag
+                for obj in self.s3Operations.iter_objects_parallel(
+                    source_prefix, "json", self.max_workers
+                )
+            }
+        )
+        return available
+
+    def iter_payloads(
+        self,
+        keys: Iterable[str],
+        etags: Mapping[str, str],
+        manifest: Optional[CompactionManifest] = None,
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        # Yields (raw key, payload) in the order of keys. Consecutive keys held by the same
+        # compacted file at their expected ETag share one GET of that file; any other key
+        # is read from its raw object.
+        manifest = manifest if manifest is not None else self.load_manifest()
+        units: List[Tuple[str, bool, List[str]]] = []
+        for key in keys:
+            source = manifest.sources.get(key)
+            if source is None or source.etag != etags.get(key, source.etag):
+                units.append((key, False, [key]))
+            elif units and units[-1][1] and units[-1][0] == source.file:
+                units[-1][2].append(key)
+            else:
+                units.append((source.file, True, [key]))
+
+        fetched = self.s3Operations.fetch_objects((unit[0] for unit in units), self.max_workers)
+        for (source_key, compacted, served), (_, content) in zip(units, fetched):
+            if not compacted:
+                yield served[0], self.s3Operations.jsonCodec.loads(decode_payload(content))
+                continue
+            records = {
+                key: (etag, data)
+                for key, etag, data in parse_compacted_file(
+                    content, self.s3Operations.jsonCodec.loads
+                )
+            }
+            for key in served:
+                record = records.get(key)
+                if record is not None:
+                    # an ETag other than the manifest's means the file was rewritten since the
+                    # manifest was read, with a newer copy of the same raw object
+                    yield key, record[1]
+                    continue
+                raw = self._read_raw(key)
+                if raw is None:
+                    logger.warning(f"{key} is neither in {source_key} nor in S3, skipping")
+                    continue
+                yield key, raw
+
+    def _read_raw(self, key: str) -> Optional[Dict[str, Any]]:
+        # raw objects can be gone once delete_originals has run
+        if not self.s3Operations.object_exists(key):
+            return None
+        content = self.s3Operations.read_file_as_bytes(key)
+        data: Dict[str, Any] = self.s3Operations.jsonCodec.loads(decode_payload(content))
+        return data
+
+    def _is_covered(self, manifest: CompactionManifest, obj: S3ObjectInfo) -> bool:
+        source = manifest.sources.get(obj.key)
+        return source is not None and source.etag == obj.etag
+
+    def _compact_group(
+        self, group: MonthGroup, objects: List[S3ObjectInfo], manifest: CompactionManifest
+    ) -> Tuple[str, Dict[str, str]]:
+        file_key = self.compacted_key(group)
+        records: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        if file_key in manifest.files:
+            # keeps records whose originals were deleted after an earlier compaction
+            content = self.s3Operations.read_file_as_bytes(file_key)
+            records = {
+                key: (etag, data)
+                for key, etag, data in parse_compacted_file(
+                    content, self.s3Operations.jsonCodec.loads
+                )
+            }
+        for obj in objects:
+            if obj.key not in records or records[obj.key][0] != obj.etag:
+                data = self._read_raw(obj.key)
+                if data is None:
+                    # deleted by another compaction since it was listed, which recorded it
+                    # in its own copy of the file
+                    logger.warning(f"{obj.key} was deleted since it was listed, skipping")
+                    continue
+                records[obj.key] = (obj.etag, data)
+
+        lines = [
+            self.s3Operations.jsonCodec.dumps({"key": key, "etag": etag, "data": data})
+            for key, (etag, data) in sorted(records.items())
+        ]
+        body = encode_payload(b"\n".join(lines) + b"\n", self.content_encoding)
+        self.s3Operations.put_bytes(
+            file_key,
+            body,
+            content_type="application/x-ndjson",
+            content_encoding=None if self.content_encoding == "identity" else self.content_encoding,
+        )
+        return file_key, {key: etag for key, (etag, _) in records.items()}
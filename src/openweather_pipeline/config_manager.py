@@ -30,6 +30,10 @@ class ConfigManager:
             self._api_key = self._get_api_key()
         return self._api_key
 
+    def invalidate_api_key(self) -> None:
+        self._api_key = None
+        self.ssm = boto3.client("ssm")
+
     def _get_api_key(self) -> str:
         response = self.ssm.get_parameter(Name="Openweatherapi_key", WithDecryption=True)
         api_key = response["Parameter"]["Value"]
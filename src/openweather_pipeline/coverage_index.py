@@ -0,0 +1,285 @@
+import gzip
+import json
+from datetime import date, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import numpy as np
+from openweather_pipeline.dynamodb_operations import DynamoDBOperations
+from openweather_pipeline.logger import get_logger
+from openweather_pipeline.models.collection_models import QueueItemKey
+from openweather_pipeline.s3_keys import parse_partition_values
+from openweather_pipeline.s3_operations import S3Operations
+
+logger = get_logger(__name__)
+
+Location = Tuple[str, str]
+# stored: a raw object exists, duplicated: more than one raw object exists for the day,
+# completed: the queue item is completed
+LAYERS = ("stored", "duplicated", "completed")
+
+
+# Which (zip_code, date) pairs are collected, as one row of day bits per location over
+# weather_start_dt..weather_end_dt. Observations from S3 listings and queue scans are
+# OR'ed in, so the index is refreshed incrementally and gap questions become array
+# operations instead of listings.
+class CoverageIndex:
+    def __init__(self, start_dt: date, end_dt: date) -> None:
+        if end_dt < start_dt:
+            raise ValueError(f"end_dt {end_dt} is before start_dt {start_dt}")
+        self.start_dt = start_dt
+        self.end_dt = end_dt
+        self.num_days = (end_dt - start_dt).days + 1
+        self.locations: List[Location] = []
+        self._rows: Dict[Location, int] = {}
+        self.layers: Dict[str, np.ndarray] = {
+            layer: np.zeros((0, self.num_days), dtype=bool) for layer in LAYERS
+        }
+
+    def add_location(self, country_code: str, zip_code: str) -> int:
+        location = (country_code, zip_code)
+        if location not in self._rows:
+            self.add_locations([location])
+        return self._rows[location]
+
+    def add_locations(self, locations: Iterable[Location]) -> None:
+        new = [location for location in dict.fromkeys(locations) if location not in self._rows]
+        if not new:
+            return
+        for location in new:
+            self._rows[location] = len(self.locations)
+            self.locations.append(location)
+        for layer, bits in self.layers.items():
+            self.layers[layer] = np.vstack([bits, np.zeros((len(new), self.num_days), dtype=bool)])
+
+    def day_index(self, day: str) -> Optional[int]:
+        offset = (date.fromisoformat(day) - self.start_dt).days
+        return offset if 0 <= offset < self.num_days else None
+
+    def mark(self, layer: str, country_code: str, zip_code: str, day: str) -> bool:
+        column = self.day_index(day)
+        if column is None:
+            return False
+        # the row is added first, since adding a location replaces the layer arrays
+        row = self.add_location(country_code, zip_code)
+        self.layers[layer][row, column] = True
+        return True
+
+    def update_from_keys(self, keys: Iterable[str], default_country_code: str = "US") -> int:
+        observed: List[Tuple[Location, int]] = []
+        for key in keys:
+            values = parse_partition_values(key)
+            if not {"year", "month", "day", "zip_code"} <= values.keys():
+                continue
+            column = self.day_index(f"{values['year']}-{values['month']}-{values['day']}")
+            if column is None:
+                continue
+            location = (values.get("country_code", default_country_code), values["zip_code"])
+            observed.append((location, column))
+        self.add_locations(location for location, _ in observed)
+        if observed:
+            rows = np.array([self._rows[location] for location, _ in observed])
+            columns = np.array([column for _, column in observed])
+            self.layers["stored"][rows, columns] = True
+            # within one listing a second key for the same day is a duplicate
+            cells = rows * self.num_days + columns
+            unique_cells, counts = np.unique(cells, return_counts=True)
+            duplicates = unique_cells[counts > 1]
+            self.layers["duplicated"][
+                duplicates // self.num_days, duplicates % self.num_days
+            ] = True
+        logger.info(f"Marked {len(observed)} stored objects in coverage index")
+        return len(observed)
+
+    def update_from_s3(
+        self,
+        s3Operations: S3Operations,
+        source_prefix: str,
+        months: Optional[Iterable[Tuple[int, int]]] = None,
+        compacted_keys: Iterable[str] = (),
+    ) -> int:
+        # a listing is authoritative for its prefix, so the days it covers are cleared first
+        # and an incremental refresh only lists the year=/month= prefixes it is given.
+        # compacted_keys are the raw keys of the compaction manifest, whose objects may have
+        # been deleted since
+        if months is None:
+            self._clear_stored(0, self.num_days)
+            prefixes = [source_prefix]
+        else:
+            prefixes = []
+            for year, month in months:
+                self._clear_stored(*self._month_columns(year, month))
+                prefixes.append(f"{source_prefix}/year={year}/month={month:02d}")
+        # a month prefix fans out over its day= prefixes instead of year=/month=
+        depth = 2 if months is None else 1
+        compacted = sorted(compacted_keys)
+        marked = 0
+        for prefix in prefixes:
+            keys = {
+                obj.key for obj in s3Operations.iter_objects_parallel(prefix, "json", depth=depth)
+            }
+            keys.update(key for key in compacted if key.startswith(f"{prefix}/"))
+            marked += self.update_from_keys(sorted(keys))
+        return marked
+
+    def _month_columns(self, year: int, month: int) -> Tuple[int, int]:
+        first = date(year, month, 1)
+        following = date(year + month // 12, month % 12 + 1, 1)
+        return (
+            max(0, (first - self.start_dt).days),
+            min(self.num_days, (following - self.start_dt).days),
+        )
+
+    def _clear_stored(self, start: int, end: int) -> None:
+        if start < end:
+            self.layers["stored"][:, start:end] = False
+            self.layers["duplicated"][:, start:end] = False
+
+    def update_from_item_ids(self, item_ids: Iterable[str]) -> int:
+        marked = 0
+        for item_id in item_ids:
+            zip_code, country_code, day = item_id.split("#")
+            if self.mark("completed", country_code, zip_code, day):
+                marked += 1
+        logger.info(f"Marked {marked} completed queue items in coverage index")
+        return marked
+
+    def update_from_queue(
+        self,
+        dynamodb: DynamoDBOperations,
+        control_table_queue: str,
+        months: Optional[Iterable[Tuple[int, int]]] = None,
+    ) -> int:
+        # like a listing, the completed items read from the status index replace the completed
+        # layer for the days they cover, and an incremental refresh only queries the date
+        # range of the months it is given
+        if months is None:
+            ranges = [(0, self.num_days)]
+        else:
+            ranges = [self._month_columns(year, month) for year, month in months]
+        marked = 0
+        for start, end in ranges:
+            if start >= end:
+                continue
+            self.layers["completed"][:, start:end] = False
+            first = (self.start_dt + timedelta(days=start)).isoformat()
+            last = (self.start_dt + timedelta(days=end - 1)).isoformat()
+            marked += self.update_from_item_ids(
+                key.item_id
+                for key in dynamodb.iter_query(
+                    QueueItemKey,
+                    control_table_queue,
+                    "#status = :completed AND #date BETWEEN :first AND :last",
+                    {"#status": "status", "#date": "date"},
+                    {":completed": "completed", ":first": first, ":last": last},
+                    index_name="status-date-index",
+                    validation="trusted",
+                    ProjectionExpression="item_id, #status",
+                )
+            )
+        return marked
+
+    def stored_item_ids(self) -> Set[str]:
+        # queue item ids (zip#country#date) of the days with a stored raw object
+        return {
+            f"{zip_code}#{country_code}#{day}"
+            for country_code, zip_code, day in self.pairs(self.layers["stored"])
+        }
+
+    def expected(self, locations: Optional[Iterable[Location]] = None) -> np.ndarray:
+        if locations is None:
+            return np.ones((len(self.locations), self.num_days), dtype=bool)
+        rows = [self.add_location(country_code, zip_code) for country_code, zip_code in locations]
+        mask = np.zeros((len(self.locations), self.num_days), dtype=bool)
+        mask[rows, :] = True
+        return mask
+
+    def missing(self, locations: Optional[Iterable[Location]] = None) -> np.ndarray:
+        mask: np.ndarray = np.logical_and(
+            self.expected(locations), np.logical_not(self.layers["stored"])
+        )
+        return mask
+
+    def completed(self) -> np.ndarray:
+        mask: np.ndarray = np.logical_and(self.layers["completed"], self.layers["stored"])
+        return mask
+
+    def duplicated(self) -> np.ndarray:
+        return self.layers["duplicated"].copy()
+
+    def stored_not_completed(self) -> np.ndarray:
+        mask: np.ndarray = np.logical_and(
+            self.layers["stored"], np.logical_not(self.layers["completed"])
+        )
+        return mask
+
+    def completed_not_stored(self) -> np.ndarray:
+        mask: np.ndarray = np.logical_and(
+            self.layers["completed"], np.logical_not(self.layers["stored"])
+        )
+        return mask
+
+    def pairs(self, mask: np.ndarray) -> Iterator[Tuple[str, str, str]]:
+        rows, columns = np.nonzero(mask)
+        for row, column in zip(rows.tolist(), columns.tolist()):
+            country_code, zip_code = self.locations[row]
+            day = (self.start_dt + timedelta(days=column)).isoformat()
+            yield country_code, zip_code, day
+
+    def to_bytes(self) -> bytes:
+        # a json header line followed by the bit packed rows of every layer, gzipped
+        header = {
+            "start_dt": self.start_dt.isoformat(),
+            "end_dt": self.end_dt.isoformat(),
+            "locations": self.locations,
+            "layers": list(LAYERS),
+        }
+        body = b"".join(np.packbits(self.layers[layer], axis=1).tobytes() for layer in LAYERS)
+        return gzip.compress(json.dumps(header).encode("utf-8") + b"\n" + body)
+
+    @classmethod
+    def from_bytes(
+        cls, content: bytes, start_dt: Optional[date] = None, end_dt: Optional[date] = None
+    ) -> "CoverageIndex":
+        header_line, _, body = gzip.decompress(content).partition(b"\n")
+        header = json.loads(header_line.decode("utf-8"))
+        stored_start = date.fromisoformat(header["start_dt"])
+        stored_end = date.fromisoformat(header["end_dt"])
+        num_days = (stored_end - stored_start).days + 1
+        index = cls(start_dt or stored_start, end_dt or stored_end)
+        index.add_locations(
+            (country_code, zip_code) for country_code, zip_code in header["locations"]
+        )
+
+        # a changed date range keeps the bits of the overlapping days
+        offset = (stored_start - index.start_dt).days
+        source_start = max(0, -offset)
+        source_end = min(num_days, index.num_days - offset)
+        rows = len(header["locations"])
+        layer_size = rows * ((num_days + 7) // 8)
+        for position, layer in enumerate(header["layers"]):
+            if layer not in index.layers or source_start >= source_end or rows == 0:
+                continue
+            packed = np.frombuffer(
+                body, dtype=np.uint8, count=layer_size, offset=position * layer_size
+            ).reshape(rows, -1)
+            bits = np.unpackbits(packed, axis=1, count=num_days).astype(bool)
+            target_start = source_start + offset
+            target_end = source_end + offset
+            index.layers[layer][:, target_start:target_end] = bits[:, source_start:source_end]
+        return index
+
+    def save(self, s3Operations: S3Operations, key: str) -> None:
+        content = self.to_bytes()
+        s3Operations.put_bytes(key, content, content_type="application/octet-stream")
+        logger.info(
+            f"Saved coverage index of {len(self.locations)} locations x {self.num_days} days "
+            f"({len(content)} bytes) to {key}"
+        )
+
+    @classmethod
+    def load(
+        cls, s3Operations: S3Operations, key: str, start_dt: date, end_dt: date
+    ) -> "CoverageIndex":
+        if not s3Operations.object_exists(key):
+            logger.info(f"No coverage index found at {key}, starting a new one")
+            return cls(start_dt, end_dt)
+        return cls.from_bytes(s3Operations.read_file_as_bytes(key), start_dt, end_dt)
@@ -1,13 +1,80 @@
 from openweather_pipeline.logger import get_logger
 from openweather_pipeline.config_manager import get_config
-from typing import Dict, Type, TypeVar, Optional, List, Any
+from typing import Dict, Type, TypeVar, Optional, List, Any, NamedTuple, Iterator, Literal
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import boto3
-from boto3.dynamodb.conditions import ConditionBase
-from pydantic import BaseModel, ValidationError
+from boto3.dynamodb.conditions import Attr, ConditionBase, ConditionExpressionBuilder
+from botocore.exceptions import ClientError
+from functools import lru_cache
+from pydantic import BaseModel, TypeAdapter, ValidationError
 
 logger = get_logger(__name__)
 T = TypeVar("T", bound=BaseModel)
 
+# TransactWriteItems accepts at most 100 actions per request
+TRANSACT_MAX_ITEMS = 100
+# cancellation reasons worth resubmitting, anything else is reported back to the caller
+TRANSIENT_CANCELLATION_CODES = {
+    "TransactionConflict",
+    "ThrottlingError",
+    "ProvisionedThroughputExceeded",
+}
+
+# strict validates item by item and skips rows that fail, trusted validates a whole page
+# in one call for data this pipeline wrote itself, and raw hands back the item dicts
+ValidationMode = Literal["strict", "trusted", "raw"]
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model_class: Type[BaseModel]) -> "TypeAdapter[List[Any]]":
+    return TypeAdapter(List[model_class])  # type: ignore[valid-type]
+
+
+def serialize_items(items: List[T]) -> List[Dict[str, Any]]:
+    # a single serializer call per model class instead of one dict() per item; unset
+    # attributes are left out rather than written as NULL, which DynamoDB rejects for
+    # index keys such as next_attempt_at and which keeps sparse indexes sparse
+    if not items:
+        return []
+    item_dicts: List[Dict[str, Any]] = _list_adapter(type(items[0])).dump_python(
+        items, exclude_none=True
+    )
+    return item_dicts
+
+
+def validate_items(
+    model_class: Type[T], items: List[Dict[str, Any]], validation: ValidationMode = "strict"
+) -> List[Any]:
+    if validation == "raw":
+        return items
+    if validation == "trusted":
+        # model_construct would skip validation but is slower than one batched call and
+        # leaves DynamoDB's Decimal numbers uncoerced
+        try:
+            return _list_adapter(model_class).validate_python(items)
+        except ValidationError:
+            # one malformed row must not fail the whole page, so the page is validated again
+            # row by row and the invalid rows are skipped as in strict mode
+            logger.warning(f"Trusted validation of {len(items)} items failed, validating per item")
+    validated = []
+    for item in items:
+        try:
+            validated.append(model_class(**item))
+        except ValidationError as e:
+            logger.warning(f"Skipping invalid item,{e}")
+    return validated
+
+
+class ItemUpdate(NamedTuple):
+    key: Dict[str, Any]
+    update_expression: str
+    expression_attrib_values: Dict[str, Any]
+    condition_expression: Optional[ConditionBase] = None
+    expression_attrib_names: Optional[Dict[str, str]] = None
+
 
 class DynamoDBOperations:
 
@@ -15,22 +82,122 @@ class DynamoDBOperations:
         try:
             logger.info("Starting dynamodb initialization")
             self.config = get_config().config
-            self.dynamodb = boto3.resource("dynamodb", region_name=region)
+            self.region = region
+            # boto3 resources are not thread safe, so each worker thread gets its own
+            self._local = threading.local()
+            self._resource_lock = threading.Lock()
         except Exception as e:
             logger.error(f" Exception when initializing dynamodb {e}", exc_info=True)
 
-    def get_item(self, model_class: Type[T], table_nm: str, key: Dict[str, str]) -> Optional[T]:
+    @property
+    def dynamodb(self) -> Any:
+        resource = getattr(self._local, "resource", None)
+        if resource is None:
+            with self._resource_lock:
+                resource = boto3.resource("dynamodb", region_name=self.region)
+            self._local.resource = resource
+        return resource
+
+    def get_item(
+        self,
+        model_class: Type[T],
+        table_nm: str,
+        key: Dict[str, str],
+        validation: ValidationMode = "strict",
+    ) -> Optional[T]:
         try:
             table = self.dynamodb.Table(table_nm)
             response = table.get_item(Key=key)
             if "Item" not in response:
                 return None
-            item = model_class(**response["Item"])
+            if validation == "strict":
+                return model_class(**response["Item"])
+            item: T = validate_items(model_class, [response["Item"]], validation)[0]
             return item
         except Exception as e:
             logger.error(f"Error getting item {key} from {table_nm},{e}", exc_info=True)
             raise
 
+    def batch_get_items(
+        self,
+        model_class: Type[T],
+        table_nm: str,
+        keys: List[Dict[str, Any]],
+        validation: ValidationMode = "strict",
+    ) -> List[T]:
+        items: List[T] = []
+        try:
+            # batch_get_item accepts at most 100 keys per request
+            for start in range(0, len(keys), 100):
+                end = start + 100
+                request_items: Dict[str, Any] = {table_nm: {"Keys": keys[start:end]}}
+                attempt = 0
+                while request_items:
+                    response = self.dynamodb.batch_get_item(RequestItems=request_items)
+                    items.extend(
+                        validate_items(
+                            model_class, response.get("Responses", {}).get(table_nm, []), validation
+                        )
+                    )
+                    request_items = response.get("UnprocessedKeys") or {}
+                    if request_items:
+                        attempt += 1
+                        time.sleep(min(0.05 * 2**attempt, 2.0))
+            logger.info(f"Retrieved {len(items)} of {len(keys)} keys from {table_nm}")
+            return items
+        except Exception as e:
+            logger.error(f"Error batch getting {len(keys)} keys from {table_nm},{e}", exc_info=True)
+            raise
+
+    def iter_query(
+        self,
+        model_class: Type[T],
+        table_nm: str,
+        key_condition_expression: Any,
+        expression_attrib_names: Optional[Dict[str, str]] = None,
+        expression_attrib_values: Optional[Dict[str, Any]] = None,
+        index_name: Optional[str] = None,
+        limit: Optional[int] = None,
+        page_size: Optional[int] = None,
+        validation: ValidationMode = "strict",
+        **kwargs: Any,
+    ) -> Iterator[T]:
+        params: Dict[str, Any] = {"KeyConditionExpression": key_condition_expression, **kwargs}
+        if index_name:
+            params["IndexName"] = index_name
+        if expression_attrib_names:
+            params["ExpressionAttributeNames"] = expression_attrib_names
+        if expression_attrib_values:
+            params["ExpressionAttributeValues"] = expression_attrib_values
+        yielded = 0
+        try:
+            table = self.dynamodb.Table(table_nm)
+            while True:
+                # a page stops at 1 MB regardless of Limit, so keep following LastEvaluatedKey
+                page_limit = page_size
+                if limit is not None:
+                    if limit - yielded <= 0:
+                        # Limit=0 is not a valid request, and leaving it out reads a full page
+                        break
+                    page_limit = min(page_size or limit, limit - yielded)
+                if page_limit:
+                    params["Limit"] = page_limit
+                response = table.query(**params)
+                for item in validate_items(model_class, response.get("Items", []), validation):
+                    yield item
+                    yielded += 1
+                last_key = response.get("LastEvaluatedKey")
+                if not last_key or (limit is not None and yielded >= limit):
+                    break
+                params["ExclusiveStartKey"] = last_key
+            logger.info(f"Queried {yielded} items from {table_nm}")
+        except Exception as e:
+            logger.error(
+                f"Error querying {key_condition_expression} from dynamodb {table_nm},{e}",
+                exc_info=True,
+            )
+            raise
+
     def query_table_all_fields(
         self,
         model_class: Type[T],
@@ -40,42 +207,143 @@ class DynamoDBOperations:
         expression_attrib_names: Dict[str, str],
         expression_attrib_values: Dict[str, str],
         limit_rows: int,
+        validation: ValidationMode = "strict",
         **kwargs: Any,
     ) -> Optional[List[T]]:
-        try:
-            table = self.dynamodb.Table(table_nm)
-            response = table.query(
-                IndexName=index_name,
-                KeyConditionExpression=key_condition_expression,
-                ExpressionAttributeNames=expression_attrib_names,
-                ExpressionAttributeValues=expression_attrib_values,
-                Limit=limit_rows,
+        return list(
+            self.iter_query(
+                model_class,
+                table_nm,
+                key_condition_expression,
+                expression_attrib_names,
+                expression_attrib_values,
+                index_name=index_name,
+                limit=limit_rows,
+                validation=validation,
                 **kwargs,
             )
-            items = []
-            if "Items" not in response:
-                return None
-            for item in response.get("Items", []):
+        )
+
+    def iter_scan(
+        self,
+        model_class: Type[T],
+        table_nm: str,
+        segment: Optional[int] = None,
+        total_segments: Optional[int] = None,
+        page_size: Optional[int] = None,
+        validation: ValidationMode = "strict",
+        **kwargs: Any,
+    ) -> Iterator[T]:
+        for page in self._scan_pages(table_nm, segment, total_segments, page_size, **kwargs):
+            yield from validate_items(model_class, page, validation)
+
+    def parallel_scan(
+        self,
+        model_class: Type[T],
+        table_nm: str,
+        total_segments: int,
+        page_size: Optional[int] = None,
+        validation: ValidationMode = "strict",
+        **kwargs: Any,
+    ) -> Iterator[T]:
+        # each segment is scanned on its own thread; pages are handed back through a bounded
+        # queue so the caller consumes items while the other segments are still being read
+        total_segments = max(1, total_segments)
+        pages: "queue.Queue[Any]" = queue.Queue(maxsize=total_segments * 2)
+        stop = threading.Event()
+        segment_done = object()
+
+        def put(page: Any) -> bool:
+            while not stop.is_set():
                 try:
-                    items.append(model_class(**item))
-                except ValidationError as e:
-                    logger.warning(f"Skipping invalid item,{e}")
+                    pages.put(page, timeout=0.5)
+                    return True
+                except queue.Full:
                     continue
-            logger.info(f"Retrieved {len(items)} items from {table}")
-            return items
+            return False
+
+        def scan_segment(segment: int) -> None:
+            try:
+                for page in self._scan_pages(
+                    table_nm, segment, total_segments, page_size, **kwargs
+                ):
+                    if not put(page):
+                        return
+            except Exception as e:
+                put(e)
+            finally:
+                put(segment_done)
+
+        count = 0
+        with ThreadPoolExecutor(max_workers=total_segments) as executor:
+            try:
+                for segment in range(total_segments):
+                    executor.submit(scan_segment, segment)
+                remaining = total_segments
+                while remaining:
+                    page = pages.get()
+                    if page is segment_done:
+                        remaining -= 1
+                        continue
+                    if isinstance(page, Exception):
+                        raise page
+                    for item in validate_items(model_class, page, validation):
+                        count += 1
+                        yield item
+            finally:
+                stop.set()
+        logger.info(f"Scanned {count} items from {table_nm} in {total_segments} segments")
+
+    def _scan_pages(
+        self,
+        table_nm: str,
+        segment: Optional[int] = None,
+        total_segments: Optional[int] = None,
+        page_size: Optional[int] = None,
+        **kwargs: Any,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        params: Dict[str, Any] = dict(kwargs)
+        if total_segments is not None and segment is not None:
+            params["Segment"] = segment
+            params["TotalSegments"] = total_segments
+        if page_size:
+            params["Limit"] = page_size
+        try:
+            table = self.dynamodb.Table(table_nm)
+            while True:
+                response = table.scan(**params)
+                yield response.get("Items", [])
+                last_key = response.get("LastEvaluatedKey")
+                if not last_key:
+                    return
+                params["ExclusiveStartKey"] = last_key
         except Exception as e:
-            logger.error(
-                f"Error getting item {key_condition_expression} from dynamodb {table},{e}",
-                exc_info=True,
-            )
+            logger.error(f"Error scanning segment {segment} of {table_nm},{e}", exc_info=True)
             raise
 
-    def put_item(self, model_instance: T, table_nm: str) -> bool:
+    def put_item(
+        self,
+        model_instance: T,
+        table_nm: str,
+        condition_expression: Optional[ConditionBase] = None,
+    ) -> bool:
+        # with a condition, False means the condition failed and nothing was written
         try:
-            item_dict = model_instance.dict()
+            item_dict = serialize_items([model_instance])[0]
             table = self.dynamodb.Table(table_nm)
-            table.put_item(Item=item_dict)
+            if condition_expression is None:
+                table.put_item(Item=item_dict)
+            else:
+                table.put_item(Item=item_dict, ConditionExpression=condition_expression)
             return True
+        except ClientError as e:
+            if (
+                condition_expression is not None
+                and e.response["Error"]["Code"] == "ConditionalCheckFailedException"
+            ):
+                return False
+            logger.error(f"Failed to write record from dynamodb {table_nm},{e}", exc_info=True)
+            raise
         except Exception as e:
             logger.error(f"Failed to write record from dynamodb {table},{e}", exc_info=True)
             raise
@@ -85,8 +353,7 @@ class DynamoDBOperations:
 
             table = self.dynamodb.Table(table_nm)
             with table.batch_writer() as batch:
-                for item in items:
-                    item_dict = item.dict()
+                for item_dict in serialize_items(items):
                     batch.put_item(Item=item_dict)
                     logger.info(f"Inserted batch of items into {table_nm}")
                 return True
@@ -94,6 +361,26 @@ class DynamoDBOperations:
             logger.error(f"Failed to write record from dynamodb {table},{e}", exc_info=True)
             raise
 
+    def parallel_put_new_items(
+        self, items: List[T], table_nm: str, key_name: str, max_workers: int = 4
+    ) -> int:
+        # conditional puts never overwrite an item that already exists, so concurrent writers
+        # each insert, and count, a disjoint share of the items
+        condition = Attr(key_name).not_exists()
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                inserted = sum(
+                    executor.map(lambda item: self.put_item(item, table_nm, condition), items)
+                )
+            logger.info(
+                f"Inserted {inserted} of {len(items)} new items into {table_nm} "
+                f"with {max_workers} writers"
+            )
+            return inserted
+        except Exception as e:
+            logger.error(f"Failed to insert {len(items)} items into {table_nm},{e}", exc_info=True)
+            raise
+
     def check_table_isEmpty(self, table_nm: str) -> bool:
         try:
             table = self.dynamodb.Table(table_nm)
@@ -135,6 +422,91 @@ class DynamoDBOperations:
             logger.error(f"Failed to write record from dynamodb {table_nm},{e}", exc_info=True)
             raise
 
+    def transact_update_items(
+        self, table_nm: str, updates: List[ItemUpdate], max_attempts: int = 5
+    ) -> Dict[int, str]:
+        # returns the index of every update that was not applied with its cancellation code
+        failures: Dict[int, str] = {}
+        try:
+            for start in range(0, len(updates), TRANSACT_MAX_ITEMS):
+                end = min(start + TRANSACT_MAX_ITEMS, len(updates))
+                failures.update(
+                    self._transact_chunk(table_nm, updates, list(range(start, end)), max_attempts)
+                )
+            logger.info(
+                f"Applied {len(updates) - len(failures)} of {len(updates)} "
+                f"transactional updates to {table_nm}"
+            )
+            return failures
+        except Exception as e:
+            logger.error(
+                f"Failed transactional update of {len(updates)} items in {table_nm},{e}",
+                exc_info=True,
+            )
+            raise
+
+    def _transact_chunk(
+        self, table_nm: str, updates: List[ItemUpdate], indexes: List[int], max_attempts: int
+    ) -> Dict[int, str]:
+        failures: Dict[int, str] = {}
+        attempt = 0
+        while indexes:
+            attempt += 1
+            try:
+                # the resource client serializes python values into attribute values
+                self.dynamodb.meta.client.transact_write_items(
+                    TransactItems=[
+                        {"Update": self._transact_update(table_nm, updates[i])} for i in indexes
+                    ]
+                )
+                return failures
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "TransactionCanceledException":
+                    raise
+                reasons = e.response.get("CancellationReasons", [])
+                if len(reasons) != len(indexes):
+                    raise
+            # one failed condition cancels the whole transaction, so drop the updates that
+            # can never succeed and resubmit the rest
+            retry: List[int] = []
+            transient = False
+            for index, reason in zip(indexes, reasons):
+                code = reason.get("Code") or "None"
+                if code == "None":
+                    retry.append(index)
+                elif code in TRANSIENT_CANCELLATION_CODES:
+                    retry.append(index)
+                    transient = True
+                else:
+                    failures[index] = code
+            if attempt >= max_attempts:
+                failures.update({index: "TransactionCanceled" for index in retry})
+                return failures
+            indexes = retry
+            if transient:
+                time.sleep(min(0.05 * 2**attempt, 2.0))
+        return failures
+
+    def _transact_update(self, table_nm: str, update: ItemUpdate) -> Dict[str, Any]:
+        names = dict(update.expression_attrib_names or {})
+        values = dict(update.expression_attrib_values)
+        params: Dict[str, Any] = {
+            "TableName": table_nm,
+            "Key": update.key,
+            "UpdateExpression": update.update_expression,
+        }
+        if update.condition_expression:
+            # condition objects are only expanded for top level request parameters, so
+            # transaction items carry the built expression and its placeholders
+            built = ConditionExpressionBuilder().build_expression(update.condition_expression)
+            params["ConditionExpression"] = built.condition_expression
+            names.update(built.attribute_name_placeholders)
+            values.update(built.attribute_value_placeholders)
+        if names:
+            params["ExpressionAttributeNames"] = names
+        params["ExpressionAttributeValues"] = values
+        return params
+
 
 if __name__ == "__main__":
     config = get_config().config
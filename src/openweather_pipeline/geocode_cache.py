@@ -0,0 +1,80 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from decimal import Decimal
+from typing import Callable, Dict, Optional, Tuple
+from openweather_pipeline.logger import get_logger
+
+logger = get_logger(__name__)
+
+GeocodeKey = Tuple[str, str]
+Coordinates = Tuple[Decimal, Decimal]
+
+
+# Bounded LRU cache with per-entry TTL in front of the geocode DynamoDB table. Concurrent
+# misses on the same key share a single load.
+class GeocodeCache:
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[GeocodeKey, Tuple[float, Coordinates]]" = OrderedDict()
+        self._inflight: Dict[GeocodeKey, "Future[Coordinates]"] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key: GeocodeKey) -> Optional[Coordinates]:
+        with self._lock:
+            return self._get_locked(key)
+
+    def put(self, key: GeocodeKey, value: Coordinates) -> None:
+        with self._lock:
+            self._put_locked(key, value)
+
+    def get_or_load(self, key: GeocodeKey, loader: Callable[[], Coordinates]) -> Coordinates:
+        with self._lock:
+            cached = self._get_locked(key)
+            if cached is not None:
+                return cached
+            future = self._inflight.get(key)
+            is_loader = future is None
+            if future is None:
+                future = Future()
+                self._inflight[key] = future
+
+        if not is_loader:
+            logger.info(f"Waiting on in-flight geocode lookup for {key}")
+            return future.result()
+
+        try:
+            value = loader()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._put_locked(key, value)
+            self._inflight.pop(key, None)
+        future.set_result(value)
+        return value
+
+    def _get_locked(self, key: GeocodeKey) -> Optional[Coordinates]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _put_locked(self, key: GeocodeKey, value: Coordinates) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
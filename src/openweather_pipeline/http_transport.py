@@ -0,0 +1,96 @@
+import random
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import List, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from pydantic import BaseModel, Field
+from openweather_pipeline.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class TransportConfig(BaseModel):
+    pool_connections: int = Field(ge=1, default=4)
+    pool_maxsize: int = Field(ge=1, default=16)
+    connect_timeout: float = Field(gt=0, default=3.05)
+    read_timeout: float = Field(gt=0, default=15)
+    max_retries: int = Field(ge=0, default=3)
+    backoff_base_seconds: float = Field(ge=0, default=0.5)
+    backoff_max_seconds: float = Field(ge=0, default=20)
+    retry_after_max_seconds: float = Field(ge=0, default=60)
+    retry_statuses: List[int] = Field(default_factory=lambda: [429, 500, 502, 503, 504])
+
+
+class CircuitOpenError(Exception):
+    # cause is "auth" when the API key was rejected, "rate_limited" for rate limit and quota
+    def __init__(self, message: str, cause: str = "rate_limited") -> None:
+        super().__init__(message)
+        self.cause = cause
+
+
+# Stops all further API calls once the API key is rejected or the quota is exhausted, so
+# the remaining items of a batch fail fast instead of spending calls and retries.
+class CircuitBreaker:
+    def __init__(self) -> None:
+        self._open_reason: Optional[str] = None
+        self._open_cause = "rate_limited"
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._open_reason is not None
+
+    def trip(self, reason: str, cause: str = "rate_limited") -> None:
+        with self._lock:
+            if self._open_reason is None:
+                logger.error(f"Opening API circuit breaker: {reason}")
+                self._open_reason = reason
+                self._open_cause = cause
+
+    def reset(self) -> None:
+        with self._lock:
+            self._open_reason = None
+
+    def check(self) -> None:
+        reason = self._open_reason
+        if reason is not None:
+            raise CircuitOpenError(f"API circuit breaker is open: {reason}", self._open_cause)
+
+
+def build_session(config: TransportConfig) -> requests.Session:
+    session = requests.Session()
+    # retries are handled by APIManager so they can honour Retry-After and the quota ledger
+    adapter = HTTPAdapter(
+        pool_connections=config.pool_connections,
+        pool_maxsize=config.pool_maxsize,
+        max_retries=0,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def backoff_delay(config: TransportConfig, attempt: int) -> float:
+    # exponential backoff with full jitter
+    ceiling = min(config.backoff_max_seconds, config.backoff_base_seconds * 2**attempt)
+    return random.uniform(0, ceiling)
+
+
+def parse_retry_after(response: requests.Response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        logger.warning(f"Ignoring unparseable Retry-After header: {value}")
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
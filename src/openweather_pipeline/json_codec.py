@@ -0,0 +1,38 @@
+import json
+from typing import Any, Callable, NamedTuple, Union
+from openweather_pipeline.logger import get_logger
+
+logger = get_logger(__name__)
+
+JSON_CODECS = ("auto", "json", "orjson")
+
+
+class JsonCodec(NamedTuple):
+    name: str
+    loads: Callable[[Union[bytes, str]], Any]
+    dumps: Callable[[Any], bytes]
+
+
+def _stdlib_dumps(value: Any) -> bytes:
+    return json.dumps(value).encode("utf-8")
+
+
+STDLIB_CODEC = JsonCodec("json", json.loads, _stdlib_dumps)
+
+
+def get_json_codec(name: str = "auto") -> JsonCodec:
+    # orjson is an optional extra; "auto" uses it when installed and falls back to json
+    if name == "json":
+        return STDLIB_CODEC
+    if name not in ("auto", "orjson"):
+        raise ValueError(f"Unsupported JSON codec {name}, use {JSON_CODECS}")
+    try:
+        import orjson
+    except ImportError as e:
+        if name == "orjson":
+            raise ValueError(
+                "orjson codec needs the orjson package, install openweather-aws-pipeline[orjson]"
+            ) from e
+        return STDLIB_CODEC
+    logger.info("Using orjson for JSON encoding and decoding")
+    return JsonCodec("orjson", orjson.loads, orjson.dumps)
@@ -20,6 +20,14 @@ class CollectionProgress(BaseModel):
     last_run: Optional[str] = None
     status: Literal["in_progress", "completed", "paused"]
     started_at: str = Field(default_factory=lambda: datetime.now().isoformat())
+    seed_signature: Optional[str] = None
+
+
+# Counter deltas written to job_id#shard#n rows, summed into the job's progress on read
+class ProgressCounterShard(BaseModel):
+    job_id: str
+    completed_items: int = 0
+    remaining_items: int = 0
 
 
 class CollectionQueueItem(BaseModel):
@@ -27,11 +35,20 @@ class CollectionQueueItem(BaseModel):
     zip_code: str = Field(pattern=r"^\d{5}$")
     country_code: str = Field(pattern=r"^[A-Z]{2}$")
     date: str = Field(pattern=r"^\d{4}-\d{2}-\d{2}$")
-    status: Literal["pending", "completed", "failed"] = "pending"
+    status: Literal["pending", "in_progress", "completed", "failed", "dead_letter"] = "pending"
     retry_count: int = Field(ge=0, le=3, default=0)
     last_attempt: Optional[str] = None
     completed_at: Optional[str] = None
     error_message: Optional[str] = None
+    lease_expires_at: Optional[str] = None
+    worker_id: Optional[str] = None
+    next_attempt_at: Optional[str] = None
+    failure_class: Optional[str] = None
+
+
+class QueueItemKey(BaseModel):
+    item_id: str
+    status: str
 
 
 class CollectionGeocodeCache(BaseModel):
@@ -39,5 +56,24 @@ class CollectionGeocodeCache(BaseModel):
     country_code: str = Field(pattern=r"^[A-Z]{2}$")
     latitude: Decimal
     longitude: Decimal
-    name: Optional[str]
-    country: Optional[str]
+    name: Optional[str] = None
+    country: Optional[str] = None
+
+
+class CollectionItemResult(BaseModel):
+    item_id: str
+    status: Literal["completed", "failed", "skipped"]
+    error_message: Optional[str] = None
+
+
+class ReconciliationSummary(BaseModel):
+    objects_listed: int = 0
+    stored_days: int = 0
+    queue_items: int = 0
+    to_complete: int = 0
+    transitioned: int = 0
+    failed: int = 0
+    not_queued: int = 0
+    total_items: int = 0
+    completed_items: int = 0
+    remaining_items: int = 0
@@ -0,0 +1,38 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+
+
+class ProcessingManifest(BaseModel):
+    # raw object key -> ETag at the time it was processed
+    processed_keys: Dict[str, str] = Field(default_factory=dict)
+    parts: List[str] = Field(default_factory=list)
+    updated_at: Optional[str] = None
+
+
+class RepartitionCheckpoint(BaseModel):
+    source_bucket: str
+    source_prefix: str
+    destination_bucket: str
+    # every source key up to and including last_key has been copied and verified; with
+    # delete_source, sources are only deleted once a saved checkpoint lists them here
+    last_key: Optional[str] = None
+    pending_deletes: List[str] = Field(default_factory=list)
+    listed: int = 0
+    copied: int = 0
+    skipped: int = 0
+    deleted: int = 0
+    bytes_copied: int = 0
+    completed: bool = False
+    updated_at: Optional[str] = None
+
+
+class CompactedSource(BaseModel):
+    etag: str
+    file: str
+
+
+class CompactionManifest(BaseModel):
+    # raw object key -> the compacted file holding it and the raw ETag it was compacted at
+    sources: Dict[str, CompactedSource] = Field(default_factory=dict)
+    files: List[str] = Field(default_factory=list)
+    updated_at: Optional[str] = None
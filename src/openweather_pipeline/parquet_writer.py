@@ -0,0 +1,158 @@
+import io
+from typing import Any, Dict, Iterable, List, Optional
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openweather_pipeline.logger import get_logger
+
+logger = get_logger(__name__)
+
+# S3 rejects multipart parts smaller than 5 MiB, except for the last one
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+# Write-only file object that streams into an S3 multipart upload, holding at most one
+# part in memory. Objects smaller than one part are sent with a single put_object.
+class S3MultipartUpload(io.RawIOBase):
+    def __init__(
+        self,
+        s3_client: Any,
+        bucket: str,
+        key: str,
+        part_size: int = 8 * 1024 * 1024,
+        content_type: str = "application/octet-stream",
+    ) -> None:
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = max(MIN_PART_SIZE, part_size)
+        self.content_type = content_type
+        self._buffer = bytearray()
+        self._position = 0
+        self._upload_id: Optional[str] = None
+        self._parts: List[Dict[str, Any]] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def write(self, data: Any) -> int:
+        if self.closed:
+            raise ValueError(f"Write to closed upload s3://{self.bucket}/{self.key}")
+        view = memoryview(data).cast("B")
+        self._buffer.extend(view)
+        self._position += len(view)
+        while len(self._buffer) >= self.part_size:
+            self._upload_part(bytes(self._buffer[: self.part_size]))
+            del self._buffer[: self.part_size]
+        return len(view)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            if self._upload_id is None:
+                self.s3_client.put_object(
+                    Bucket=self.bucket,
+                    Key=self.key,
+                    Body=bytes(self._buffer),
+                    ContentType=self.content_type,
+                )
+            else:
+                if self._buffer:
+                    self._upload_part(bytes(self._buffer))
+                self.s3_client.complete_multipart_upload(
+                    Bucket=self.bucket,
+                    Key=self.key,
+                    UploadId=self._upload_id,
+                    MultipartUpload={"Parts": self._parts},
+                )
+            logger.info(f"Uploaded {self._position} bytes to s3://{self.bucket}/{self.key}")
+        except Exception:
+            self.abort()
+            raise
+        finally:
+            self._buffer = bytearray()
+            super().close()
+
+    def abort(self) -> None:
+        if self._upload_id is not None:
+            logger.warning(f"Aborting multipart upload to s3://{self.bucket}/{self.key}")
+            self.s3_client.abort_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self._upload_id
+            )
+            self._upload_id = None
+        self._buffer = bytearray()
+        super().close()
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+    def _upload_part(self, body: bytes) -> None:
+        if self._upload_id is None:
+            response = self.s3_client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, ContentType=self.content_type
+            )
+            self._upload_id = response["UploadId"]
+        part_number = len(self._parts) + 1
+        response = self.s3_client.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=body,
+        )
+        self._parts.append({"PartNumber": part_number, "ETag": response["ETag"]})
+
+
+# Buffers incoming batches up to one row group and flushes it to the sink, so memory
+# stays constant no matter how many rows are written.
+class StreamingParquetWriter:
+    def __init__(self, sink: Any, schema: pa.Schema, row_group_size: int = 10000) -> None:
+        self.schema = schema
+        self.row_group_size = max(1, row_group_size)
+        self._writer = pq.ParquetWriter(sink, schema, compression="snappy")
+        self._buffer: List[pa.Table] = []
+        self._buffered_rows = 0
+        self.rows_written = 0
+
+    def write_table(self, table: pa.Table) -> None:
+        if table.num_rows == 0:
+            return
+        self._buffer.append(table.select(self.schema.names).cast(self.schema))
+        self._buffered_rows += table.num_rows
+        if self._buffered_rows >= self.row_group_size:
+            self.flush()
+
+    def write_tables(self, tables: Iterable[pa.Table]) -> None:
+        for table in tables:
+            self.write_table(table)
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        table = pa.concat_tables(self._buffer)
+        self._writer.write_table(table, row_group_size=self.row_group_size)
+        self.rows_written += table.num_rows
+        self._buffer = []
+        self._buffered_rows = 0
+
+    def close(self) -> None:
+        self.flush()
+        self._writer.close()
+
+    def __enter__(self) -> "StreamingParquetWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            # buffered rows are dropped, but the writer is still closed while the sink is
+            # open, otherwise it writes its footer into an aborted upload when collected
+            self._buffer = []
+            self._writer.close()
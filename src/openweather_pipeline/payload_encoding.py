@@ -0,0 +1,41 @@
+import gzip
+from typing import Any, Optional
+
+CONTENT_ENCODINGS = ("identity", "gzip", "zstd")
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def _zstandard() -> Any:
+    # zstd is an optional extra, gzip is always available
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ValueError(
+            "zstd content encoding needs the zstandard package, "
+            "install openweather-aws-pipeline[zstd]"
+        ) from e
+    return zstandard
+
+
+def encode_payload(body: bytes, content_encoding: str, level: Optional[int] = None) -> bytes:
+    if content_encoding == "gzip":
+        return gzip.compress(body, compresslevel=6 if level is None else level)
+    if content_encoding == "zstd":
+        compressor = _zstandard().ZstdCompressor(level=3 if level is None else level)
+        compressed: bytes = compressor.compress(body)
+        return compressed
+    if content_encoding == "identity":
+        return body
+    raise ValueError(f"Unsupported content encoding {content_encoding}, use {CONTENT_ENCODINGS}")
+
+
+def decode_payload(content: bytes) -> bytes:
+    # objects are recognised by their magic bytes, so compressed and plain objects can sit
+    # side by side under the same prefix whatever their ContentEncoding header says
+    if content.startswith(GZIP_MAGIC):
+        return gzip.decompress(content)
+    if content.startswith(ZSTD_MAGIC):
+        decompressed: bytes = _zstandard().ZstdDecompressor().decompressobj().decompress(content)
+        return decompressed
+    return content
@@ -1,4 +1,10 @@
+from datetime import date
+from typing import Iterable, List, Optional, Tuple
+import pandas as pd
 from openweather_pipeline.s3_operations import S3Operations
+from openweather_pipeline.compaction import RawCompactor
+from openweather_pipeline.json_codec import get_json_codec
+from openweather_pipeline.processed_dataset import ProcessedDataset
 from openweather_pipeline.logger import get_logger
 from openweather_pipeline.config_manager import get_config
 
@@ -19,8 +25,48 @@ class DataLoader:
             self.processed_file_name = (
                 self.config.get("s3", {}).get("buckets", {}).get("processed_file_name")
             )
+            self.processed_dataset_name = (
+                self.config.get("s3", {}).get("buckets", {}).get("processed_dataset_name")
+            )
             self.region = self.config.get("aws", {}).get("region", "us-east-1")
-            self.s3Operations = S3Operations(self.source_bucket, self.region)
+            self.fetch_max_workers = self.config.get("s3", {}).get("fetch_max_workers", 16)
+            self.row_group_size = self.config.get("s3", {}).get("parquet_row_group_size", 10000)
+            self.part_size = (
+                self.config.get("s3", {}).get("multipart_part_size_mb", 8) * 1024 * 1024
+            )
+            self.s3Operations = S3Operations(
+                self.source_bucket,
+                self.region,
+                max_pool_connections=self.config.get("s3", {}).get("max_pool_connections", 50),
+                json_codec=get_json_codec(self.config.get("app", {}).get("json_codec", "auto")),
+            )
+
+            # compaction is optional; without a compacted_prefix raw objects are read one by one
+            self.compacted_prefix = (
+                self.config.get("s3", {}).get("buckets", {}).get("compacted_prefix")
+            )
+            self.rawCompactor: Optional[RawCompactor] = None
+            if self.compacted_prefix:
+                self.rawCompactor = RawCompactor(
+                    self.s3Operations,
+                    self.source_prefix,
+                    self.compacted_prefix,
+                    max_workers=self.fetch_max_workers,
+                    content_encoding=self.config.get("s3", {}).get(
+                        "compaction_content_encoding", "gzip"
+                    ),
+                    default_country_code=self.config.get("app", {}).get("ISO3166_code", "US"),
+                )
+
+            self.processedDataset = ProcessedDataset(
+                self.s3Operations,
+                f"{self.processed_prefix}/{self.processed_dataset_name}",
+                max_workers=self.fetch_max_workers,
+                row_group_size=self.row_group_size,
+                part_size=self.part_size,
+                compaction_max_parts=self.config.get("s3", {}).get("compaction_max_parts", 30),
+                rawCompactor=self.rawCompactor,
+            )
 
             logger.info("Historical data processing initialized successfully")
         except Exception as e:
@@ -30,14 +76,75 @@ class DataLoader:
     def read_and_save_json_files_to_parquet(self) -> None:
         logger.info("starting read of JSON files into dataframe")
         try:
+            if self.rawCompactor is not None:
+                # days whose raw objects were deleted after compaction are only in the
+                # compacted files, so the rebuild reads through the compaction manifest
+                compaction = self.rawCompactor.load_manifest()
+                available = self.rawCompactor.available_etags(self.source_prefix, compaction)
+                if not available:
+                    raise ValueError(f"No data loaded for folder: {self.source_prefix}")
+                logger.info(f"Found {len(available)} raw records, reading compacted files first")
+                self.s3Operations.save_batches_to_parquet(
+                    self.s3Operations.flatten_payload_batches(
+                        self.rawCompactor.iter_payloads(sorted(available), available, compaction)
+                    ),
+                    f"{self.processed_prefix}/{self.processed_file_name}",
+                    row_group_size=self.row_group_size,
+                    part_size=self.part_size,
+                )
+                return
             self.s3Operations.read_and_save_json_files_to_parquet(
-                self.source_prefix, self.processed_prefix, self.processed_file_name
+                self.source_prefix,
+                self.processed_prefix,
+                self.processed_file_name,
+                max_workers=self.fetch_max_workers,
+                row_group_size=self.row_group_size,
+                part_size=self.part_size,
             )
         except Exception as e:
             logger.error(f"Error during read of JSON files into parquet: {str(e)}", exc_info=True)
             raise
 
+    def process_new_json_files(self, full_refresh: bool = False) -> None:
+        logger.info("starting incremental processing of new JSON files")
+        try:
+            rows_written = self.processedDataset.update(self.source_prefix, full_refresh)
+            logger.info(f"Incremental processing complete, {rows_written} new rows")
+        except Exception as e:
+            logger.error(f"Error during incremental processing: {str(e)}", exc_info=True)
+            raise
+
+    def compact_raw_objects(
+        self, months: Optional[Iterable[Tuple[int, int]]] = None, delete_originals: bool = False
+    ) -> int:
+        if self.rawCompactor is None:
+            raise ValueError("s3.buckets.compacted_prefix is not configured")
+        try:
+            files_written = self.rawCompactor.compact(months, delete_originals=delete_originals)
+            logger.info(f"Raw compaction complete, {files_written} files written")
+            return files_written
+        except Exception as e:
+            logger.error(f"Error during raw compaction: {str(e)}", exc_info=True)
+            raise
+
+    def read_processed_data(
+        self,
+        zip_codes: Optional[Iterable[str]] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        columns: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        try:
+            table = self.processedDataset.read(
+                zip_codes=zip_codes, start_date=start_date, end_date=end_date, columns=columns
+            )
+            logger.info(f"Read {table.num_rows} rows from processed dataset")
+            return table.to_pandas()
+        except Exception as e:
+            logger.error(f"Error reading processed dataset: {str(e)}", exc_info=True)
+            raise
+
 
 if __name__ == "__main__":
     weather_app = DataLoader()
-    weather_app.read_and_save_json_files_to_parquet()
+    weather_app.process_new_json_files()
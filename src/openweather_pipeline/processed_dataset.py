@@ -0,0 +1,273 @@
+import gzip
+import io
+import uuid
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+from openweather_pipeline.compaction import RawCompactor
+from openweather_pipeline.logger import get_logger
+from openweather_pipeline.models.dataset_models import ProcessingManifest
+from openweather_pipeline.payload_encoding import decode_payload
+from openweather_pipeline.parquet_writer import S3MultipartUpload, StreamingParquetWriter
+from openweather_pipeline.s3_keys import parse_partition_values
+from openweather_pipeline.s3_operations import S3Operations
+from openweather_pipeline.weather_schema import PARTITION_SCHEMA, PROCESSED_FILE_SCHEMA
+
+logger = get_logger(__name__)
+
+MANIFEST_FILE_NAME = "_manifest.json.gz"
+
+Partition = Tuple[str, str, int]
+
+
+def _partition_runs(table: pa.Table) -> Iterator[Tuple[Partition, pa.Table]]:
+    # splits a batch into contiguous runs of rows that share a partition
+    partitions = list(
+        zip(
+            table["country_code"].to_pylist(),
+            table["zip_code"].to_pylist(),
+            pc.year(table["date"]).to_pylist(),
+        )
+    )
+    start = 0
+    for row in range(1, table.num_rows + 1):
+        if row == table.num_rows or partitions[row] != partitions[start]:
+            yield partitions[start], table.slice(start, row - start)
+            start = row
+
+
+def key_partition(key: str) -> Partition:
+    values = parse_partition_values(key)
+    return (values.get("country_code", ""), values.get("zip_code", ""), int(values.get("year", 0)))
+
+
+# Processed weather data stored as hive partitions country_code=/zip_code=/year= of
+# parquet parts, plus a manifest of the raw objects already folded in. Each run only
+# reads raw objects that are new or changed since the manifest was written and appends
+# them as new parts.
+class ProcessedDataset:
+    def __init__(
+        self,
+        s3Operations: S3Operations,
+        dataset_prefix: str,
+        max_workers: int = 16,
+        row_group_size: int = 10000,
+        part_size: int = 8 * 1024 * 1024,
+        compaction_max_parts: int = 30,
+        filesystem: Optional[pafs.FileSystem] = None,
+        rawCompactor: Optional[RawCompactor] = None,
+    ) -> None:
+        self.s3Operations = s3Operations
+        self.dataset_prefix = dataset_prefix.rstrip("/")
+        self.manifest_key = f"{self.dataset_prefix}/{MANIFEST_FILE_NAME}"
+        self.max_workers = max_workers
+        self.row_group_size = row_group_size
+        self.part_size = part_size
+        self.compaction_max_parts = compaction_max_parts
+        self._filesystem = filesystem
+        self.rawCompactor = rawCompactor
+
+    def load_manifest(self) -> ProcessingManifest:
+        if not self.s3Operations.object_exists(self.manifest_key):
+            logger.info(f"No manifest found at {self.manifest_key}, starting a new dataset")
+            return ProcessingManifest()
+        content = decode_payload(self.s3Operations.read_file_as_bytes(self.manifest_key))
+        return ProcessingManifest.model_validate_json(content)
+
+    def save_manifest(self, manifest: ProcessingManifest) -> None:
+        manifest.updated_at = datetime.now().isoformat()
+        self.s3Operations.put_bytes(
+            self.manifest_key,
+            gzip.compress(manifest.model_dump_json().encode("utf-8")),
+            content_type="application/json",
+            content_encoding="gzip",
+        )
+
+    def update(self, source_prefix: str, full_refresh: bool = False) -> int:
+        previous = self.load_manifest()
+        manifest = ProcessingManifest() if full_refresh else previous.model_copy(deep=True)
+        # raw key -> ETag of every raw record available, including those only held in a
+        # compacted file once delete_originals has run
+        compaction = None
+        if self.rawCompactor is not None:
+            compaction = self.rawCompactor.load_manifest()
+            available = self.rawCompactor.available_etags(source_prefix, compaction)
+        else:
+            available = {
+                obj.key: obj.etag
+                for obj in self.s3Operations.iter_objects_parallel(
+                    source_prefix, "json", self.max_workers
+                )
+            }
+        new_keys = [
+            key for key, etag in available.items() if manifest.processed_keys.get(key) != etag
+        ]
+        logger.info(
+            f"Found {len(new_keys)} new raw objects, "
+            f"{len(manifest.processed_keys)} already processed"
+        )
+        rows_written = 0
+        if new_keys:
+            # fetching in partition order keeps a single partition writer open at a time
+            keys = sorted(new_keys, key=lambda k: (key_partition(k), k))
+            if self.rawCompactor is not None:
+                batches = self.s3Operations.flatten_payload_batches(
+                    self.rawCompactor.iter_payloads(keys, available, compaction)
+                )
+            else:
+                batches = self.s3Operations.iter_flattened_batches(keys, self.max_workers)
+            parts, rows_written = self._write_partitioned(batches)
+            # the manifest is only updated once the parts are durable, so a failed run
+            # simply reprocesses the same objects next time
+            manifest.parts.extend(parts)
+            manifest.processed_keys.update({key: available[key] for key in new_keys})
+            self.save_manifest(manifest)
+            logger.info(f"Appended {rows_written} rows as {len(parts)} parts")
+
+        if full_refresh and previous.parts:
+            self.s3Operations.delete_objects(previous.parts)
+        self.compact(manifest)
+        return rows_written
+
+    def compact(self, manifest: ProcessingManifest, force: bool = False) -> None:
+        parts_by_partition: Dict[Partition, List[str]] = {}
+        for part_key in manifest.parts:
+            parts_by_partition.setdefault(key_partition(part_key), []).append(part_key)
+        to_compact = {
+            partition: parts
+            for partition, parts in parts_by_partition.items()
+            if len(parts) > 1 and (force or len(parts) > self.compaction_max_parts)
+        }
+        if not to_compact:
+            return
+        old_parts: List[str] = []
+        for partition, parts in sorted(to_compact.items()):
+            new_parts, rows_written = self._write_partitioned(
+                self._iter_latest_records(partition, parts)
+            )
+            logger.info(f"Compacted {len(parts)} parts of {partition} ({rows_written} rows)")
+            manifest.parts = [part for part in manifest.parts if part not in parts] + new_parts
+            old_parts.extend(parts)
+        self.save_manifest(manifest)
+        self.s3Operations.delete_objects(old_parts)
+
+    def read(
+        self,
+        zip_codes: Optional[Iterable[str]] = None,
+        country_code: Optional[str] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        columns: Optional[List[str]] = None,
+    ) -> pa.Table:
+        manifest = self.load_manifest()
+        zip_filter = set(zip_codes) if zip_codes is not None else None
+        # partition pruning happens on the manifest, so pruned parts are never listed or opened
+        selected = []
+        for part_key in manifest.parts:
+            part_country, part_zip, part_year = key_partition(part_key)
+            if country_code is not None and part_country != country_code:
+                continue
+            if zip_filter is not None and part_zip not in zip_filter:
+                continue
+            if start_date is not None and part_year < start_date.year:
+                continue
+            if end_date is not None and part_year > end_date.year:
+                continue
+            selected.append(part_key)
+        logger.info(f"Reading {len(selected)} of {len(manifest.parts)} parts")
+
+        full_schema = pa.unify_schemas([PROCESSED_FILE_SCHEMA, PARTITION_SCHEMA])
+        if not selected:
+            empty = full_schema.empty_table()
+            return empty.select(columns) if columns else empty
+
+        bucket = self.s3Operations.bucket
+        dataset = ds.dataset(
+            [f"{bucket}/{part_key}" for part_key in selected],
+            schema=full_schema,
+            format="parquet",
+            filesystem=self._get_filesystem(),
+            partitioning=ds.partitioning(PARTITION_SCHEMA, flavor="hive"),
+            partition_base_dir=f"{bucket}/{self.dataset_prefix}",
+        )
+        # remaining predicates are pushed down to parquet row group statistics
+        expression = None
+        if start_date is not None:
+            expression = ds.field("date") >= pa.scalar(start_date, pa.date32())
+        if end_date is not None:
+            end_expression = ds.field("date") <= pa.scalar(end_date, pa.date32())
+            expression = end_expression if expression is None else expression & end_expression
+        return dataset.to_table(columns=columns, filter=expression)
+
+    def _get_filesystem(self) -> pafs.FileSystem:
+        if self._filesystem is None:
+            self._filesystem = pafs.S3FileSystem(region=self.s3Operations.region)
+        return self._filesystem
+
+    def _write_partitioned(self, tables: Iterator[pa.Table]) -> Tuple[List[str], int]:
+        parts: List[str] = []
+        rows_written = 0
+        current: Optional[Partition] = None
+        upload: Optional[S3MultipartUpload] = None
+        writer: Optional[StreamingParquetWriter] = None
+        try:
+            for table in tables:
+                for partition, run in _partition_runs(table):
+                    if partition != current:
+                        if writer is not None and upload is not None:
+                            writer.close()
+                            upload.close()
+                            rows_written += writer.rows_written
+                        current = partition
+                        part_key = self._new_part_key(partition)
+                        upload = self.s3Operations.open_multipart_upload(
+                            part_key, part_size=self.part_size
+                        )
+                        writer = StreamingParquetWriter(
+                            upload, PROCESSED_FILE_SCHEMA, row_group_size=self.row_group_size
+                        )
+                        parts.append(part_key)
+                    if writer is not None:
+                        writer.write_table(run)
+            if writer is not None and upload is not None:
+                writer.close()
+                upload.close()
+                rows_written += writer.rows_written
+        except Exception:
+            if upload is not None:
+                upload.abort()
+            raise
+        return parts, rows_written
+
+    def _iter_latest_records(self, partition: Partition, parts: List[str]) -> Iterator[pa.Table]:
+        country_code, zip_code, _ = partition
+        # newer parts win when a raw object was reprocessed after being overwritten, and
+        # within a part the last row of a date wins, as rows follow the raw key order
+        seen: Set[date] = set()
+        for part_key in reversed(parts):
+            table = pq.read_table(io.BytesIO(self.s3Operations.read_file_as_bytes(part_key)))
+            latest: Dict[date, int] = {}
+            for row, day in enumerate(table["date"].to_pylist()):
+                if day not in seen:
+                    latest[day] = row
+            if not latest:
+                continue
+            seen.update(latest)
+            table = table.take(pa.array(sorted(latest.values()), type=pa.int64()))
+            yield table.append_column(
+                "zip_code", pa.array([zip_code] * table.num_rows, type=pa.string())
+            ).append_column(
+                "country_code", pa.array([country_code] * table.num_rows, type=pa.string())
+            )
+
+    def _new_part_key(self, partition: Partition) -> str:
+        country_code, zip_code, year = partition
+        timestamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+        return (
+            f"{self.dataset_prefix}/country_code={country_code}/zip_code={zip_code}/"
+            f"year={year}/part-{timestamp}-{uuid.uuid4().hex[:8]}.parquet"
+        )
@@ -0,0 +1,126 @@
+import random
+import time
+from typing import Dict, List, Optional
+from boto3.dynamodb.conditions import Attr
+from openweather_pipeline.dynamodb_operations import (
+    TRANSACT_MAX_ITEMS,
+    DynamoDBOperations,
+    ItemUpdate,
+)
+from openweather_pipeline.logger import get_logger
+from openweather_pipeline.models.collection_models import CollectionProgress, ProgressCounterShard
+
+logger = get_logger(__name__)
+
+
+# Completion counters for a progress record spread over shard rows. Writers add their
+# deltas to a random shard so parallel collectors never contend on the job's own row,
+# and readers fold every shard back into the base record.
+class ShardedProgressCounter:
+    def __init__(
+        self,
+        dynamodb: DynamoDBOperations,
+        table_nm: str,
+        shard_count: int,
+        job_id: str = "historical_collection",
+    ) -> None:
+        self.dynamodb = dynamodb
+        self.table_nm = table_nm
+        self.shard_count = max(1, shard_count)
+        self.job_id = job_id
+
+    def shard_key(self, shard: int) -> Dict[str, str]:
+        return {"job_id": f"{self.job_id}#shard#{shard}"}
+
+    def add(self, completed: int) -> None:
+        if completed == 0:
+            return
+        shard = random.randrange(self.shard_count)
+        try:
+            # ADD creates the shard row on first use
+            self.dynamodb.update_item(
+                table_nm=self.table_nm,
+                key=self.shard_key(shard),
+                update_expression="ADD completed_items :done, remaining_items :remaining",
+                expression_attrib_values={":done": completed, ":remaining": -completed},
+            )
+            logger.info(f"Added {completed} completed items to shard {shard} of {self.job_id}")
+        except Exception as e:
+            logger.error(
+                f"Error updating progress shard {shard} of {self.job_id},{e}", exc_info=True
+            )
+            raise
+
+    def shards(self) -> List[ProgressCounterShard]:
+        return self.dynamodb.batch_get_items(
+            ProgressCounterShard,
+            self.table_nm,
+            [self.shard_key(shard) for shard in range(self.shard_count)],
+            validation="trusted",
+        )
+
+    def load_progress(self) -> Optional[CollectionProgress]:
+        progress = self.dynamodb.get_item(
+            CollectionProgress, self.table_nm, {"job_id": self.job_id}
+        )
+        if progress is None:
+            return None
+        shards = self.shards()
+        progress.completed_items += sum(shard.completed_items for shard in shards)
+        progress.remaining_items = max(
+            0, progress.remaining_items + sum(shard.remaining_items for shard in shards)
+        )
+        return progress
+
+    def set_totals(
+        self, total_items: int, completed_items: int, remaining_items: int, max_attempts: int = 5
+    ) -> None:
+        # Makes load_progress report these totals without zeroing the shards: the base record
+        # takes the totals minus what the shards hold, in one transaction that only commits
+        # while every shard still holds the values read, so a concurrent add() is never lost.
+        if self.shard_count + 1 > TRANSACT_MAX_ITEMS:
+            raise ValueError(f"{self.shard_count} shards do not fit in one transaction")
+        for attempt in range(1, max_attempts + 1):
+            shards = {shard.job_id: shard for shard in self.shards()}
+            updates = [
+                ItemUpdate(
+                    key={"job_id": self.job_id},
+                    update_expression="SET total_items = :total, completed_items = :completed, "
+                    "remaining_items = :remaining",
+                    expression_attrib_values={
+                        ":total": total_items,
+                        ":completed": completed_items
+                        - sum(shard.completed_items for shard in shards.values()),
+                        ":remaining": remaining_items
+                        - sum(shard.remaining_items for shard in shards.values()),
+                    },
+                )
+            ]
+            for number in range(self.shard_count):
+                key = self.shard_key(number)
+                shard = shards.get(key["job_id"])
+                done = 0 if shard is None else shard.completed_items
+                remaining = 0 if shard is None else shard.remaining_items
+                # rewrites the values read, guarded on them being unchanged
+                condition = (
+                    Attr("job_id").not_exists()
+                    if shard is None
+                    else Attr("completed_items").eq(done) & Attr("remaining_items").eq(remaining)
+                )
+                updates.append(
+                    ItemUpdate(
+                        key=key,
+                        update_expression="SET completed_items = :done, "
+                        "remaining_items = :remaining",
+                        expression_attrib_values={":done": done, ":remaining": remaining},
+                        condition_expression=condition,
+                    )
+                )
+            # a single attempt keeps the transaction all or nothing
+            failures = self.dynamodb.transact_update_items(self.table_nm, updates, max_attempts=1)
+            if not failures:
+                logger.info(f"Set progress totals of {self.job_id} on top of its shards")
+                return
+            logger.info(f"Progress shards of {self.job_id} changed while setting totals, retrying")
+            time.sleep(min(0.05 * 2**attempt, 2.0))
+        raise RuntimeError(f"Could not set progress totals of {self.job_id}")
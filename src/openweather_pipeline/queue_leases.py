@@ -0,0 +1,122 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import List, Optional
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+from openweather_pipeline.dynamodb_operations import DynamoDBOperations
+from openweather_pipeline.logger import get_logger
+from openweather_pipeline.models.collection_models import CollectionQueueItem
+from openweather_pipeline.retry_scheduler import RetryScheduler
+
+logger = get_logger(__name__)
+
+
+# Hands out queue items under a lease. An item is claimed by moving it to in_progress
+# with a conditional update, so concurrent claimers can never both win the same item,
+# and an item whose lease ran out or whose retry is due becomes claimable again.
+class QueueLeaseManager:
+    def __init__(
+        self,
+        dynamodb: DynamoDBOperations,
+        table_nm: str,
+        lease_seconds: int = 900,
+        max_workers: int = 8,
+        retry_scheduler: Optional[RetryScheduler] = None,
+        retry_share: float = 0.2,
+    ) -> None:
+        self.dynamodb = dynamodb
+        self.table_nm = table_nm
+        self.lease_seconds = lease_seconds
+        self.max_workers = max_workers
+        self.retryScheduler = retry_scheduler
+        self.retry_share = retry_share
+
+    def claimable_items(self, limit: int) -> List[CollectionQueueItem]:
+        if limit <= 0:
+            return []
+        # due retries get a share of every batch so they are not starved by pending work
+        retry_limit = max(1, int(limit * self.retry_share)) if self.retryScheduler else 0
+        due = self.retryScheduler.due_items(retry_limit) if self.retryScheduler else []
+        items = list(due)
+        if limit - len(items) > 0:
+            items.extend(
+                self.dynamodb.iter_query(
+                    CollectionQueueItem,
+                    self.table_nm,
+                    "#status = :pending",
+                    {"#status": "status"},
+                    {":pending": "pending"},
+                    index_name="status-date-index",
+                    limit=limit - len(items),
+                    validation="trusted",
+                )
+            )
+        if len(items) < limit:
+            expired = list(
+                self.dynamodb.iter_query(
+                    CollectionQueueItem,
+                    self.table_nm,
+                    "#status = :in_progress",
+                    {"#status": "status"},
+                    {":in_progress": "in_progress", ":now": datetime.now().isoformat()},
+                    index_name="status-date-index",
+                    limit=limit - len(items),
+                    validation="trusted",
+                    FilterExpression="lease_expires_at < :now",
+                )
+            )
+            if expired:
+                logger.info(f"Found {len(expired)} items with an expired lease to reclaim")
+            items.extend(expired)
+        if self.retryScheduler and len(due) == retry_limit and len(items) < limit:
+            # spare capacity goes to retries beyond their share
+            seen = {item.item_id for item in due}
+            extra = self.retryScheduler.due_items(retry_limit + limit - len(items))
+            items.extend([item for item in extra if item.item_id not in seen][: limit - len(items)])
+        return items
+
+    def claim(self, items: List[CollectionQueueItem], worker_id: str) -> List[CollectionQueueItem]:
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+            results = list(executor.map(lambda item: self._claim_item(item, worker_id), items))
+        claimed = [item for item in results if item is not None]
+        logger.info(f"Worker {worker_id} claimed {len(claimed)} of {len(items)} items")
+        return claimed
+
+    def _claim_item(
+        self, item: CollectionQueueItem, worker_id: str
+    ) -> Optional[CollectionQueueItem]:
+        now = datetime.now()
+        lease_expires_at = (now + timedelta(seconds=self.lease_seconds)).isoformat()
+        try:
+            self.dynamodb.update_item(
+                table_nm=self.table_nm,
+                key={"item_id": item.item_id},
+                update_expression="SET #status = :in_progress, lease_expires_at = :expires, "
+                "worker_id = :worker, last_attempt = :now",
+                condition_expression=Attr("status").eq("pending")
+                | (Attr("status").eq("in_progress") & Attr("lease_expires_at").lt(now.isoformat()))
+                | (Attr("status").eq("failed") & Attr("next_attempt_at").lte(now.isoformat()))
+                | (Attr("status").eq("failed") & Attr("next_attempt_at").not_exists()),
+                expression_attrib_values={
+                    ":in_progress": "in_progress",
+                    ":expires": lease_expires_at,
+                    ":worker": worker_id,
+                    ":now": now.isoformat(),
+                },
+                expression_attrib_names={"#status": "status"},
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            logger.info(f"Item_id :{item.item_id} was claimed by another worker, skipping")
+            return None
+        return item.model_copy(
+            update={
+                "status": "in_progress",
+                "lease_expires_at": lease_expires_at,
+                "worker_id": worker_id,
+                "last_attempt": now.isoformat(),
+            }
+        )
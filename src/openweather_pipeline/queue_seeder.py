@@ -0,0 +1,149 @@
+import hashlib
+import json
+from datetime import date, timedelta
+from typing import Any, Iterator, List
+from boto3.dynamodb.conditions import Attr
+from openweather_pipeline.dynamodb_operations import DynamoDBOperations
+from openweather_pipeline.logger import get_logger
+from openweather_pipeline.models.collection_models import (
+    CollectionProgress,
+    CollectionQueueItem,
+    QueueItemKey,
+)
+from openweather_pipeline.progress_counters import ShardedProgressCounter
+
+logger = get_logger(__name__)
+
+
+def seed_signature(zipcodes: List[Any], start_dt: date, end_dt: date) -> str:
+    locations = sorted((str(z.get("zip_code")), str(z.get("country_code"))) for z in zipcodes)
+    content = json.dumps([locations, start_dt.isoformat(), end_dt.isoformat()])
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def iter_queue_items(
+    zipcodes: List[Any], start_dt: date, end_dt: date
+) -> Iterator[CollectionQueueItem]:
+    current = start_dt
+    while current <= end_dt:
+        current_str = current.strftime("%Y-%m-%d")
+        for zipcode in zipcodes:
+            zip = zipcode.get("zip_code")
+            country_code = zipcode.get("country_code")
+            yield CollectionQueueItem(
+                item_id=f"{zip}#{country_code}#{current_str}",
+                zip_code=zip,
+                country_code=country_code,
+                date=current_str,
+                status="pending",
+                retry_count=0,
+            )
+        current += timedelta(days=1)
+
+
+# Keeps the collection queue in line with the configured zipcodes and date range. Only
+# the (zip, date) items missing from the queue are written, and the progress totals are
+# moved by the same amount, so adding locations or extending the range is a delta insert.
+class QueueSeeder:
+    def __init__(
+        self,
+        dynamodb: DynamoDBOperations,
+        control_table_queue: str,
+        control_table_progress: str,
+        progress_counter: ShardedProgressCounter,
+        scan_segments: int = 4,
+        write_workers: int = 4,
+    ) -> None:
+        self.dynamodb = dynamodb
+        self.control_table_queue = control_table_queue
+        self.control_table_progress = control_table_progress
+        self.progressCounter = progress_counter
+        self.scan_segments = scan_segments
+        self.write_workers = write_workers
+
+    def seed(
+        self,
+        zipcodes: List[Any],
+        start_dt: date,
+        end_dt: date,
+        daily_call_limit: int,
+    ) -> int:
+        signature = seed_signature(zipcodes, start_dt, end_dt)
+        progress = self.dynamodb.get_item(
+            CollectionProgress, self.control_table_progress, {"job_id": "historical_collection"}
+        )
+        if progress is not None and progress.seed_signature == signature:
+            logger.info(f"{self.control_table_queue} already seeded for the configured range")
+            return 0
+
+        existing = {
+            key.item_id: key.status
+            for key in self.dynamodb.parallel_scan(
+                QueueItemKey,
+                self.control_table_queue,
+                self.scan_segments,
+                validation="trusted",
+                ProjectionExpression="item_id, #status",
+                ExpressionAttributeNames={"#status": "status"},
+            )
+        }
+        missing = [
+            item
+            for item in iter_queue_items(zipcodes, start_dt, end_dt)
+            if item.item_id not in existing
+        ]
+        logger.info(
+            f"Found {len(existing)} queued items, seeding {len(missing)} missing items "
+            f"into {self.control_table_queue}"
+        )
+        # conditional inserts never overwrite an item another seeder or a collector has
+        # already written, and only the items this run actually inserted move the totals
+        inserted = 0
+        if missing:
+            inserted = self.dynamodb.parallel_put_new_items(
+                missing, self.control_table_queue, "item_id", max_workers=self.write_workers
+            )
+
+        if progress is None:
+            # collectors may already have counted completions on the shards, which stay as
+            # they are and are taken out of the base completed count instead
+            completed_on_shards = sum(
+                shard.completed_items for shard in self.progressCounter.shards()
+            )
+            completed = sum(1 for status in existing.values() if status == "completed")
+            completed = max(0, completed - completed_on_shards)
+            total = len(existing) + inserted
+            created = self.dynamodb.put_item(
+                CollectionProgress(
+                    job_id="historical_collection",
+                    zipcodes=zipcodes,
+                    total_items=total,
+                    completed_items=completed,
+                    remaining_items=total - completed,
+                    daily_calls_limit=daily_call_limit,
+                    daily_calls_used=0,
+                    status="in_progress",
+                    seed_signature=signature,
+                ),
+                self.control_table_progress,
+                condition_expression=Attr("job_id").not_exists(),
+            )
+            if created:
+                logger.info(f"Inserted initial record into {self.control_table_progress}")
+                return inserted
+            logger.info(f"{self.control_table_progress} was initialised by a concurrent seed")
+
+        # ADD keeps totals correct while collectors are updating the same record
+        self.dynamodb.update_item(
+            table_nm=self.control_table_progress,
+            key={"job_id": "historical_collection"},
+            update_expression="ADD total_items :added, remaining_items :added "
+            "SET zipcodes = :zipcodes, seed_signature = :signature",
+            expression_attrib_values={
+                ":added": inserted,
+                ":zipcodes": zipcodes,
+                ":signature": signature,
+            },
+        )
+        logger.info(f"Added {inserted} items to totals in {self.control_table_progress}")
+        return inserted
@@ -0,0 +1,138 @@
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+from openweather_pipeline.dynamodb_operations import DynamoDBOperations
+from openweather_pipeline.logger import get_logger
+from openweather_pipeline.models.collection_models import CollectionProgress
+
+logger = get_logger(__name__)
+
+
+class QuotaExceededError(Exception):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second: float, burst: int) -> None:
+        if rate_per_second <= 0:
+            raise ValueError(f"rate_per_second must be positive, got {rate_per_second}")
+        self.rate = rate_per_second
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 1) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# Daily API call budget shared by all collectors through the progress table. Calls are
+# reserved from DynamoDB in blocks and handed out locally, so concurrent workers only
+# touch the progress record once per block.
+class QuotaLedger:
+    def __init__(
+        self,
+        dynamodb: DynamoDBOperations,
+        table_nm: str,
+        daily_limit: int,
+        block_size: int,
+        job_id: str = "historical_collection",
+    ) -> None:
+        self.dynamodb = dynamodb
+        self.table_nm = table_nm
+        self.daily_limit = daily_limit
+        self.block_size = max(1, block_size)
+        self.job_id = job_id
+        self._available = 0
+        self._day: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def reserve(self) -> None:
+        with self._lock:
+            today = datetime.now().strftime("%Y-%m-%d")
+            if self._day != today:
+                # calls reserved on a previous day count against that day only
+                self._available = 0
+                self._day = today
+            if self._available == 0:
+                self._available = self._reserve_block(today)
+            self._available -= 1
+
+    def release(self) -> None:
+        with self._lock:
+            unused, day = self._available, self._day
+            self._available = 0
+            if unused == 0 or day is None:
+                return
+            try:
+                self.dynamodb.update_item(
+                    table_nm=self.table_nm,
+                    key={"job_id": self.job_id},
+                    update_expression="SET daily_calls_used = daily_calls_used - :unused",
+                    condition_expression=Attr("last_run").eq(day)
+                    & Attr("daily_calls_used").gte(unused),
+                    expression_attrib_values={":unused": unused},
+                )
+                logger.info(f"Released {unused} unused API calls back to {self.table_nm}")
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+                logger.info(f"Skipping release of {unused} API calls reserved on {day}")
+
+    def _reserve_block(self, today: str) -> int:
+        block = min(self.block_size, self.daily_limit)
+        while block > 0:
+            try:
+                self.dynamodb.update_item(
+                    table_nm=self.table_nm,
+                    key={"job_id": self.job_id},
+                    update_expression="SET daily_calls_used = daily_calls_used + :block",
+                    condition_expression=Attr("last_run").eq(today)
+                    & Attr("daily_calls_used").lte(self.daily_limit - block),
+                    expression_attrib_values={":block": block},
+                )
+                logger.info(f"Reserved block of {block} API calls for {today}")
+                return block
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+            try:
+                # first reservation of the day resets the counter
+                self.dynamodb.update_item(
+                    table_nm=self.table_nm,
+                    key={"job_id": self.job_id},
+                    update_expression="SET daily_calls_used = :block, last_run = :today",
+                    condition_expression=Attr("job_id").exists()
+                    & (Attr("last_run").not_exists() | Attr("last_run").ne(today)),
+                    expression_attrib_values={":block": block, ":today": today},
+                )
+                logger.info(f"Started daily API quota for {today} with block of {block}")
+                return block
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+            block = min(block, self.daily_limit - self._calls_used(today))
+        logger.info(f"Daily limit of {self.daily_limit} API calls reached for {today}")
+        raise QuotaExceededError(f"Daily limit of {self.daily_limit} API calls reached")
+
+    def _calls_used(self, today: str) -> int:
+        progress = self.dynamodb.get_item(
+            CollectionProgress, self.table_nm, {"job_id": self.job_id}
+        )
+        if not progress:
+            raise ValueError(f"Unable to find {self.table_nm} record for job_id {self.job_id}")
+        if progress.last_run != today:
+            return 0
+        return progress.daily_calls_used
@@ -0,0 +1,161 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+from boto3.dynamodb.conditions import Attr
+from openweather_pipeline.coverage_index import CoverageIndex
+from openweather_pipeline.dynamodb_operations import (
+    TRANSACT_MAX_ITEMS,
+    DynamoDBOperations,
+    ItemUpdate,
+)
+from openweather_pipeline.logger import get_logger
+from openweather_pipeline.models.collection_models import QueueItemKey, ReconciliationSummary
+from openweather_pipeline.progress_counters import ShardedProgressCounter
+from openweather_pipeline.s3_keys import parse_partition_values
+from openweather_pipeline.s3_operations import S3Operations
+
+logger = get_logger(__name__)
+
+
+def item_id_from_key(key: str, default_country_code: str = "US") -> Optional[str]:
+    values = parse_partition_values(key)
+    if not {"year", "month", "day", "zip_code"} <= values.keys():
+        return None
+    country_code = values.get("country_code", default_country_code)
+    return f"{values['zip_code']}#{country_code}#{values['year']}-{values['month']}-{values['day']}"
+
+
+# Brings the queue and progress counters in line with the raw objects in S3. The queue
+# is read once with a parallel scan, the diff against the S3 listing (or the stored layer
+# of a coverage index) is computed in memory, only items that actually change are written
+# in parallel transactional batches, and the progress record is set once at the end.
+class QueueReconciler:
+    def __init__(
+        self,
+        s3Operations: S3Operations,
+        dynamodb: DynamoDBOperations,
+        control_table_queue: str,
+        control_table_progress: str,
+        progress_counter: ShardedProgressCounter,
+        scan_segments: int = 4,
+        write_workers: int = 4,
+        default_country_code: str = "US",
+    ) -> None:
+        self.s3Operations = s3Operations
+        self.dynamodb = dynamodb
+        self.control_table_queue = control_table_queue
+        self.control_table_progress = control_table_progress
+        self.progressCounter = progress_counter
+        self.scan_segments = scan_segments
+        self.write_workers = write_workers
+        self.default_country_code = default_country_code
+
+    def reconcile(
+        self,
+        source_prefix: str,
+        dry_run: bool = False,
+        coverage_index: Optional[CoverageIndex] = None,
+    ) -> ReconciliationSummary:
+        stored: Set[str] = set()
+        objects_listed = 0
+        if coverage_index is not None:
+            # the stored layer of an index kept current by incremental refreshes stands in
+            # for a full listing of the source prefix
+            stored = coverage_index.stored_item_ids()
+            logger.info(f"Took {len(stored)} stored days from the coverage index")
+        else:
+            for obj in self.s3Operations.iter_objects_parallel(source_prefix, "json"):
+                objects_listed += 1
+                item_id = item_id_from_key(obj.key, self.default_country_code)
+                if item_id is None:
+                    logger.warning(f"Skipping object without partition values {obj.key}")
+                    continue
+                stored.add(item_id)
+
+        queue: Dict[str, str] = {
+            key.item_id: key.status
+            for key in self.dynamodb.parallel_scan(
+                QueueItemKey,
+                self.control_table_queue,
+                self.scan_segments,
+                validation="trusted",
+                ProjectionExpression="item_id, #status",
+                ExpressionAttributeNames={"#status": "status"},
+            )
+        }
+        to_complete = sorted(
+            item_id for item_id in stored if queue.get(item_id, "completed") != "completed"
+        )
+        not_queued = stored.difference(queue)
+        if not_queued:
+            logger.warning(
+                f"{len(not_queued)} stored days have no queue item, e.g. {min(not_queued)}"
+            )
+        logger.info(
+            f"Listed {objects_listed} objects for {len(stored)} days, {len(queue)} queue items, "
+            f"{len(to_complete)} to complete"
+        )
+
+        failed: List[str] = []
+        if to_complete and not dry_run:
+            failed = self._complete(to_complete)
+        already_completed = sum(1 for status in queue.values() if status == "completed")
+        # a dry run reports the counters the transitions would produce
+        transitioned = len(to_complete) - len(failed)
+        summary = ReconciliationSummary(
+            objects_listed=objects_listed,
+            stored_days=len(stored),
+            queue_items=len(queue),
+            to_complete=len(to_complete),
+            transitioned=0 if dry_run else transitioned,
+            failed=len(failed),
+            not_queued=len(not_queued),
+            total_items=len(queue),
+            completed_items=already_completed + transitioned,
+        )
+        summary.remaining_items = summary.total_items - summary.completed_items
+        if not dry_run:
+            self._set_progress(summary)
+        logger.info(f"Reconciliation {'dry run ' if dry_run else ''}summary: {summary}")
+        return summary
+
+    def _complete(self, item_ids: List[str]) -> List[str]:
+        now = datetime.now().isoformat()
+        updates = [
+            ItemUpdate(
+                key={"item_id": item_id},
+                update_expression="SET #status = :completed, completed_at = :now "
+                "REMOVE lease_expires_at, next_attempt_at",
+                expression_attrib_values={":completed": "completed", ":now": now},
+                condition_expression=Attr("status").ne("completed") & Attr("item_id").exists(),
+                expression_attrib_names={"#status": "status"},
+            )
+            for item_id in item_ids
+        ]
+        chunks = []
+        for start in range(0, len(updates), TRANSACT_MAX_ITEMS):
+            end = start + TRANSACT_MAX_ITEMS
+            chunks.append((start, updates[start:end]))
+
+        def complete_chunk(start: int, chunk: List[ItemUpdate]) -> List[str]:
+            failures = self.dynamodb.transact_update_items(self.control_table_queue, chunk)
+            # a failed condition means a collector completed the item in the meantime
+            return [
+                item_ids[start + index]
+                for index, code in failures.items()
+                if code != "ConditionalCheckFailed"
+            ]
+
+        with ThreadPoolExecutor(max_workers=max(1, self.write_workers)) as executor:
+            results = list(executor.map(lambda chunk: complete_chunk(*chunk), chunks))
+        failed = [item_id for result in results for item_id in result]
+        for item_id in failed:
+            logger.error(f"Unable to complete item_id :{item_id} in {self.control_table_queue}")
+        return failed
+
+    def _set_progress(self, summary: ReconciliationSummary) -> None:
+        # shard deltas added by collectors while the totals are set are kept, see set_totals
+        self.progressCounter.set_totals(
+            summary.total_items, summary.completed_items, summary.remaining_items
+        )
+        logger.info(f"Set progress counters in {self.control_table_progress}")
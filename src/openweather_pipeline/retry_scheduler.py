@@ -0,0 +1,186 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+import requests
+from boto3.dynamodb.conditions import Attr, ConditionBase
+from botocore.exceptions import ClientError
+from openweather_pipeline.dynamodb_operations import DynamoDBOperations
+from openweather_pipeline.http_transport import CircuitOpenError
+from openweather_pipeline.logger import get_logger
+from openweather_pipeline.models.collection_models import CollectionQueueItem
+from openweather_pipeline.rate_limiter import QuotaExceededError
+
+logger = get_logger(__name__)
+
+DEFAULT_BACKOFF_SECONDS = {"transient": 300, "rate_limited": 3600, "data": 21600, "auth": 21600}
+
+AUTH_STATUS_CODES = {401, 403}
+
+THROTTLING_ERROR_CODES = {
+    "ProvisionedThroughputExceededException",
+    "RequestLimitExceeded",
+    "SlowDown",
+    "ThrottlingException",
+}
+
+
+def classify_failure(error: BaseException) -> str:
+    current: Optional[BaseException] = error
+    while current is not None:
+        if isinstance(current, CircuitOpenError):
+            # a rejected API key is not a rate limit, those retries have to spend attempts
+            return "auth" if current.cause == "auth" else "rate_limited"
+        if isinstance(current, QuotaExceededError):
+            return "rate_limited"
+        if isinstance(current, requests.exceptions.HTTPError) and current.response is not None:
+            if current.response.status_code in AUTH_STATUS_CODES:
+                return "auth"
+            if current.response.status_code == 429:
+                return "rate_limited"
+            if current.response.status_code >= 500:
+                return "transient"
+            return "data"
+        if isinstance(current, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+            return "transient"
+        if isinstance(current, ClientError):
+            if current.response.get("Error", {}).get("Code") in THROTTLING_ERROR_CODES:
+                return "rate_limited"
+            return "transient"
+        if isinstance(current, ValueError):
+            # unexpected payloads and missing coordinates rarely fix themselves quickly
+            return "data"
+        current = current.__cause__ or current.__context__
+    return "transient"
+
+
+# Schedules failed queue items for another attempt. Each failure class backs off
+# exponentially from its own base delay, the retry is due once next_attempt_at has passed,
+# and items that used up retry_attempts are parked as dead_letter. Rate limited failures
+# are rescheduled without spending an attempt since they say nothing about the item.
+class RetryScheduler:
+    def __init__(
+        self,
+        dynamodb: DynamoDBOperations,
+        table_nm: str,
+        max_attempts: int = 3,
+        backoff_seconds: Optional[Dict[str, int]] = None,
+        backoff_max_seconds: int = 86400,
+    ) -> None:
+        self.dynamodb = dynamodb
+        self.table_nm = table_nm
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_seconds = {**DEFAULT_BACKOFF_SECONDS, **(backoff_seconds or {})}
+        self.backoff_max_seconds = backoff_max_seconds
+
+    def next_attempt_at(self, failure_class: str, retry_count: int, now: datetime) -> str:
+        base = self.backoff_seconds.get(failure_class, self.backoff_seconds["transient"])
+        delay = min(base * 2**retry_count, self.backoff_max_seconds)
+        return (now + timedelta(seconds=delay)).isoformat()
+
+    def record_failure(self, item_id: str, error: BaseException, retry_count: int = 0) -> str:
+        failure_class = classify_failure(error)
+        now = datetime.now()
+        values = {
+            ":failed": "failed",
+            ":error": str(error)[:1000],
+            ":class": failure_class,
+            ":next": self.next_attempt_at(failure_class, retry_count, now),
+            ":now": now.isoformat(),
+        }
+        open_statuses = Attr("status").is_in(["pending", "in_progress"])
+        try:
+            if failure_class == "rate_limited":
+                self._update(
+                    item_id,
+                    "SET #status = :failed, error_message = :error, failure_class = :class, "
+                    "next_attempt_at = :next, last_attempt = :now REMOVE lease_expires_at",
+                    values,
+                    open_statuses,
+                )
+                logger.info(f"Rescheduled rate limited item_id :{item_id} for {values[':next']}")
+                return "failed"
+            try:
+                self._update(
+                    item_id,
+                    "SET #status = :failed, retry_count = retry_count + :inc, "
+                    "error_message = :error, failure_class = :class, next_attempt_at = :next, "
+                    "last_attempt = :now REMOVE lease_expires_at",
+                    {**values, ":inc": 1},
+                    open_statuses & Attr("retry_count").lt(self.max_attempts - 1),
+                )
+                logger.info(f"Scheduled retry of item_id :{item_id} for {values[':next']}")
+                return "failed"
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+            # the last attempt failed, park the item instead of scheduling it again
+            self._update(
+                item_id,
+                "SET #status = :dead_letter, retry_count = retry_count + :inc, "
+                "error_message = :error, failure_class = :class, last_attempt = :now "
+                "REMOVE lease_expires_at, next_attempt_at",
+                {
+                    ":dead_letter": "dead_letter",
+                    ":inc": 1,
+                    ":error": values[":error"],
+                    ":class": failure_class,
+                    ":now": values[":now"],
+                },
+                open_statuses,
+            )
+            logger.error(f"Item_id :{item_id} moved to dead_letter after {self.max_attempts} tries")
+            return "dead_letter"
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                logger.info(f"Skipping failure of item_id :{item_id} as it is already completed")
+                return "completed"
+            logger.error(f"Error recording failure of item_id :{item_id},{e}", exc_info=True)
+            raise
+
+    def due_items(self, limit: int) -> List[CollectionQueueItem]:
+        if limit <= 0:
+            return []
+        items = list(
+            self.dynamodb.iter_query(
+                CollectionQueueItem,
+                self.table_nm,
+                "#status = :failed AND next_attempt_at <= :now",
+                {"#status": "status"},
+                {":failed": "failed", ":now": datetime.now().isoformat()},
+                index_name="status-next-attempt-index",
+                limit=limit,
+                validation="trusted",
+            )
+        )
+        if len(items) < limit:
+            # items failed before retries were scheduled have no next_attempt_at, so the
+            # sparse index never holds them; they are due right away
+            items.extend(
+                self.dynamodb.iter_query(
+                    CollectionQueueItem,
+                    self.table_nm,
+                    "#status = :failed",
+                    {"#status": "status"},
+                    {":failed": "failed"},
+                    index_name="status-date-index",
+                    limit=limit - len(items),
+                    validation="trusted",
+                    FilterExpression="attribute_not_exists(next_attempt_at)",
+                )
+            )
+        return items
+
+    def _update(
+        self,
+        item_id: str,
+        update_expression: str,
+        values: Dict[str, Any],
+        condition: ConditionBase,
+    ) -> None:
+        self.dynamodb.update_item(
+            table_nm=self.table_nm,
+            key={"item_id": item_id},
+            update_expression=update_expression,
+            condition_expression=condition,
+            expression_attrib_values=values,
+            expression_attrib_names={"#status": "status"},
+        )
@@ -0,0 +1,95 @@
+import threading
+from typing import Optional
+import requests
+from botocore.exceptions import ClientError, NoCredentialsError, CredentialRetrievalError
+from openweather_pipeline.config_manager import get_config
+from openweather_pipeline.dynamodb_operations import DynamoDBOperations
+from openweather_pipeline.logger import get_logger
+from openweather_pipeline.weather_data_collector import WeatherDataCollector
+
+logger = get_logger(__name__)
+
+STALE_CLIENT_ERROR_CODES = {
+    "ExpiredToken",
+    "ExpiredTokenException",
+    "InvalidAccessKeyId",
+    "InvalidClientTokenId",
+    "RequestExpired",
+    "SignatureDoesNotMatch",
+    "UnrecognizedClientException",
+}
+
+
+def is_stale_client_error(error: BaseException) -> bool:
+    # S3Operations and friends wrap boto errors, so walk the whole exception chain
+    current: Optional[BaseException] = error
+    while current is not None:
+        if isinstance(current, (NoCredentialsError, CredentialRetrievalError)):
+            return True
+        if isinstance(current, ClientError):
+            if current.response.get("Error", {}).get("Code") in STALE_CLIENT_ERROR_CODES:
+                return True
+        if isinstance(current, requests.exceptions.HTTPError):
+            # the API key was rotated in SSM
+            if current.response is not None and current.response.status_code == 401:
+                return True
+        current = current.__cause__ or current.__context__
+    return False
+
+
+# Objects built once per Lambda container and reused by warm invocations
+class RuntimeContext:
+    _collector: Optional[WeatherDataCollector] = None
+    _dynamodb: Optional[DynamoDBOperations] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_collector(cls) -> WeatherDataCollector:
+        with cls._lock:
+            if cls._collector is None:
+                logger.info("Instantiating WeatherDataCollector for this container")
+                cls._collector = WeatherDataCollector()
+            else:
+                logger.info("Reusing WeatherDataCollector from warm container")
+            return cls._collector
+
+    @classmethod
+    def get_dynamodb(cls) -> DynamoDBOperations:
+        with cls._lock:
+            if cls._dynamodb is None:
+                region = get_config().config.get("aws", {}).get("region", "us-east-1")
+                cls._dynamodb = DynamoDBOperations(region)
+            return cls._dynamodb
+
+    @classmethod
+    def invalidate(cls, reason: str) -> None:
+        logger.warning(f"Invalidating runtime context: {reason}")
+        with cls._lock:
+            if cls._collector is not None:
+                cls._collector.close()
+            cls._collector = None
+            cls._dynamodb = None
+        get_config().invalidate_api_key()
+
+    @classmethod
+    def invalidate_on_error(cls, error: BaseException) -> bool:
+        if is_stale_client_error(error):
+            cls.invalidate(str(error))
+            return True
+        return False
+
+
+def get_collector() -> WeatherDataCollector:
+    return RuntimeContext.get_collector()
+
+
+def get_dynamodb() -> DynamoDBOperations:
+    return RuntimeContext.get_dynamodb()
+
+
+def invalidate_runtime(reason: str) -> None:
+    RuntimeContext.invalidate(reason)
+
+
+def invalidate_on_error(error: BaseException) -> bool:
+    return RuntimeContext.invalidate_on_error(error)
@@ -0,0 +1,84 @@
+import gzip
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from openweather_pipeline.logger import get_logger
+from openweather_pipeline.payload_encoding import decode_payload
+from openweather_pipeline.s3_operations import S3ObjectInfo, S3Operations
+
+logger = get_logger(__name__)
+
+INVENTORY_HEADER = "key\tsize\tetag\tlast_modified"
+
+
+class InventoryDiff(NamedTuple):
+    added: List[S3ObjectInfo]
+    changed: List[S3ObjectInfo]
+    removed: List[str]
+
+
+# A snapshot of the objects under a prefix, stored as a gzipped tab separated listing
+# sorted by key. Later runs list once, diff against the previous snapshot and only act
+# on what was added, changed or removed.
+class S3Inventory:
+    def __init__(self, objects: Optional[Iterable[S3ObjectInfo]] = None) -> None:
+        self.objects: Dict[str, S3ObjectInfo] = {obj.key: obj for obj in objects or []}
+
+    def __len__(self) -> int:
+        return len(self.objects)
+
+    @classmethod
+    def build(
+        cls,
+        s3Operations: S3Operations,
+        source_prefix: str,
+        extension: str = "json",
+        max_workers: int = 8,
+    ) -> "S3Inventory":
+        return cls(s3Operations.iter_objects_parallel(source_prefix, extension, max_workers))
+
+    def diff(self, previous: "S3Inventory") -> InventoryDiff:
+        added: List[S3ObjectInfo] = []
+        changed: List[S3ObjectInfo] = []
+        for key in sorted(self.objects):
+            obj = self.objects[key]
+            earlier = previous.objects.get(key)
+            if earlier is None:
+                added.append(obj)
+            elif earlier.etag != obj.etag or earlier.size != obj.size:
+                changed.append(obj)
+        removed = sorted(key for key in previous.objects if key not in self.objects)
+        return InventoryDiff(added, changed, removed)
+
+    def to_bytes(self) -> bytes:
+        lines = [INVENTORY_HEADER]
+        for key in sorted(self.objects):
+            obj = self.objects[key]
+            lines.append(f"{obj.key}\t{obj.size}\t{obj.etag}\t{obj.last_modified.isoformat()}")
+        return gzip.compress("\n".join(lines).encode("utf-8"))
+
+    @classmethod
+    def from_bytes(cls, content: bytes) -> "S3Inventory":
+        lines = decode_payload(content).decode("utf-8").split("\n")
+        if lines[0] != INVENTORY_HEADER:
+            raise ValueError(f"Unexpected inventory header {lines[0]!r}")
+        objects = []
+        for line in lines[1:]:
+            key, size, etag, last_modified = line.split("\t")
+            objects.append(
+                S3ObjectInfo(key, int(size), etag, datetime.fromisoformat(last_modified))
+            )
+        return cls(objects)
+
+    def save(self, s3Operations: S3Operations, key: str) -> None:
+        content = self.to_bytes()
+        s3Operations.put_bytes(
+            key, content, content_type="text/tab-separated-values", content_encoding="gzip"
+        )
+        logger.info(f"Saved inventory of {len(self)} objects ({len(content)} bytes) to {key}")
+
+    @classmethod
+    def load(cls, s3Operations: S3Operations, key: str) -> "S3Inventory":
+        if not s3Operations.object_exists(key):
+            logger.info(f"No inventory found at {key}, starting a new one")
+            return cls()
+        return cls.from_bytes(s3Operations.read_file_as_bytes(key))
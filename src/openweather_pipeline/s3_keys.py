@@ -0,0 +1,36 @@
+from typing import Dict, Optional
+
+
+def build_raw_object_key(prefix: str, country_code: str, zip_code: str, date: str) -> str:
+    # one object per (country, zip, date) so retries and re-runs overwrite instead of duplicating
+    year, month, day = date.split("-")
+    return (
+        f"{prefix}/year={year}/month={month}/day={day}/"
+        f"country_code={country_code}/zip_code={zip_code}/"
+        f"{country_code}_{zip_code}_{date}.json"
+    )
+
+
+def parse_partition_values(key: str) -> Dict[str, str]:
+    # picks up every name=value path segment, so it does not depend on segment positions
+    values: Dict[str, str] = {}
+    for segment in key.split("/")[:-1]:
+        name, separator, value = segment.partition("=")
+        if separator and name and value:
+            values[name] = value
+    return values
+
+
+def repartitioned_raw_key(key: str, default_country_code: str = "US") -> Optional[str]:
+    # maps a raw key of any earlier layout onto year=/month=/day=/country_code=/zip_code=,
+    # keeping the prefix before year= and the file name
+    values = parse_partition_values(key)
+    if not {"year", "month", "day", "zip_code"} <= values.keys():
+        return None
+    prefix = key.split("/year=")[0]
+    file_name = key.rsplit("/", 1)[-1]
+    country_code = values.get("country_code", default_country_code)
+    return (
+        f"{prefix}/year={values['year']}/month={values['month']}/day={values['day']}/"
+        f"country_code={country_code}/zip_code={values['zip_code']}/{file_name}"
+    )
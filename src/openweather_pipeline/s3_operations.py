@@ -1,20 +1,68 @@
 import boto3
-import json
+import io
+import queue
+import threading
+import pyarrow as pa
+from botocore.config import Config
 from botocore.exceptions import ClientError
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 
-import pandas as pd
-from typing import List, Dict, Any, Optional, cast
+from typing import (
+    Callable,
+    Deque,
+    Iterable,
+    Iterator,
+    List,
+    Dict,
+    Any,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+    cast,
+)
+from openweather_pipeline.json_codec import STDLIB_CODEC, JsonCodec
 from openweather_pipeline.logger import get_logger
+from openweather_pipeline.models.dataset_models import RepartitionCheckpoint
+from openweather_pipeline.s3_keys import parse_partition_values
+from openweather_pipeline.payload_encoding import decode_payload, encode_payload
+from openweather_pipeline.parquet_writer import S3MultipartUpload, StreamingParquetWriter
+from openweather_pipeline.weather_schema import DAILY_WEATHER_SCHEMA, flatten_day_summaries
 
 logger = get_logger(__name__)
 
+FETCH_PROGRESS_INTERVAL = 1000
+COPY_PROGRESS_INTERVAL = 1000
+
+
+class S3ObjectInfo(NamedTuple):
+    key: str
+    size: int
+    etag: str
+    last_modified: datetime
+
+
+def _object_info(obj: Dict[str, Any]) -> S3ObjectInfo:
+    return S3ObjectInfo(obj["Key"], obj["Size"], obj["ETag"].strip('"'), obj["LastModified"])
+
 
 class S3Operations:
-    def __init__(self, bucket: str, region: str) -> None:
+    def __init__(
+        self,
+        bucket: str,
+        region: str,
+        max_pool_connections: int = 10,
+        json_codec: Optional[JsonCodec] = None,
+    ) -> None:
         logger.info(f"Initializing S3Operations for bucket: {bucket}, region: {region}")
-        self.s3_client = boto3.client("s3", region_name=region)
+        self.s3_client = boto3.client(
+            "s3", region_name=region, config=Config(max_pool_connections=max_pool_connections)
+        )
         self.bucket = bucket
+        self.region = region
+        self.jsonCodec = json_codec or STDLIB_CODEC
         self._validate_bucket()
         logger.info("S3Operations validated successfully")
 
@@ -38,10 +86,22 @@ class S3Operations:
             logger.error("Bucket verification failed", exc_info=True)
             raise ValueError(f"Unexpected Error :{e}")
 
-    def read_file_as_bytes(self, key: str) -> bytes:
+    def object_exists(self, key: str) -> bool:
+        try:
+            self.s3_client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return False
+            logger.error(f"S3 Client Error for {key} :{str(e)}", exc_info=True)
+            raise
+
+    def read_file_as_bytes(self, key: str, decode: bool = True) -> bytes:
         try:
             response = self.s3_client.get_object(Bucket=self.bucket, Key=key)
             content = cast(bytes, response["Body"].read())
+            if decode and response.get("ContentEncoding") in ("gzip", "zstd"):
+                return decode_payload(content)
             return content
         except ClientError as e:
             logger.error(f"S3 Client Error for {key} :{str(e)}", exc_info=True)
@@ -50,49 +110,82 @@ class S3Operations:
             logger.error(f"Failed to read object in S3: {str(e)}", exc_info=True)
             raise
 
-    def store_object_in_s3(self, key: str, body: str, transfer: str = 'put') -> str:
+    def fetch_objects(self, keys: Iterable[str], max_workers: int) -> Iterator[Tuple[str, bytes]]:
+        # Yields (key, content) in input order. At most 2 * max_workers objects are in
+        # flight or buffered at once, so memory does not grow with the number of keys.
+        fetched = 0
+        fetched_bytes = 0
+        window: Deque[Tuple[str, Future]] = deque()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for key in keys:
+                window.append((key, executor.submit(self.read_file_as_bytes, key)))
+                if len(window) >= 2 * max_workers:
+                    done_key, future = window.popleft()
+                    content = future.result()
+                    fetched, fetched_bytes = fetched + 1, fetched_bytes + len(content)
+                    if fetched % FETCH_PROGRESS_INTERVAL == 0:
+                        logger.info(f"Fetched {fetched} objects ({fetched_bytes} bytes) so far")
+                    yield done_key, content
+            while window:
+                done_key, future = window.popleft()
+                content = future.result()
+                fetched, fetched_bytes = fetched + 1, fetched_bytes + len(content)
+                yield done_key, content
+        logger.info(f"Fetched {fetched} objects ({fetched_bytes} bytes) from s3://{self.bucket}")
+
+    def store_object_in_s3(
+        self,
+        key: str,
+        body: Union[str, bytes],
+        transfer: str = "put",
+        if_none_match: bool = False,
+        content_encoding: Optional[str] = None,
+    ) -> str:
         try:
             timestamp = datetime.now()
             logger.info(f"Storing object in S3: s3://{self.bucket}/{key}")
-            
-            if transfer=='upload_fileobj':
-                response= self.s3_client.upload_fileobj(
-                    Fileobj = body,
-                    Bucket=self.bucket,
-                    Key=key,
-                    ExtraArgs={
-                        "ContentType": "application/json",
-                        "Metadata": {
-                        "collection_time": timestamp.isoformat(),
-                        "source": "Openweather_api_response",
-                        }
-                    }
-                )
-            else:
-                response = self.s3_client.put_object(
+            # bytes are stored as given, so a raw API response is never parsed and re-encoded
+            content = body.encode("utf-8") if isinstance(body, str) else body
+            object_params: Dict[str, Any] = {
+                "ContentType": "application/json",
+                "Metadata": {
+                    "collection_time": timestamp.isoformat(),
+                    "source": "Openweather_api_response",
+                },
+            }
+            if content_encoding and content_encoding != "identity":
+                # keys keep their .json suffix, readers go by ContentEncoding and magic bytes
+                content = encode_payload(content, content_encoding)
+                object_params["ContentEncoding"] = content_encoding
+
+            if transfer == "upload_fileobj":
+                self.s3_client.upload_fileobj(
+                    Fileobj=io.BytesIO(content),
                     Bucket=self.bucket,
                     Key=key,
-                    Body=body,
-                    ContentType="application/json",
-                    Metadata={
-                        "collection_time": timestamp.isoformat(),
-                        "source": "Openweather_api_response",
-                    },
+                    ExtraArgs=object_params,
                 )
-                if response["ResponseMetadata"]["HTTPStatusCode"] == 200:
-                    logger.info(f"Successfully stored data for key {key} in S3")
-                    return key
-                else:
-                    logger.error(
-                        f"S3 Upload failed with status: \
-                            {response['ResponseMetadata']['HTTPStatusCode']}"
-                    )
-                    raise ValueError(
-                        f"Upload failed with status: {response['ResponseMetadata']['HTTPStatusCode']}"
-                    )
+                logger.info(f"Successfully stored data for key {key} in S3")
+                return key
+
+            if if_none_match:
+                # conditional write, S3 rejects it if the key already exists
+                object_params["IfNoneMatch"] = "*"
+            response = self.s3_client.put_object(
+                Bucket=self.bucket, Key=key, Body=content, **object_params
+            )
+            status_code = response["ResponseMetadata"]["HTTPStatusCode"]
+            if status_code == 200:
+                logger.info(f"Successfully stored data for key {key} in S3")
+                return key
+            logger.error(f"S3 Upload failed with status: {status_code}")
+            raise ValueError(f"Upload failed with status: {status_code}")
 
         except ClientError as e:
             error_code = e.response["Error"]["Code"]
+            if if_none_match and error_code == "PreconditionFailed":
+                logger.info(f"Object already exists in S3, keeping existing key {key}")
+                return key
             logger.error(
                 f"Failed to store object in S3. Error code: {str(error_code)}", exc_info=True
             )
@@ -101,42 +194,38 @@ class S3Operations:
             logger.error(f"Failed to store object in S3: {str(e)}", exc_info=True)
             raise ValueError(f"Unexpected upload error: {e}")
 
+    def open_multipart_upload(
+        self,
+        key: str,
+        part_size: int = 8 * 1024 * 1024,
+        content_type: str = "application/octet-stream",
+    ) -> S3MultipartUpload:
+        logger.info(f"Opening multipart upload to s3://{self.bucket}/{key}")
+        return S3MultipartUpload(
+            self.s3_client, self.bucket, key, part_size=part_size, content_type=content_type
+        )
+
     def read_and_save_json_files_to_parquet(
-        self, source_prefix: str, target_prefix: str, target_file: str
-    ) -> pd.DataFrame:
-        logger.info("Starting loading of JSON files from s3://{self.bucket}")
-        all_data: List[pd.DataFrame] = []
+        self,
+        source_prefix: str,
+        target_prefix: str,
+        target_file: str,
+        max_workers: int = 16,
+        row_group_size: int = 10000,
+        part_size: int = 8 * 1024 * 1024,
+    ) -> int:
+        logger.info(f"Starting loading of JSON files from s3://{self.bucket}")
         try:
             if not source_prefix.endswith("/"):
                 source_prefix += "/"
             logger.info(f"Searching for JSON files under {self.bucket}/{source_prefix}...")
 
-            paginator = self.s3_client.get_paginator("list_objects_v2")
-            pages = paginator.paginate(Bucket=self.bucket, Prefix=source_prefix)
-            for page in pages:
-                if "Contents" not in page:
-                    continue
-                for obj in page["Contents"]:
-                    key = obj["Key"]
-                    if not key.lower().endswith(".json") or key.endswith("/"):
-                        continue
-                    logger.info(f"Reading JSON file into dataframe for key {key}")
-                    response = self.s3_client.get_object(Bucket=self.bucket, Key=key)
-                    content = response["Body"].read().decode("utf-8")
-                    data = json.loads(content)
-                    data_flattened = self.flatten_data(key, data)
-
-                    key_parts = key.split("/")
-                    zip_code_part = key_parts[-2]
-                    country_code_part = key_parts[-3]
-                    zip_code = zip_code_part.split("=")[1]
-                    country_code = country_code_part.split("=")[1]
-                    data_flattened["zip_code"] = zip_code
-                    data_flattened["country_code"] = country_code
-                    logger.info(f"Completed reading JSON file into dataframe for key {key}")
-                    all_data.append(data_flattened)
+            keys = sorted(
+                obj.key for obj in self.iter_objects_parallel(source_prefix, "json", max_workers)
+            )
+            logger.info(f"Found {len(keys)} JSON files, fetching with {max_workers} workers")
 
-            if not all_data:
+            if not keys:
                 logger.error(
                     f"No data loaded for folder: {source_prefix} in bucket {self.bucket}",
                     exc_info=True,
@@ -145,55 +234,212 @@ class S3Operations:
                     f"No data loaded for folder: {source_prefix} in bucket {self.bucket}"
                 )
 
-            df = pd.DataFrame(all_data)
-            logger.info(f"Dataframe created with shape {df.shape}")
-            df.to_parquet(f"s3://{self.bucket}/{target_prefix}/{target_file}")
-            logger.info(f"Saved dataframe to s3://{self.bucket}/{target_prefix}/{target_file}")
+            return self.save_batches_to_parquet(
+                self.iter_flattened_batches(keys, max_workers),
+                f"{target_prefix}/{target_file}",
+                row_group_size=row_group_size,
+                part_size=part_size,
+            )
 
         except Exception as e:
-            logger.error(f"Failed to read JSON file {key}: {str(e)}", exc_info=True)
+            logger.error(f"Failed to save JSON under {source_prefix}: {str(e)}", exc_info=True)
             raise
 
+    def save_batches_to_parquet(
+        self,
+        batches: Iterable[pa.Table],
+        target_key: str,
+        row_group_size: int = 10000,
+        part_size: int = 8 * 1024 * 1024,
+    ) -> int:
+        with self.open_multipart_upload(target_key, part_size=part_size) as upload:
+            with StreamingParquetWriter(
+                upload, DAILY_WEATHER_SCHEMA, row_group_size=row_group_size
+            ) as writer:
+                writer.write_tables(batches)
+
+        logger.info(f"Saved {writer.rows_written} rows to s3://{self.bucket}/{target_key}")
+        return writer.rows_written
+
+    def iter_flattened_batches(
+        self, keys: Iterable[str], max_workers: int, batch_size: int = 1000
+    ) -> Iterator[pa.Table]:
+        # objects stored without a ContentEncoding header are recognised by magic bytes
+        yield from self.flatten_payload_batches(
+            (
+                (key, self.jsonCodec.loads(decode_payload(content)))
+                for key, content in self.fetch_objects(keys, max_workers)
+            ),
+            batch_size,
+        )
+
+    def flatten_payload_batches(
+        self, records: Iterable[Tuple[str, Dict[str, Any]]], batch_size: int = 1000
+    ) -> Iterator[pa.Table]:
+        # zip_code and country_code come from the partition values of each record's raw key
+        payloads: List[Dict[str, Any]] = []
+        zip_codes: List[Optional[str]] = []
+        country_codes: List[Optional[str]] = []
+        for key, payload in records:
+            partition_values = parse_partition_values(key)
+            payloads.append(payload)
+            zip_codes.append(partition_values.get("zip_code"))
+            country_codes.append(partition_values.get("country_code"))
+            if len(payloads) >= batch_size:
+                yield flatten_day_summaries(payloads, zip_codes, country_codes)
+                payloads, zip_codes, country_codes = [], [], []
+        if payloads:
+            yield flatten_day_summaries(payloads, zip_codes, country_codes)
+
     def flatten_data(self, key: str, data: Dict[str, Any]) -> Dict[str, Any]:
-        logger.info(f"starting flattening of JSON file ,key {key}")
         try:
-            flattened = {
-                "date": data.get("date"),
-                "cloud_cover": data.get("cloud_cover", {}).get("afternoon"),
-                "humidity": data.get("humidity", {}).get("afternoon"),
-                "precipitation": data.get("precipitation", {}).get("total"),
-                "pressure": data.get("pressure", {}).get("afternoon"),
-                "temperature": data.get("temperature", {}).get("afternoon"),
-                "temperature_min": data.get("temperature", {}).get("min"),
-                "temperature_max": data.get("temperature", {}).get("max"),
-                "wind_speed": data.get("wind", {}).get("max", {}).get("speed"),
-                "wind_direction": data.get("wind", {}).get("max", {}).get("direction"),
-            }
-            logger.info(f"flattening of JSON file ,key {key} completed")
+            flattened: Dict[str, Any] = flatten_day_summaries([data]).to_pylist()[0]
             return flattened
         except Exception as e:
             logger.error(f"Failed to flatten JSON object{key}: {str(e)}", exc_info=True)
             raise
 
-    def list_all_objects(self, source_prefix: str, extension: str) -> Optional[List[str]]:
-        logger.info("Starting listing of all files from s3://{self.bucket}")
-        all_data = []
-        try:
-            if not source_prefix.endswith("/"):
-                source_prefix += "/"
-            logger.info(f"Searching for .{extension} files under {self.bucket}/{source_prefix}...")
-            paginator = self.s3_client.get_paginator("list_objects_v2")
-            pages = paginator.paginate(Bucket=self.bucket, Prefix=source_prefix)
-            for page in pages:
-                if "Contents" not in page:
+    def iter_objects(
+        self, source_prefix: str, extension: str, start_after: Optional[str] = None
+    ) -> Iterator[S3ObjectInfo]:
+        if not source_prefix.endswith("/"):
+            source_prefix += "/"
+        list_params: Dict[str, Any] = {}
+        if start_after:
+            # keys are listed in ascending order, so a listing can resume after any key
+            list_params["StartAfter"] = start_after
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=source_prefix, **list_params):
+            for obj in page.get("Contents", []):
+                key = obj["Key"]
+                if not key.lower().endswith(f".{extension}") or key.endswith("/"):
                     continue
-                for obj in page["Contents"]:
-                    key = obj["Key"]
-                    uri: str = f"s3://{self.bucket}/{key}"
-                    if not key.lower().endswith(f".{extension}") or key.endswith("/"):
+                yield _object_info(obj)
+
+    def iter_objects_parallel(
+        self, source_prefix: str, extension: str, max_workers: int = 8, depth: int = 2
+    ) -> Iterator[S3ObjectInfo]:
+        # The year=/month= prefixes `depth` levels below source_prefix are discovered with
+        # delimiter listings and then paginated on their own threads. Pages come back through
+        # a bounded queue as they are read, so objects are yielded in no particular order.
+        if not source_prefix.endswith("/"):
+            source_prefix += "/"
+        prefixes, shallow = self._expand_prefixes(source_prefix, depth)
+        suffix = f".{extension}"
+        count = 0
+        for info in shallow:
+            if info.key.lower().endswith(suffix):
+                count += 1
+                yield info
+
+        pages: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, max_workers) * 2)
+        stop = threading.Event()
+        prefix_done = object()
+
+        def put(page: Any) -> bool:
+            while not stop.is_set():
+                try:
+                    pages.put(page, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def list_prefix(prefix: str) -> None:
+            try:
+                paginator = self.s3_client.get_paginator("list_objects_v2")
+                for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+                    if not put(page.get("Contents", [])):
+                        return
+            except Exception as e:
+                put(e)
+            finally:
+                put(prefix_done)
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            try:
+                for prefix in prefixes:
+                    executor.submit(list_prefix, prefix)
+                remaining = len(prefixes)
+                while remaining:
+                    page = pages.get()
+                    if page is prefix_done:
+                        remaining -= 1
                         continue
-                    logger.info(f"file added to list for key {key}")
-                    all_data.append(uri)
+                    if isinstance(page, Exception):
+                        raise page
+                    for obj in page:
+                        key = obj["Key"]
+                        if not key.lower().endswith(suffix) or key.endswith("/"):
+                            continue
+                        count += 1
+                        yield _object_info(obj)
+            finally:
+                stop.set()
+        logger.info(
+            f"Listed {count} .{extension} objects under {self.bucket}/{source_prefix} "
+            f"from {len(prefixes)} prefixes"
+        )
+
+    def _expand_prefixes(self, prefix: str, depth: int) -> Tuple[List[str], List[S3ObjectInfo]]:
+        # objects that sit above the expanded depth are returned as they are found
+        prefixes = [prefix]
+        shallow: List[S3ObjectInfo] = []
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        for _ in range(depth):
+            expanded: List[str] = []
+            for current in prefixes:
+                for page in paginator.paginate(Bucket=self.bucket, Prefix=current, Delimiter="/"):
+                    expanded.extend(p["Prefix"] for p in page.get("CommonPrefixes", []))
+                    shallow.extend(_object_info(obj) for obj in page.get("Contents", []))
+            prefixes = expanded
+        return prefixes, shallow
+
+    def put_bytes(
+        self,
+        key: str,
+        body: bytes,
+        content_type: str = "application/octet-stream",
+        content_encoding: Optional[str] = None,
+    ) -> str:
+        put_params: Dict[str, Any] = {}
+        if content_encoding:
+            put_params["ContentEncoding"] = content_encoding
+        try:
+            self.s3_client.put_object(
+                Bucket=self.bucket, Key=key, Body=body, ContentType=content_type, **put_params
+            )
+            return key
+        except ClientError as e:
+            logger.error(f"Failed to store object {key} in S3: {str(e)}", exc_info=True)
+            raise ValueError(f"S3 upload failed: {e.response['Error']['Code']}")
+
+    def delete_objects(self, keys: List[str]) -> None:
+        try:
+            # delete_objects accepts at most 1000 keys per request
+            for start in range(0, len(keys), 1000):
+                end = start + 1000
+                response = self.s3_client.delete_objects(
+                    Bucket=self.bucket,
+                    Delete={"Objects": [{"Key": key} for key in keys[start:end]], "Quiet": True},
+                )
+                errors = response.get("Errors", [])
+                if errors:
+                    raise ValueError(f"Failed to delete {len(errors)} objects: {errors[:5]}")
+            logger.info(f"Deleted {len(keys)} objects from s3://{self.bucket}")
+        except Exception as e:
+            logger.error(f"Failed to delete objects in {self.bucket}, {e}", exc_info=True)
+            raise
+
+    def list_all_objects(
+        self, source_prefix: str, extension: str, max_workers: int = 8
+    ) -> Optional[List[str]]:
+        logger.info(f"Starting listing of all files from s3://{self.bucket}")
+        try:
+            all_data = [
+                f"s3://{self.bucket}/{obj.key}"
+                for obj in self.iter_objects_parallel(source_prefix, extension, max_workers)
+            ]
             if not all_data:
                 logger.error(
                     f"No files listed under folder: {source_prefix} in bucket {self.bucket}",
@@ -226,3 +472,216 @@ class S3Operations:
         except Exception as e:
             logger.error(f"Failed to list objects under {self.bucket}, {e}", exc_info=True)
             raise
+
+    def copy_object_verified(
+        self,
+        source: S3ObjectInfo,
+        destination_bucket: str,
+        destination_key: str,
+        multipart_threshold: int = 64 * 1024 * 1024,
+        part_size: int = 64 * 1024 * 1024,
+    ) -> None:
+        copy_source = {"Bucket": self.bucket, "Key": source.key}
+        if source.size > multipart_threshold:
+            self._multipart_copy(
+                copy_source, source.size, destination_bucket, destination_key, part_size
+            )
+        else:
+            self.s3_client.copy_object(
+                CopySource=copy_source, Bucket=destination_bucket, Key=destination_key
+            )
+        head = self.s3_client.head_object(Bucket=destination_bucket, Key=destination_key)
+        etag = head["ETag"].strip('"')
+        # multipart ETags depend on the part layout, so those copies are checked by size only
+        same_etag = "-" in etag or "-" in source.etag or etag == source.etag
+        if head["ContentLength"] != source.size or not same_etag:
+            raise ValueError(
+                f"Copy of {self.bucket}/{source.key} to {destination_bucket}/{destination_key} "
+                f"does not match the source (size {head['ContentLength']}/{source.size}, "
+                f"etag {etag}/{source.etag})"
+            )
+
+    def _multipart_copy(
+        self,
+        copy_source: Dict[str, str],
+        size: int,
+        destination_bucket: str,
+        destination_key: str,
+        part_size: int,
+    ) -> None:
+        # UploadPartCopy keeps the bytes inside S3; the object headers are carried over
+        # explicitly since a multipart upload does not copy them
+        head = self.s3_client.head_object(Bucket=copy_source["Bucket"], Key=copy_source["Key"])
+        upload_params: Dict[str, Any] = {
+            "ContentType": head.get("ContentType", "application/octet-stream"),
+            "Metadata": head.get("Metadata", {}),
+        }
+        if head.get("ContentEncoding"):
+            upload_params["ContentEncoding"] = head["ContentEncoding"]
+        upload_id = self.s3_client.create_multipart_upload(
+            Bucket=destination_bucket, Key=destination_key, **upload_params
+        )["UploadId"]
+        try:
+            parts = []
+            for number, start in enumerate(range(0, size, part_size), start=1):
+                end = min(start + part_size, size) - 1
+                response = self.s3_client.upload_part_copy(
+                    Bucket=destination_bucket,
+                    Key=destination_key,
+                    UploadId=upload_id,
+                    PartNumber=number,
+                    CopySource=copy_source,
+                    CopySourceRange=f"bytes={start}-{end}",
+                )
+                parts.append({"PartNumber": number, "ETag": response["CopyPartResult"]["ETag"]})
+            self.s3_client.complete_multipart_upload(
+                Bucket=destination_bucket,
+                Key=destination_key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        except Exception:
+            self.s3_client.abort_multipart_upload(
+                Bucket=destination_bucket, Key=destination_key, UploadId=upload_id
+            )
+            raise
+
+    def repartition_objects(
+        self,
+        source_prefix: str,
+        key_mapper: Callable[[str], Optional[str]],
+        destination_bucket: Optional[str] = None,
+        checkpoint_key: Optional[str] = None,
+        delete_source: bool = False,
+        max_workers: int = 16,
+        multipart_threshold: int = 64 * 1024 * 1024,
+        part_size: int = 64 * 1024 * 1024,
+        checkpoint_interval: int = 1000,
+        restart: bool = False,
+    ) -> RepartitionCheckpoint:
+        # Copies every object under source_prefix to key_mapper(key) with server side copies
+        # on a thread pool. Results are consumed in listing order, so the checkpoint only
+        # ever records a key once everything before it is copied and verified, and an
+        # interrupted run resumes the listing after that key. With delete_source a source
+        # is deleted only after a saved checkpoint records it, so its copy is never lost.
+        destination_bucket = destination_bucket or self.bucket
+        checkpoint = RepartitionCheckpoint(
+            source_bucket=self.bucket,
+            source_prefix=source_prefix,
+            destination_bucket=destination_bucket,
+        )
+        if checkpoint_key and not restart:
+            previous = self._load_checkpoint(destination_bucket, checkpoint_key)
+            if previous is not None and (
+                previous.source_bucket,
+                previous.source_prefix,
+                previous.destination_bucket,
+            ) == (self.bucket, source_prefix, destination_bucket):
+                if previous.completed and not (delete_source and previous.pending_deletes):
+                    logger.info(f"Repartitioning already completed per {checkpoint_key}")
+                    return previous
+                checkpoint = previous
+                logger.info(f"Resuming repartitioning after {checkpoint.last_key}")
+
+        to_delete: List[str] = []
+
+        def delete_pending() -> None:
+            self.delete_objects(checkpoint.pending_deletes)
+            checkpoint.deleted += len(checkpoint.pending_deletes)
+            checkpoint.pending_deletes = []
+            if checkpoint_key:
+                self._save_checkpoint(destination_bucket, checkpoint_key, checkpoint)
+
+        def save_progress(completed: bool = False) -> None:
+            checkpoint.pending_deletes.extend(to_delete)
+            to_delete.clear()
+            checkpoint.completed = completed
+            if checkpoint_key:
+                self._save_checkpoint(destination_bucket, checkpoint_key, checkpoint)
+            if delete_source and checkpoint.pending_deletes:
+                delete_pending()
+
+        if delete_source and checkpoint.pending_deletes:
+            # deletes recorded by an interrupted run
+            delete_pending()
+
+        def consume(
+            obj: S3ObjectInfo, destination_key: Optional[str], future: Optional[Future]
+        ) -> None:
+            checkpoint.listed += 1
+            if future is None:
+                checkpoint.skipped += 1
+            else:
+                future.result()
+                checkpoint.copied += 1
+                checkpoint.bytes_copied += obj.size
+                moved = (destination_bucket, destination_key) != (self.bucket, obj.key)
+                if delete_source and moved:
+                    to_delete.append(obj.key)
+            checkpoint.last_key = obj.key
+            if checkpoint.listed % checkpoint_interval == 0:
+                save_progress()
+            if checkpoint.listed % COPY_PROGRESS_INTERVAL == 0:
+                logger.info(
+                    f"Repartitioned {checkpoint.listed} objects, copied {checkpoint.copied} "
+                    f"({checkpoint.bytes_copied} bytes), skipped {checkpoint.skipped}"
+                )
+
+        window: Deque[Tuple[S3ObjectInfo, Optional[str], Optional[Future]]] = deque()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            try:
+                for obj in self.iter_objects(source_prefix, "json", checkpoint.last_key):
+                    destination_key = key_mapper(obj.key)
+                    future: Optional[Future] = None
+                    if destination_key is not None and (
+                        destination_bucket != self.bucket or destination_key != obj.key
+                    ):
+                        future = executor.submit(
+                            self.copy_object_verified,
+                            obj,
+                            destination_bucket,
+                            destination_key,
+                            multipart_threshold,
+                            part_size,
+                        )
+                    window.append((obj, destination_key, future))
+                    if len(window) >= 4 * max_workers:
+                        consume(*window.popleft())
+                while window:
+                    consume(*window.popleft())
+            except Exception as e:
+                # keys after the checkpoint are copied again on the next run, which is harmless
+                executor.shutdown(wait=True, cancel_futures=True)
+                save_progress()
+                logger.error(
+                    f"Repartitioning of {self.bucket}/{source_prefix} stopped after "
+                    f"{checkpoint.last_key}: {e}",
+                    exc_info=True,
+                )
+                raise
+        save_progress(completed=True)
+        logger.info(
+            f"Repartitioned {checkpoint.listed} objects from {self.bucket}/{source_prefix} to "
+            f"{destination_bucket}: copied {checkpoint.copied} ({checkpoint.bytes_copied} bytes), "
+            f"skipped {checkpoint.skipped}, deleted {checkpoint.deleted}"
+        )
+        return checkpoint
+
+    def _load_checkpoint(self, bucket: str, key: str) -> Optional[RepartitionCheckpoint]:
+        try:
+            response = self.s3_client.get_object(Bucket=bucket, Key=key)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return None
+            logger.error(f"Failed to read checkpoint {bucket}/{key}: {e}", exc_info=True)
+            raise
+        return RepartitionCheckpoint.model_validate_json(response["Body"].read())
+
+    def _save_checkpoint(self, bucket: str, key: str, checkpoint: RepartitionCheckpoint) -> None:
+        checkpoint.updated_at = datetime.now().isoformat()
+        self.s3_client.put_object(
+            Bucket=bucket,
+            Key=key,
+            Body=checkpoint.model_dump_json().encode("utf-8"),
+            ContentType="application/json",
+        )
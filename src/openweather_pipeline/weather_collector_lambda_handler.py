@@ -1,4 +1,4 @@
-from openweather_pipeline.weather_data_collector import WeatherDataCollector
+from openweather_pipeline.runtime_context import get_collector, invalidate_on_error
 import json
 from typing import Dict, Any
 from openweather_pipeline.logger import get_logger
@@ -9,8 +9,7 @@ logger = get_logger(__name__)
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     logger.info("Weather collector Lambda function ")
     try:
-        logger.info("Instantiating WeatherDataCollector")
-        weatherCollector = WeatherDataCollector()
+        weatherCollector = get_collector()
 
         zip_code = event.get("zip_code")
         country_code = event.get("country_code")
@@ -18,7 +17,16 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         item_id = event.get("item_id")
 
         if zip_code and country_code and date and item_id:
-            weatherCollector.collect_weather_data(zip_code, country_code, date, item_id)
+            weatherCollector.apiManager.circuit_breaker.reset()
+            # one item needs one or two calls, so none are held back from other collectors
+            with weatherCollector.apiManager.quota_blocks(1):
+                weatherCollector.collect_weather_data(
+                    zip_code,
+                    country_code,
+                    date,
+                    item_id,
+                    retry_count=int(event.get("retry_count") or 0),
+                )
         else:
             raise ValueError(
                 f"Missing value for zipcode:{zip_code} "
@@ -39,6 +47,40 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         }
     except Exception as e:
         logger.error(f"Error in lambda handler : {str(e)}", exc_info=True)
+        invalidate_on_error(e)
+        return {
+            "statusCode": 500,
+            "body": json.dumps({"error": str(e)}),
+        }
+
+
+def batch_lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    logger.info("Weather collector batch Lambda function")
+    try:
+        items = event.get("items")
+        if not isinstance(items, list):
+            raise ValueError(f"Expected list of queue items in event, got {type(items)}")
+
+        weatherCollector = get_collector()
+        results = weatherCollector.collect_batch(items, on_error=invalidate_on_error)
+        completed = sum(1 for result in results if result.status == "completed")
+        skipped = sum(1 for result in results if result.status == "skipped")
+        return {
+            "statusCode": 200,
+            "body": json.dumps(
+                {
+                    "message": "Weather data batch collection complete",
+                    "count": len(results),
+                    "completed": completed,
+                    "failed": len(results) - completed - skipped,
+                    "skipped": skipped,
+                    "results": [result.model_dump() for result in results],
+                }
+            ),
+        }
+    except Exception as e:
+        logger.error(f"Error in batch lambda handler : {str(e)}", exc_info=True)
+        invalidate_on_error(e)
         return {
             "statusCode": 500,
             "body": json.dumps({"error": str(e)}),
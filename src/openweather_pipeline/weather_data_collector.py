@@ -1,20 +1,37 @@
 from openweather_pipeline.api_manager import APIManager
+from openweather_pipeline.geocode_cache import GeocodeCache
+from openweather_pipeline.http_transport import TransportConfig
+from openweather_pipeline.json_codec import get_json_codec
+from openweather_pipeline.progress_counters import ShardedProgressCounter
+from openweather_pipeline.rate_limiter import QuotaLedger, TokenBucket
+from openweather_pipeline.retry_scheduler import RetryScheduler
 from openweather_pipeline.s3_operations import S3Operations
-from openweather_pipeline.dynamodb_operations import DynamoDBOperations
-import json
+from openweather_pipeline.s3_keys import build_raw_object_key
+from openweather_pipeline.weather_schema import extract_raw_date
+from openweather_pipeline.dynamodb_operations import DynamoDBOperations, ItemUpdate
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
 from openweather_pipeline.logger import get_logger
 from openweather_pipeline.config_manager import get_config
-from openweather_pipeline.models.collection_models import CollectionGeocodeCache
+from openweather_pipeline.models.collection_models import (
+    CollectionGeocodeCache,
+    CollectionItemResult,
+    CollectionQueueItem,
+)
 from decimal import Decimal
 from boto3.dynamodb.conditions import Attr
 from botocore.exceptions import ClientError
-import uuid
 
 logger = get_logger(__name__)
 
 
 class WeatherDataCollector:
+    # the batch pool outlives collect_batch, so warm invocations reuse its threads and the
+    # per-thread boto3 resources they built
+    _executor: Optional[ThreadPoolExecutor] = None
+    _executor_workers: int = 0
+
     def __init__(self) -> None:
         logger.info("Initializing WeatherDataCollector")
         try:
@@ -27,10 +44,20 @@ class WeatherDataCollector:
             self.source_bucket = self.config.get("s3", {}).get("buckets", {}).get("source_bucket")
             self.prefix = self.config.get("s3", {}).get("buckets", {}).get("source_prefix")
             self.region = self.config.get("aws", {}).get("region", "us-east-1")
-            self.apiManager = APIManager(self.header_user_agent, self.header_accept)
-            self.s3Operations = S3Operations(self.source_bucket, self.region)
+            self.max_workers: int = self.config.get("app", {}).get("collector_max_workers", 8)
+            self.raw_content_encoding: str = self.config.get("s3", {}).get(
+                "raw_content_encoding", "identity"
+            )
+            self.jsonCodec = get_json_codec(self.config.get("app", {}).get("json_codec", "auto"))
+            # raw passthrough stores the API response bytes as received
+            self.raw_passthrough: bool = self.config.get("app", {}).get("raw_passthrough", False)
+            self.s3Operations = S3Operations(
+                self.source_bucket,
+                self.region,
+                max_pool_connections=max(10, self.max_workers),
+                json_codec=self.jsonCodec,
+            )
             self.dynamodb = DynamoDBOperations(self.region)
-            self.TIMEOUT = 10
             self.geocode_cache_table = (
                 self.config.get("dynamodb", {}).get("tables", {}).get("geocode_cache_table")
             )
@@ -40,6 +67,46 @@ class WeatherDataCollector:
             self.control_table_progress: str = (
                 self.config.get("dynamodb", {}).get("tables", {}).get("control_table_progress")
             )
+            self.progressCounter = ShardedProgressCounter(
+                self.dynamodb,
+                self.control_table_progress,
+                shard_count=self.config.get("dynamodb", {}).get("progress_counter_shards", 10),
+            )
+            self.retryScheduler = RetryScheduler(
+                self.dynamodb,
+                self.control_table_queue,
+                max_attempts=self.config.get("app", {}).get("retry_attempts", 3),
+                backoff_seconds=self.config.get("app", {}).get("retry_backoff_seconds"),
+                backoff_max_seconds=self.config.get("app", {}).get(
+                    "retry_backoff_max_seconds", 86400
+                ),
+            )
+
+            transport = TransportConfig(**self.config.get("http", {}))
+            # every collector worker needs its own pooled connection
+            transport.pool_maxsize = max(transport.pool_maxsize, self.max_workers)
+            self.apiManager = APIManager(
+                self.header_user_agent,
+                self.header_accept,
+                transport=transport,
+                json_codec=self.jsonCodec,
+                rate_limiter=TokenBucket(
+                    rate_per_second=self.config.get("app", {}).get("api_calls_per_second", 5),
+                    burst=self.config.get("app", {}).get("api_burst", 5),
+                ),
+                quota_ledger=QuotaLedger(
+                    self.dynamodb,
+                    self.control_table_progress,
+                    daily_limit=self.config.get("app", {}).get("daily_call_limit", 950),
+                    block_size=self.config.get("app", {}).get("quota_block_size", 20),
+                ),
+            )
+
+            self.geocodeCache = GeocodeCache(
+                max_entries=self.config.get("app", {}).get("geocode_cache_max_entries", 1024),
+                ttl_seconds=self.config.get("app", {}).get("geocode_cache_ttl_seconds", 86400),
+            )
+            self.prewarm_geocode_cache()
 
             logger.info(f"WeatherDataCollector initialized successfully.{self.geocode_cache_table}")
         except Exception as e:
@@ -47,11 +114,24 @@ class WeatherDataCollector:
             raise
 
     def collect_weather_data(
-        self, zip_code: str, country_code: str, process_day: str, item_id: str
+        self,
+        zip_code: str,
+        country_code: str,
+        process_day: str,
+        item_id: str,
+        update_status: bool = True,
+        retry_count: int = 0,
     ) -> None:
 
-        logger.info(f"Starting geocoding for zipcode{zip_code} country_code{country_code}")
         try:
+            s3_key = build_raw_object_key(self.prefix, country_code, zip_code, process_day)
+            if self.s3Operations.object_exists(s3_key):
+                logger.info(f"Data for {item_id} already collected at {s3_key}, skipping API call")
+                if update_status:
+                    self.dynamodb_update_progress_status(item_id)
+                return
+
+            logger.info(f"Starting geocoding for zipcode{zip_code} country_code{country_code}")
             lat, lon = self.get_geocoding_by_zipcode(zip_code, country_code)
             logger.info(f"starting api for day:{process_day}")
             weather_params = {
@@ -62,43 +142,163 @@ class WeatherDataCollector:
                 "lang": "en",
                 "appid": self.api_key,
             }
-            weather_response = self.apiManager.API_get(
-                self.weather_url_day, weather_params, self.TIMEOUT
-            )
-            weather_json_response = self.apiManager.API_parse_json(weather_response)
-            response_date = weather_json_response.get("date")
+            weather_response = self.apiManager.API_get(self.weather_url_day, weather_params)
+            if self.raw_passthrough:
+                body = weather_response.content
+                response_date = extract_raw_date(body, self.jsonCodec.loads)
+            else:
+                weather_json_response = self.apiManager.API_parse_json(weather_response)
+                response_date = weather_json_response.get("date")
+                body = self.jsonCodec.dumps(weather_json_response)
 
             if not isinstance(response_date, str):
                 logger.info(f"Invalid date format in reponse:{response_date}")
                 raise ValueError(f"Expected string, got {type(response_date)}")
 
-            if datetime.strptime(response_date, "%Y-%m-%d"):
-                response_year, response_month, response_day = response_date.split("-")
-                s3_key = (
-                    f"{self.prefix}/year={response_year}/"
-                    f"month={response_month}/day={response_day}/"
-                    f"country_code={country_code}/"
-                    f"zip_code={zip_code}/{uuid.uuid4()}.json"
-                )
+            if datetime.strptime(response_date, "%Y-%m-%d") and response_date == process_day:
                 self.s3Operations.store_object_in_s3(
                     key=s3_key,
-                    body=json.dumps(weather_json_response),
+                    body=body,
+                    if_none_match=True,
+                    content_encoding=self.raw_content_encoding,
                 )
                 logger.info(f"api processing complete for s3_key{s3_key}")
             else:
                 raise ValueError(
-                    f"Weather API response does not return date key, \
-                    or the format{response_date} is incorrect"
+                    f"Weather API response date {response_date} does not match \
+                    requested day {process_day}"
                 )
             logger.info(f"Weather data collection for {process_day} completed successfully")
-            logger.info("Starting dynamodb status table updates")
-            self.dynamodb_update_progress_status(item_id)
+            if update_status:
+                logger.info("Starting dynamodb status table updates")
+                self.dynamodb_update_progress_status(item_id)
 
         except Exception as e:
             logger.error(f"Error weather data collection {str(e)}", exc_info=True)
+            if update_status:
+                self.record_failure(item_id, e, retry_count)
             raise
 
+    def collect_batch(
+        self,
+        items: List[Dict[str, Any]],
+        max_workers: Optional[int] = None,
+        on_error: Optional[Callable[[BaseException], Any]] = None,
+    ) -> List[CollectionItemResult]:
+        workers = max_workers or self.max_workers
+        logger.info(f"Starting batch collection of {len(items)} items with {workers} workers")
+        if not items:
+            return []
+        self.apiManager.circuit_breaker.reset()
+        errors: List[BaseException] = []
+        try:
+            executor = self._batch_executor(workers)
+            results = list(executor.map(lambda item: self._collect_batch_item(item, errors), items))
+        finally:
+            self.apiManager.release_quota()
+        # status writes for the whole batch go out together once collection is done
+        status_failures = self.dynamodb_update_progress_batch(
+            [result.item_id for result in results if result.status == "completed"]
+        )
+        results = [
+            (
+                CollectionItemResult(
+                    item_id=result.item_id,
+                    status="failed",
+                    error_message=f"Queue status update failed: {status_failures[result.item_id]}",
+                )
+                if result.item_id in status_failures
+                else result
+            )
+            for result in results
+        ]
+        completed = sum(1 for result in results if result.status == "completed")
+        skipped = sum(1 for result in results if result.status == "skipped")
+        logger.info(
+            f"Batch collection finished: {completed} completed, "
+            f"{len(results) - completed - skipped} failed, {skipped} skipped"
+        )
+        # on_error runs once the pool has drained, so no worker sees shared state such as the
+        # runtime context change under it; a truthy return stops the remaining callbacks
+        if on_error:
+            for error in errors:
+                if on_error(error):
+                    break
+        return results
+
+    def _batch_executor(self, workers: int) -> ThreadPoolExecutor:
+        if self._executor is None or self._executor_workers != workers:
+            self.close()
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="collector")
+            self._executor_workers = workers
+        return self._executor
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _collect_batch_item(
+        self, item: Dict[str, Any], errors: List[BaseException]
+    ) -> CollectionItemResult:
+        item_id = str(item.get("item_id"))
+        if self.apiManager.circuit_breaker.is_open:
+            return CollectionItemResult(
+                item_id=item_id, status="skipped", error_message="API circuit breaker is open"
+            )
+        try:
+            queue_item = CollectionQueueItem(**item)
+        except Exception as e:
+            logger.error(f"Invalid queue item {item_id}: {str(e)}")
+            return CollectionItemResult(item_id=item_id, status="failed", error_message=str(e))
+        try:
+            self.collect_weather_data(
+                queue_item.zip_code,
+                queue_item.country_code,
+                queue_item.date,
+                queue_item.item_id,
+                update_status=False,
+            )
+            return CollectionItemResult(item_id=queue_item.item_id, status="completed")
+        except Exception as e:
+            logger.error(f"Batch collection failed for item_id {item_id}: {str(e)}")
+            self.record_failure(queue_item.item_id, e, queue_item.retry_count)
+            errors.append(e)
+            return CollectionItemResult(item_id=item_id, status="failed", error_message=str(e))
+
+    def prewarm_geocode_cache(self) -> None:
+        zipcodes = self.config.get("app", {}).get("zipcodes", [])
+        keys = [
+            {"zip_code": zipcode.get("zip_code"), "country_code": zipcode.get("country_code")}
+            for zipcode in zipcodes
+        ]
+        if not keys:
+            return
+        try:
+            geocode_items = self.dynamodb.batch_get_items(
+                model_class=CollectionGeocodeCache,
+                table_nm=self.geocode_cache_table,
+                keys=keys,
+            )
+            for geocode_item in geocode_items:
+                self.geocodeCache.put(
+                    (geocode_item.zip_code, geocode_item.country_code),
+                    (geocode_item.latitude, geocode_item.longitude),
+                )
+            logger.info(f"Prewarmed geocode cache with {len(geocode_items)}/{len(keys)} zipcodes")
+        except Exception as e:
+            # the per-zipcode lookup still falls back to DynamoDB and the geocoding API
+            logger.warning(f"Failed to prewarm geocode cache: {str(e)}")
+
     def get_geocoding_by_zipcode(self, zip_code: str, country_code: str) -> tuple[Decimal, Decimal]:
+        return self.geocodeCache.get_or_load(
+            (zip_code, country_code),
+            lambda: self._load_geocoding_by_zipcode(zip_code, country_code),
+        )
+
+    def _load_geocoding_by_zipcode(
+        self, zip_code: str, country_code: str
+    ) -> tuple[Decimal, Decimal]:
         try:
             geocode_item = self.dynamodb.get_item(
                 model_class=CollectionGeocodeCache,
@@ -113,7 +313,7 @@ class WeatherDataCollector:
                     "zip": f"{zip_code},{country_code}",
                     "appid": self.api_key,
                 }
-                geo_response = self.apiManager.API_get(self.geocoding_url, geo_params, self.TIMEOUT)
+                geo_response = self.apiManager.API_get(self.geocoding_url, geo_params)
                 geo_response_json = self.apiManager.API_parse_json(geo_response)
 
                 if geo_response_json is None:
@@ -160,8 +360,10 @@ class WeatherDataCollector:
             self.dynamodb.update_item(
                 table_nm=self.control_table_queue,
                 key={"item_id": item_id},
-                update_expression="SET #status= :completed, completed_at = :now",
-                condition_expression=Attr("status").eq("pending") & Attr("item_id").exists(),
+                update_expression="SET #status= :completed, completed_at = :now "
+                "REMOVE lease_expires_at",
+                condition_expression=Attr("status").is_in(["pending", "in_progress"])
+                & Attr("item_id").exists(),
                 expression_attrib_values={
                     ":completed": "completed",
                     ":now": datetime.now().isoformat(),
@@ -175,42 +377,72 @@ class WeatherDataCollector:
                     f"Skipping update of item_id :{item_id} as it is in a completed status."
                 )
                 return
-            else:
-                self.dynamodb.update_item(
-                    table_nm=self.control_table_queue,
-                    key={"item_id": item_id},
-                    update_expression="SET #status = :failed, retry_count = retry_count + :inc, \
-                    error_message= :error",
-                    expression_attrib_values={":failed": "failed", ":inc": 1, ":error": str(e)},
-                    expression_attrib_names={"#status": "status"},
-                )
-                logger.error(f"Error in lambda handler : {str(e)}", exc_info=True)
-                raise
-        except Exception as e:
-            self.dynamodb.update_item(
-                table_nm=self.control_table_queue,
-                key={"item_id": item_id},
-                update_expression="SET #status = :failed, retry_count = retry_count + :inc, \
-                    error_message= :error",
-                expression_attrib_values={":failed": "failed", ":inc": 1, ":error": str(e)},
-                expression_attrib_names={"#status": "status"},
-            )
             logger.error(f"Error in lambda handler : {str(e)}", exc_info=True)
             raise
 
         try:
-            self.dynamodb.update_item(
-                table_nm=self.control_table_progress,
-                key={"job_id": "historical_collection"},
-                update_expression="SET completed_items = completed_items + :inc , \
-            remaining_items = remaining_items - :inc ",
-                expression_attrib_values={":inc": 1},
-            )
+            self.progressCounter.add(1)
             logger.info(f"Updated item_id :{item_id} in {self.control_table_progress} .")
         except Exception as e:
             logger.error(f"Error weather data collection {str(e)}", exc_info=True)
             raise
 
+    def record_failure(self, item_id: str, error: BaseException, retry_count: int = 0) -> None:
+        try:
+            self.retryScheduler.record_failure(item_id, error, retry_count)
+        except Exception as e:
+            # the lease on the item runs out and it is picked up again either way
+            logger.error(f"Unable to record failure of item_id :{item_id}: {str(e)}")
+
+    def dynamodb_update_progress_batch(self, item_ids: List[str]) -> Dict[str, str]:
+        # returns item_ids whose queue record could not be moved to completed
+        if not item_ids:
+            return {}
+        now = datetime.now().isoformat()
+        updates = [
+            ItemUpdate(
+                key={"item_id": item_id},
+                update_expression="SET #status = :completed, completed_at = :now "
+                "REMOVE lease_expires_at",
+                expression_attrib_values={":completed": "completed", ":now": now},
+                condition_expression=Attr("status").is_in(["pending", "in_progress"])
+                & Attr("item_id").exists(),
+                expression_attrib_names={"#status": "status"},
+            )
+            for item_id in item_ids
+        ]
+        try:
+            failures = self.dynamodb.transact_update_items(self.control_table_queue, updates)
+        except Exception as e:
+            logger.error(f"Error updating batch queue status {str(e)}", exc_info=True)
+            return {item_id: str(e) for item_id in item_ids}
+
+        already_completed = [
+            item_ids[index] for index, code in failures.items() if code == "ConditionalCheckFailed"
+        ]
+        if already_completed:
+            logger.info(f"Skipped {len(already_completed)} items already in a completed status")
+        status_failures = {
+            item_ids[index]: code
+            for index, code in failures.items()
+            if code != "ConditionalCheckFailed"
+        }
+        # items left pending are picked up again and short circuit on the stored S3 object
+        for item_id, code in status_failures.items():
+            logger.error(f"Unable to complete item_id :{item_id} in queue: {code}")
+
+        transitioned = len(item_ids) - len(failures)
+        if transitioned:
+            # the queue items are already completed, so a failed add is left for the
+            # reconciliation job to repair rather than failing the batch
+            try:
+                self.progressCounter.add(transitioned)
+            except Exception as e:
+                logger.error(
+                    f"Error adding {transitioned} completions to progress {str(e)}", exc_info=True
+                )
+        return status_failures
+
 
 if __name__ == "__main__":
     weather_app = WeatherDataCollector()
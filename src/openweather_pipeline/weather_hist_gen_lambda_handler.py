@@ -1,9 +1,14 @@
 from typing import Dict, Any, List, Optional
 from openweather_pipeline.logger import get_logger
 from openweather_pipeline.config_manager import get_config
-from openweather_pipeline.dynamodb_operations import DynamoDBOperations
-from openweather_pipeline.models.collection_models import CollectionProgress, CollectionQueueItem
-from datetime import datetime, timedelta
+from openweather_pipeline.runtime_context import get_dynamodb, invalidate_on_error
+from openweather_pipeline.models.collection_models import CollectionQueueItem
+from openweather_pipeline.progress_counters import ShardedProgressCounter
+from openweather_pipeline.queue_leases import QueueLeaseManager
+from openweather_pipeline.queue_seeder import QueueSeeder
+from openweather_pipeline.retry_scheduler import RetryScheduler
+from datetime import datetime
+import uuid
 
 logger = get_logger(__name__)
 
@@ -25,52 +30,27 @@ def histGen_lambda_handler(event: Dict[Any, Any], context: Any) -> Optional[Dict
         start_dt = datetime.strptime(weather_start_dt, "%Y-%m-%d").date()
         end_dt = datetime.strptime(weather_end_dt, "%Y-%m-%d").date()
 
-        region: str = config_params.get("aws", {}).get("region")
-        dynamodb = DynamoDBOperations(region)
-
-        check_table_isEmpty = dynamodb.check_table_isEmpty(control_table_queue)
-        if check_table_isEmpty:
-            logger.info(f"Table {control_table_queue} is empty")
-            queue_items = []
-            current = start_dt
-            while current <= end_dt:
-                for zipcode in zipcodes:
-                    zip = zipcode.get("zip_code")
-                    country_code = zipcode.get("country_code")
-                    current_str = current.strftime("%Y-%m-%d")
-                    queue_items.append(
-                        CollectionQueueItem(
-                            item_id=f"{zip}#{country_code}#{current_str}",
-                            zip_code=zip,
-                            country_code=country_code,
-                            date=current_str,
-                            status="pending",
-                            retry_count=0,
-                        )
-                    )
-                current += timedelta(days=1)
-            logger.info(f"Created  {len(queue_items)} items fot insert into {control_table_queue}")
-            dynamodb.batch_put_items(queue_items, control_table_queue)
-            logger.info(f"Inserted {len(queue_items)} items in {control_table_queue}")
+        dynamodb = get_dynamodb()
+        progress_counter = ShardedProgressCounter(
+            dynamodb,
+            control_table_progress,
+            shard_count=config_params.get("dynamodb", {}).get("progress_counter_shards", 10),
+        )
 
-            intial_progress_record = CollectionProgress(
-                job_id="historical_collection",
-                zipcodes=zipcodes,
-                total_items=len(queue_items),
-                completed_items=0,
-                remaining_items=len(queue_items),
-                daily_calls_limit=daily_call_limit,
-                daily_calls_used=0,
-                status="in_progress",
-            )
-            dynamodb.put_item(intial_progress_record, control_table_progress)
-            logger.info(f"Inserted initial record into {control_table_progress}")
+        seeder = QueueSeeder(
+            dynamodb,
+            control_table_queue,
+            control_table_progress,
+            progress_counter,
+            scan_segments=config_params.get("dynamodb", {}).get("scan_segments", 4),
+            write_workers=config_params.get("dynamodb", {}).get("write_workers", 4),
+        )
+        seeded = seeder.seed(zipcodes, start_dt, end_dt, daily_call_limit)
+        logger.info(f"Seeded {seeded} new items into {control_table_queue}")
 
         # current items to process
 
-        progress = dynamodb.get_item(
-            CollectionProgress, control_table_progress, {"job_id": "historical_collection"}
-        )
+        progress = progress_counter.load_progress()
         if not progress:
             logger.error(f"Unable to find {control_table_progress} record for job_id")
             raise ValueError(f"Unable to find {control_table_progress} record for job_id")
@@ -81,7 +61,8 @@ def histGen_lambda_handler(event: Dict[Any, Any], context: Any) -> Optional[Dict
         else:
             last_run_dt = datetime.strptime(last_run_val, "%Y-%m-%d").date()
 
-        if today >= last_run_dt:
+        # daily_calls_used is maintained by the collectors' quota ledger for last_run's day
+        if last_run_dt < today:
             progress.daily_calls_used = 0
 
         if progress.daily_calls_used >= progress.daily_calls_limit:
@@ -92,15 +73,27 @@ def histGen_lambda_handler(event: Dict[Any, Any], context: Any) -> Optional[Dict
                 "count": 0,
             }
         calls_remaining = progress.daily_calls_limit - progress.daily_calls_used
+        logger.info(
+            f"Progress: {progress.completed_items} of {progress.total_items} items completed, "
+            f"{progress.remaining_items} remaining"
+        )
 
-        pending_items: Optional[List[CollectionQueueItem]] = dynamodb.query_table_all_fields(
-            CollectionQueueItem,
+        leaseManager = QueueLeaseManager(
+            dynamodb,
             control_table_queue,
-            "status-date-index",
-            "#status = :pending",
-            {"#status": "status"},
-            {":pending": "pending"},
-            limit_rows=calls_remaining,
+            lease_seconds=config_params.get("app", {}).get("lease_seconds", 900),
+            max_workers=config_params.get("dynamodb", {}).get("write_workers", 4),
+            retry_scheduler=RetryScheduler(
+                dynamodb,
+                control_table_queue,
+                max_attempts=config_params.get("app", {}).get("retry_attempts", 3),
+            ),
+            retry_share=config_params.get("app", {}).get("retry_batch_share", 0.2),
+        )
+        worker_id = getattr(context, "aws_request_id", None) or uuid.uuid4().hex
+        # only items this run managed to claim are handed to the collectors
+        pending_items: List[CollectionQueueItem] = leaseManager.claim(
+            leaseManager.claimable_items(calls_remaining), worker_id
         )
         if pending_items:
             logger.info(f"Read {len(pending_items)} from {control_table_queue} ")
@@ -114,6 +107,7 @@ def histGen_lambda_handler(event: Dict[Any, Any], context: Any) -> Optional[Dict
             raise ValueError(f"Error retrieving items from {control_table_queue}")
     except Exception as e:
         logger.error(f"Error in lambda handler{__name__}, {e}", exc_info=True)
+        invalidate_on_error(e)
         raise
 
 
@@ -0,0 +1,94 @@
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import pyarrow as pa
+
+# (column, path inside the OpenWeather day_summary payload, type), in output column order
+DAY_SUMMARY_FIELDS: List[Tuple[str, Tuple[str, ...], pa.DataType]] = [
+    ("date", ("date",), pa.date32()),
+    ("latitude", ("lat",), pa.float64()),
+    ("longitude", ("lon",), pa.float64()),
+    ("tz", ("tz",), pa.string()),
+    ("units", ("units",), pa.string()),
+    ("cloud_cover", ("cloud_cover", "afternoon"), pa.float64()),
+    ("humidity", ("humidity", "afternoon"), pa.float64()),
+    ("precipitation", ("precipitation", "total"), pa.float64()),
+    ("pressure", ("pressure", "afternoon"), pa.float64()),
+    ("temperature", ("temperature", "afternoon"), pa.float64()),
+    ("temperature_min", ("temperature", "min"), pa.float64()),
+    ("temperature_max", ("temperature", "max"), pa.float64()),
+    ("temperature_morning", ("temperature", "morning"), pa.float64()),
+    ("temperature_evening", ("temperature", "evening"), pa.float64()),
+    ("temperature_night", ("temperature", "night"), pa.float64()),
+    ("wind_speed", ("wind", "max", "speed"), pa.float64()),
+    ("wind_direction", ("wind", "max", "direction"), pa.float64()),
+]
+
+# top level members a raw day_summary must carry to be stored
+RAW_REQUIRED_FIELDS = ("date", "lat", "lon")
+RAW_DATE_PATTERN = re.compile(rb'"date"\s*:\s*"([^"\\]*)"')
+
+DAILY_WEATHER_SCHEMA = pa.schema(
+    [(column, data_type) for column, _, data_type in DAY_SUMMARY_FIELDS]
+    + [("zip_code", pa.string()), ("country_code", pa.string())]
+)
+
+PARTITION_SCHEMA = pa.schema(
+    [
+        ("country_code", pa.string()),
+        ("zip_code", pa.string()),
+        ("year", pa.int16()),
+    ]
+)
+
+# partition values live in the hive path of each part, not inside the parquet file
+PROCESSED_FILE_SCHEMA = pa.schema(
+    [field for field in DAILY_WEATHER_SCHEMA if field.name not in PARTITION_SCHEMA.names]
+)
+
+
+def _extract(payloads: Sequence[Any], path: Tuple[str, ...]) -> List[Any]:
+    # walks one nesting level at a time across the whole batch
+    values: List[Any] = list(payloads)
+    for name in path:
+        values = [value.get(name) if isinstance(value, dict) else None for value in values]
+    return values
+
+
+def flatten_day_summaries(
+    payloads: Sequence[Dict[str, Any]],
+    zip_codes: Optional[Sequence[Optional[str]]] = None,
+    country_codes: Optional[Sequence[Optional[str]]] = None,
+) -> pa.Table:
+    columns: Dict[str, pa.Array] = {}
+    for column, path, data_type in DAY_SUMMARY_FIELDS:
+        values = _extract(payloads, path)
+        if pa.types.is_date(data_type):
+            columns[column] = pa.array(values, type=pa.string()).cast(data_type)
+        else:
+            columns[column] = pa.array(values, type=data_type)
+    columns["zip_code"] = pa.array(
+        zip_codes if zip_codes is not None else [None] * len(payloads), type=pa.string()
+    )
+    columns["country_code"] = pa.array(
+        country_codes if country_codes is not None else [None] * len(payloads), type=pa.string()
+    )
+    return pa.Table.from_pydict(columns, schema=DAILY_WEATHER_SCHEMA)
+
+
+def extract_raw_date(body: bytes, loads: Callable[[bytes], Any]) -> Any:
+    # Reads "date" from a raw day_summary body without parsing it. The body must look like
+    # one JSON object holding the required members; when "date" does not occur exactly once
+    # as a string member the body is parsed in full instead.
+    stripped = body.strip()
+    if not (stripped.startswith(b"{") and stripped.endswith(b"}")):
+        raise ValueError("Expected a JSON object in the day summary response")
+    missing = [field for field in RAW_REQUIRED_FIELDS if f'"{field}"'.encode() not in stripped]
+    if missing:
+        raise ValueError(f"Day summary response is missing {missing}")
+    matches = RAW_DATE_PATTERN.findall(stripped)
+    if len(matches) == 1:
+        return matches[0].decode("utf-8")
+    payload = loads(stripped)
+    if not isinstance(payload, dict):
+        raise ValueError(f"Expected JSON object, got {type(payload)}")
+    return payload.get("date")
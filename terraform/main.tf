@@ -59,12 +59,24 @@ resource "aws_dynamodb_table" "weather_collection_queue" {
     type = "S"
   }
 
+  attribute {
+    name = "next_attempt_at"
+    type = "S"
+  }
+
   global_secondary_index {
     name = "status-date-index"
     hash_key = "status"
     range_key = "date"
     projection_type = "ALL"
   }
+
+  global_secondary_index {
+    name = "status-next-attempt-index"
+    hash_key = "status"
+    range_key = "next_attempt_at"
+    projection_type = "ALL"
+  }
 }
 
 resource "aws_dynamodb_table" "weather_collection_progress"{
@@ -114,6 +126,19 @@ resource "aws_lambda_function" "weather_collector_lambda"{
   layers=[aws_lambda_layer_version.dependencies_layer.arn]
 }
 
+resource "aws_lambda_function" "weather_collector_batch_lambda"{
+  function_name="weather-collector-batch-lambda"
+  role = data.aws_iam_role.lambda_execution_role.arn
+  handler = "openweather_pipeline.weather_collector_lambda_handler.batch_lambda_handler"
+  runtime = "python3.11"
+  timeout = 900
+  memory_size = 512
+  s3_bucket = data.aws_s3_bucket.weatherDataCode.bucket
+  s3_key = "weather-collector.zip"
+  source_code_hash = data.aws_s3_object.lambda_code.etag
+  layers=[aws_lambda_layer_version.dependencies_layer.arn]
+}
+
 resource "aws_lambda_function" "weather_history_gen_lambda"{
   function_name="weather-history-gen-lambda"
   role = data.aws_iam_role.lambda_execution_role.arn
@@ -5,6 +5,7 @@ import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 from src.openweather_pipeline.api_manager import APIManager
+from src.openweather_pipeline.rate_limiter import QuotaExceededError
 
 class TestAPIManager:
 
@@ -39,3 +40,90 @@ class TestAPIManager:
         )
 
 
+
+    @patch('requests.Session.get')
+    def test_api_get_reserves_quota_and_rate_limits(self, mock_get):
+        mock_get.return_value = Mock()
+        rate_limiter = Mock()
+        quota_ledger = Mock()
+        api_manager = APIManager(
+            header_user_agent=self.header_user_agent,
+            header_accept=self.header_accept,
+            rate_limiter=rate_limiter,
+            quota_ledger=quota_ledger,
+        )
+
+        api_manager.API_get("https://testapi.weather", params={}, timeout=10)
+        api_manager.release_quota()
+
+        quota_ledger.reserve.assert_called_once()
+        rate_limiter.acquire.assert_called_once()
+        quota_ledger.release.assert_called_once()
+
+    @patch('requests.Session.get')
+    def test_api_get_stops_when_quota_exceeded(self, mock_get):
+        quota_ledger = Mock()
+        quota_ledger.reserve.side_effect = QuotaExceededError("Daily limit reached")
+        api_manager = APIManager(
+            header_user_agent=self.header_user_agent,
+            header_accept=self.header_accept,
+            quota_ledger=quota_ledger,
+        )
+
+        with pytest.raises(QuotaExceededError):
+            api_manager.API_get("https://testapi.weather", params={}, timeout=10)
+        mock_get.assert_not_called()
+
+    @patch('time.sleep')
+    @patch('requests.Session.get')
+    def test_api_get_retries_with_retry_after(self, mock_get, mock_sleep):
+        throttled = Mock(status_code=503, headers={"Retry-After": "2"})
+        ok = Mock(status_code=200, headers={})
+        ok.raise_for_status.return_value = None
+        mock_get.side_effect = [throttled, ok]
+
+        result = self.api_manager.API_get("https://testapi.weather", params={})
+
+        assert result == ok
+        assert mock_get.call_count == 2
+        mock_sleep.assert_called_once_with(2.0)
+        assert mock_get.call_args.kwargs["timeout"] == (
+            self.api_manager.transport.connect_timeout,
+            self.api_manager.transport.read_timeout,
+        )
+
+    @patch('time.sleep')
+    @patch('requests.Session.get')
+    def test_api_get_retries_timeouts_then_raises(self, mock_get, mock_sleep):
+        mock_get.side_effect = requests.exceptions.Timeout("read timed out")
+
+        with pytest.raises(requests.exceptions.Timeout):
+            self.api_manager.API_get("https://testapi.weather", params={})
+
+        assert mock_get.call_count == self.api_manager.transport.max_retries + 1
+
+    @patch('requests.Session.get')
+    def test_unauthorized_response_opens_circuit(self, mock_get):
+        unauthorized = Mock(status_code=401, headers={})
+        unauthorized.raise_for_status.side_effect = requests.exceptions.HTTPError("401")
+        mock_get.return_value = unauthorized
+
+        with pytest.raises(requests.exceptions.HTTPError):
+            self.api_manager.API_get("https://testapi.weather", params={})
+        with pytest.raises(Exception, match="circuit breaker is open"):
+            self.api_manager.API_get("https://testapi.weather", params={})
+
+        assert self.api_manager.circuit_breaker.is_open
+        mock_get.assert_called_once()
+
+    def test_quota_blocks_override_the_block_size_and_release(self):
+        ledger = Mock(block_size=20)
+        sizes = []
+        ledger.release.side_effect = lambda: sizes.append(ledger.block_size)
+        self.api_manager.quota_ledger = ledger
+
+        with self.api_manager.quota_blocks(1):
+            assert ledger.block_size == 1
+
+        assert ledger.block_size == 20
+        assert sizes == [20]
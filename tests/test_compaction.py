@@ -0,0 +1,92 @@
+from datetime import datetime
+from unittest.mock import Mock
+import json
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from src.openweather_pipeline.compaction import RawCompactor, month_group
+from src.openweather_pipeline.json_codec import STDLIB_CODEC
+from src.openweather_pipeline.models.dataset_models import CompactedSource, CompactionManifest
+from src.openweather_pipeline.s3_operations import S3ObjectInfo
+
+
+class TestRawCompactor:
+
+    def setup_method(self):
+        self.s3 = Mock()
+        self.s3.jsonCodec = STDLIB_CODEC
+        self.compactor = RawCompactor(self.s3, "raw", "compacted")
+        self.file_key = self.compactor.compacted_key(("2024", "01", "US", "10001"))
+        self.keys = [
+            "raw/year=2024/month=01/day=01/country_code=US/zip_code=10001/a.json",
+            "raw/year=2024/month=01/day=02/country_code=US/zip_code=10001/b.json",
+            "raw/year=2024/month=01/day=03/country_code=US/zip_code=10001/c.json",
+        ]
+        self.manifest = CompactionManifest(
+            sources={
+                self.keys[0]: CompactedSource(etag="e1", file=self.file_key),
+                self.keys[1]: CompactedSource(etag="e2", file=self.file_key),
+            },
+            files=[self.file_key],
+        )
+        lines = [
+            json.dumps({"key": self.keys[0], "etag": "e1", "data": {"date": "2024-01-01"}}),
+            json.dumps({"key": self.keys[1], "etag": "e2", "data": {"date": "2024-01-02"}}),
+        ]
+        self.compacted = ("\n".join(lines) + "\n").encode()
+
+    def test_month_group_defaults_country(self):
+        key = "raw/year=2024/month=01/day=03/zip_code=10002/0b1c2d.json"
+
+        assert month_group(key) == ("2024", "01", "US", "10002")
+
+    def test_covered_keys_share_one_read_of_the_compacted_file(self):
+        fetched = []
+
+        def fetch_objects(keys, max_workers):
+            for key in keys:
+                fetched.append(key)
+                yield key, self.compacted if key == self.file_key else b'{"date": "2024-01-03"}'
+
+        self.s3.fetch_objects.side_effect = fetch_objects
+        etags = {self.keys[0]: "e1", self.keys[1]: "e2", self.keys[2]: "e3"}
+
+        records = list(self.compactor.iter_payloads(self.keys, etags, self.manifest))
+
+        assert [data["date"] for _, data in records] == ["2024-01-01", "2024-01-02", "2024-01-03"]
+        assert fetched == [self.file_key, self.keys[2]]
+
+    def test_reads_after_originals_are_deleted_never_touch_raw_keys(self):
+        store = {
+            self.keys[0]: b'{"date": "2024-01-01"}',
+            self.keys[1]: b'{"date": "2024-01-02"}',
+        }
+        listed = [S3ObjectInfo(key, 20, f"e{n}", datetime(2024, 2, 1)) for n, key in
+                  enumerate(self.keys[:2], 1)]
+        self.s3.object_exists.side_effect = lambda key: key in store
+        self.s3.read_file_as_bytes.side_effect = lambda key: store[key]
+        self.s3.put_bytes.side_effect = lambda key, body, **kwargs: store.__setitem__(key, body)
+        self.s3.delete_objects.side_effect = lambda keys: [store.pop(key) for key in keys]
+        self.s3.iter_objects_parallel.side_effect = lambda *args, **kwargs: iter(listed)
+        self.s3.fetch_objects.side_effect = lambda keys, max_workers: (
+            (key, store[key]) for key in keys
+        )
+
+        self.compactor.compact(delete_originals=True)
+        assert self.keys[0] not in store and self.keys[1] not in store
+        # a manifest read before the file was rewritten with newer copies of both objects
+        manifest = self.compactor.load_manifest()
+        manifest.sources[self.keys[0]].etag = "stale"
+        manifest.sources[self.keys[2]] = CompactedSource(etag="e3", file=self.file_key)
+
+        records = list(self.compactor.iter_payloads(self.keys, {}, manifest))
+
+        assert [data["date"] for _, data in records] == ["2024-01-01", "2024-01-02"]
+
+    def test_available_etags_include_deleted_originals(self):
+        listed = [S3ObjectInfo(self.keys[1], 20, "e2-new", datetime(2024, 2, 1))]
+        self.s3.iter_objects_parallel.return_value = iter(listed)
+
+        available = self.compactor.available_etags("raw", self.manifest)
+
+        assert available == {self.keys[0]: "e1", self.keys[1]: "e2-new"}
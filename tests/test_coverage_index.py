@@ -0,0 +1,91 @@
+from datetime import date
+from unittest.mock import Mock
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from src.openweather_pipeline.coverage_index import CoverageIndex
+from src.openweather_pipeline.models.collection_models import QueueItemKey
+
+
+def raw_key(zip_code, day, name=None):
+    year, month, day_of_month = day.split("-")
+    return (
+        f"openweather_api/year={year}/month={month}/day={day_of_month}/"
+        f"country_code=US/zip_code={zip_code}/{name or f'US_{zip_code}_{day}'}.json"
+    )
+
+
+class TestCoverageIndex:
+
+    def setup_method(self):
+        self.index = CoverageIndex(date(2024, 1, 1), date(2024, 1, 10))
+        self.index.update_from_keys([
+            raw_key("10001", "2024-01-01"),
+            raw_key("10001", "2024-01-02"),
+            raw_key("10001", "2024-01-02", name="legacy-uuid"),
+            raw_key("10002", "2024-01-05"),
+            raw_key("10002", "2025-06-01"),
+        ])
+        self.index.update_from_item_ids(["10001#US#2024-01-01", "10002#US#2024-01-06"])
+
+    def test_set_operations(self):
+        assert len(list(self.index.pairs(self.index.missing()))) == 17
+        assert list(self.index.pairs(self.index.duplicated())) == [("US", "10001", "2024-01-02")]
+        assert list(self.index.pairs(self.index.stored_not_completed())) == [
+            ("US", "10001", "2024-01-02"),
+            ("US", "10002", "2024-01-05"),
+        ]
+        assert list(self.index.pairs(self.index.completed_not_stored())) == [
+            ("US", "10002", "2024-01-06")
+        ]
+
+    def test_missing_includes_locations_never_seen(self):
+        missing = self.index.missing([("US", "11201")])
+
+        assert int(missing.sum()) == 10
+
+    def test_round_trip_realigns_to_a_new_date_range(self):
+        restored = CoverageIndex.from_bytes(
+            self.index.to_bytes(), date(2024, 1, 2), date(2024, 1, 31)
+        )
+
+        assert restored.locations == self.index.locations
+        assert list(restored.pairs(restored.layers["stored"])) == [
+            ("US", "10001", "2024-01-02"),
+            ("US", "10002", "2024-01-05"),
+        ]
+        assert restored.num_days == 30
+
+    def test_queue_refresh_of_one_month_only_queries_and_clears_that_month(self):
+        index = CoverageIndex(date(2024, 1, 30), date(2024, 2, 2))
+        index.update_from_item_ids(["10001#US#2024-01-30", "10001#US#2024-02-01"])
+        dynamodb = Mock()
+        dynamodb.iter_query.return_value = iter([
+            QueueItemKey(item_id="10001#US#2024-02-02", status="completed"),
+        ])
+
+        assert index.update_from_queue(dynamodb, "queue", [(2024, 2)]) == 1
+
+        values = dynamodb.iter_query.call_args.args[4]
+        assert (values[":first"], values[":last"]) == ("2024-02-01", "2024-02-02")
+        assert list(index.pairs(index.layers["completed"])) == [
+            ("US", "10001", "2024-01-30"),
+            ("US", "10001", "2024-02-02"),
+        ]
+
+    def test_compacted_days_whose_originals_were_deleted_count_as_stored(self):
+        index = CoverageIndex(date(2024, 1, 1), date(2024, 1, 3))
+        s3 = Mock()
+        s3.iter_objects_parallel.return_value = iter([Mock(key=raw_key("10001", "2024-01-01"))])
+
+        index.update_from_s3(
+            s3,
+            "openweather_api",
+            compacted_keys=[raw_key("10001", "2024-01-01"), raw_key("10001", "2024-01-02")],
+        )
+
+        assert list(index.pairs(index.layers["stored"])) == [
+            ("US", "10001", "2024-01-01"),
+            ("US", "10001", "2024-01-02"),
+        ]
+        assert not index.duplicated().any()
@@ -0,0 +1,191 @@
+from unittest.mock import MagicMock, patch
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from botocore.exceptions import ClientError
+from pydantic import BaseModel
+from decimal import Decimal
+from src.openweather_pipeline.dynamodb_operations import (
+    DynamoDBOperations,
+    ItemUpdate,
+    serialize_items,
+    validate_items,
+)
+
+
+class QueueKey(BaseModel):
+    item_id: str
+
+
+def cancelled(*codes):
+    return ClientError(
+        {
+            "Error": {"Code": "TransactionCanceledException", "Message": "cancelled"},
+            "CancellationReasons": [{"Code": code} for code in codes],
+        },
+        "TransactWriteItems",
+    )
+
+
+def updates(*item_ids):
+    return [
+        ItemUpdate(
+            key={"item_id": item_id},
+            update_expression="SET #status = :completed",
+            expression_attrib_values={":completed": "completed"},
+            expression_attrib_names={"#status": "status"},
+        )
+        for item_id in item_ids
+    ]
+
+
+class TestTransactUpdateItems:
+
+    def setup_method(self):
+        with patch("src.openweather_pipeline.dynamodb_operations.get_config"):
+            self.dynamodb = DynamoDBOperations("us-east-1")
+        self.resource = MagicMock()
+        self.client = self.resource.meta.client
+        self.dynamodb._local.resource = self.resource
+
+    def test_updates_are_chunked(self):
+        failures = self.dynamodb.transact_update_items("queue", updates(*map(str, range(150))))
+
+        assert failures == {}
+        chunk_sizes = [
+            len(call.kwargs["TransactItems"]) for call in self.client.transact_write_items.call_args_list
+        ]
+        assert chunk_sizes == [100, 50]
+
+    @patch("time.sleep")
+    def test_failed_conditions_are_reported_and_rest_resubmitted(self, mock_sleep):
+        self.client.transact_write_items.side_effect = [
+            cancelled("None", "ConditionalCheckFailed", "TransactionConflict"),
+            None,
+        ]
+
+        failures = self.dynamodb.transact_update_items("queue", updates("a", "b", "c"))
+
+        assert failures == {1: "ConditionalCheckFailed"}
+        resubmitted = self.client.transact_write_items.call_args_list[1].kwargs["TransactItems"]
+        assert [item["Update"]["Key"]["item_id"] for item in resubmitted] == ["a", "c"]
+
+
+class TestPaginatedReads:
+
+    def setup_method(self):
+        with patch("src.openweather_pipeline.dynamodb_operations.get_config"):
+            self.dynamodb = DynamoDBOperations("us-east-1")
+        self.resource = MagicMock()
+        self.table = self.resource.Table.return_value
+        self.dynamodb._local.resource = self.resource
+
+    def test_query_follows_last_evaluated_key_up_to_limit(self):
+        self.table.query.side_effect = [
+            {"Items": [{"item_id": "a"}, {"item_id": "b"}], "LastEvaluatedKey": {"item_id": "b"}},
+            {"Items": [{"item_id": "c"}], "LastEvaluatedKey": {"item_id": "c"}},
+        ]
+
+        items = self.dynamodb.query_table_all_fields(
+            QueueKey, "queue", "status-date-index", "#status = :pending",
+            {"#status": "status"}, {":pending": "pending"}, limit_rows=3,
+        )
+
+        assert [item.item_id for item in items] == ["a", "b", "c"]
+        second_call = self.table.query.call_args_list[1].kwargs
+        assert second_call["ExclusiveStartKey"] == {"item_id": "b"}
+        assert second_call["Limit"] == 1
+
+    def test_query_with_no_room_left_reads_nothing(self):
+        items = list(
+            self.dynamodb.iter_query(QueueKey, "queue", "#status = :pending", limit=0)
+        )
+
+        assert items == []
+        self.table.query.assert_not_called()
+
+    def test_parallel_scan_reads_every_segment(self):
+        def scan(**kwargs):
+            segment = kwargs["Segment"]
+            if "ExclusiveStartKey" in kwargs:
+                return {"Items": [{"item_id": f"{segment}-2"}]}
+            return {"Items": [{"item_id": f"{segment}-1"}], "LastEvaluatedKey": {"item_id": "x"}}
+
+        self.table.scan.side_effect = scan
+
+        # every worker thread builds its own resource
+        with patch("boto3.resource", return_value=self.resource):
+            items = list(self.dynamodb.parallel_scan(QueueKey, "queue", total_segments=3))
+
+        assert sorted(item.item_id for item in items) == [
+            "0-1", "0-2", "1-1", "1-2", "2-1", "2-2"
+        ]
+
+
+class QueueCount(BaseModel):
+    item_id: str
+    retry_count: int
+
+
+class TestConditionalPuts:
+
+    def setup_method(self):
+        with patch("src.openweather_pipeline.dynamodb_operations.get_config"):
+            self.dynamodb = DynamoDBOperations("us-east-1")
+        self.resource = MagicMock()
+        self.table = self.resource.Table.return_value
+
+    def test_existing_items_are_kept_and_not_counted(self):
+        def put_item(Item, ConditionExpression):
+            if Item["item_id"] == "b":
+                raise ClientError(
+                    {"Error": {"Code": "ConditionalCheckFailedException", "Message": "exists"}},
+                    "PutItem",
+                )
+
+        self.table.put_item.side_effect = put_item
+
+        with patch("boto3.resource", return_value=self.resource):
+            inserted = self.dynamodb.parallel_put_new_items(
+                [QueueKey(item_id=item_id) for item_id in "abc"], "queue", "item_id"
+            )
+
+        assert inserted == 2
+        assert self.table.put_item.call_count == 3
+
+
+class TestValidationModes:
+
+    def test_strict_skips_invalid_rows(self):
+        rows = [{"item_id": "a", "retry_count": Decimal(1)}, {"item_id": "b"}]
+
+        items = validate_items(QueueCount, rows, "strict")
+
+        assert [item.item_id for item in items] == ["a"]
+
+    def test_trusted_coerces_dynamodb_numbers_in_one_call(self):
+        items = validate_items(QueueCount, [{"item_id": "a", "retry_count": Decimal(2)}], "trusted")
+
+        assert items[0].retry_count == 2
+        assert isinstance(items[0].retry_count, int)
+
+    def test_trusted_skips_a_malformed_row_instead_of_failing_the_page(self):
+        rows = [
+            {"item_id": "a", "retry_count": Decimal("1")},
+            {"item_id": "b"},
+            {"item_id": "c", "retry_count": Decimal("2")},
+        ]
+
+        items = validate_items(QueueCount, rows, "trusted")
+
+        assert [(item.item_id, item.retry_count) for item in items] == [("a", 1), ("c", 2)]
+
+    def test_raw_returns_rows_unchanged(self):
+        rows = [{"item_id": "a"}]
+
+        assert validate_items(QueueCount, rows, "raw") is rows
+
+    def test_serialize_items_round_trips(self):
+        items = [QueueCount(item_id="a", retry_count=1), QueueCount(item_id="b", retry_count=2)]
+
+        assert serialize_items(items) == [item.model_dump() for item in items]
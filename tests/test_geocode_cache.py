@@ -0,0 +1,65 @@
+import threading
+import time
+from decimal import Decimal
+from unittest.mock import Mock
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from src.openweather_pipeline.geocode_cache import GeocodeCache
+
+NYC = (Decimal("40.75"), Decimal("-73.99"))
+
+
+class TestGeocodeCache:
+
+    def test_get_or_load_caches_value(self):
+        cache = GeocodeCache(max_entries=10, ttl_seconds=60)
+        loader = Mock(return_value=NYC)
+
+        assert cache.get_or_load(("10001", "US"), loader) == NYC
+        assert cache.get_or_load(("10001", "US"), loader) == NYC
+        loader.assert_called_once()
+
+    def test_expired_entry_is_reloaded(self):
+        cache = GeocodeCache(max_entries=10, ttl_seconds=0)
+        cache.put(("10001", "US"), NYC)
+        time.sleep(0.01)
+
+        assert cache.get(("10001", "US")) is None
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = GeocodeCache(max_entries=2, ttl_seconds=60)
+        cache.put(("10001", "US"), NYC)
+        cache.put(("10002", "US"), NYC)
+        cache.get(("10001", "US"))
+        cache.put(("10003", "US"), NYC)
+
+        assert cache.get(("10002", "US")) is None
+        assert cache.get(("10001", "US")) == NYC
+        assert len(cache) == 2
+
+    def test_concurrent_misses_share_one_load(self):
+        cache = GeocodeCache(max_entries=10, ttl_seconds=60)
+        release = threading.Event()
+        calls = []
+
+        def loader():
+            calls.append(1)
+            release.wait(timeout=5)
+            return NYC
+
+        results = []
+
+        def worker():
+            results.append(cache.get_or_load(("10001", "US"), loader))
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert results == [NYC] * 5
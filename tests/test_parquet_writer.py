@@ -0,0 +1,95 @@
+from unittest.mock import MagicMock
+import io
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from src.openweather_pipeline.parquet_writer import (
+    MIN_PART_SIZE,
+    S3MultipartUpload,
+    StreamingParquetWriter,
+)
+
+SCHEMA = pa.schema([("zip_code", pa.string()), ("temp", pa.float64())])
+
+
+def rows(count, start=0):
+    return pa.table({
+        "temp": [float(n) for n in range(start, start + count)],
+        "zip_code": ["10001"] * count,
+    })
+
+
+class TestS3MultipartUpload:
+
+    def setup_method(self):
+        self.s3_client = MagicMock()
+        self.s3_client.create_multipart_upload.return_value = {"UploadId": "upload-1"}
+        self.s3_client.upload_part.side_effect = lambda **kwargs: {
+            "ETag": f"etag-{kwargs['PartNumber']}"
+        }
+
+    def upload(self):
+        return S3MultipartUpload(self.s3_client, "bucket", "processed/part.parquet", MIN_PART_SIZE)
+
+    def test_exactly_one_part_is_uploaded_as_a_single_part(self):
+        with self.upload() as upload:
+            upload.write(b"x" * MIN_PART_SIZE)
+
+        assert self.s3_client.upload_part.call_count == 1
+        parts = self.s3_client.complete_multipart_upload.call_args.kwargs["MultipartUpload"]
+        assert parts == {"Parts": [{"PartNumber": 1, "ETag": "etag-1"}]}
+        self.s3_client.put_object.assert_not_called()
+
+    def test_bytes_past_the_part_boundary_go_into_the_last_part(self):
+        with self.upload() as upload:
+            upload.write(b"x" * (MIN_PART_SIZE - 1))
+            upload.write(b"yy")
+
+        bodies = [call.kwargs["Body"] for call in self.s3_client.upload_part.call_args_list]
+        assert [len(body) for body in bodies] == [MIN_PART_SIZE, 1]
+        assert bodies[1] == b"y"
+
+    def test_objects_below_one_part_use_put_object(self):
+        with self.upload() as upload:
+            upload.write(b"small")
+
+        assert self.s3_client.put_object.call_args.kwargs["Body"] == b"small"
+        self.s3_client.create_multipart_upload.assert_not_called()
+
+    def test_writer_exception_aborts_the_upload(self):
+        with pytest.raises(RuntimeError):
+            with self.upload() as upload:
+                with StreamingParquetWriter(upload, SCHEMA, row_group_size=10) as writer:
+                    upload.write(b"x" * MIN_PART_SIZE)
+                    writer.write_table(rows(3))
+                    raise RuntimeError("transform failed")
+
+        self.s3_client.abort_multipart_upload.assert_called_once_with(
+            Bucket="bucket", Key="processed/part.parquet", UploadId="upload-1"
+        )
+        self.s3_client.complete_multipart_upload.assert_not_called()
+        self.s3_client.put_object.assert_not_called()
+
+
+class TestStreamingParquetWriter:
+
+    def test_batches_are_flushed_once_a_row_group_is_buffered(self):
+        sink = io.BytesIO()
+        writer = StreamingParquetWriter(sink, SCHEMA, row_group_size=4)
+        writer.write_tables([rows(3), rows(0), rows(3, 3)])
+        assert writer.rows_written == 6
+        writer.write_table(rows(3, 6))
+        writer.close()
+
+        parquet_file = pq.ParquetFile(io.BytesIO(sink.getvalue()))
+        sizes = [
+            parquet_file.metadata.row_group(n).num_rows
+            for n in range(parquet_file.metadata.num_row_groups)
+        ]
+        assert sizes == [4, 2, 3]
+        table = parquet_file.read()
+        assert table.schema.names == ["zip_code", "temp"]
+        assert table.column("temp").to_pylist() == [float(n) for n in range(9)]
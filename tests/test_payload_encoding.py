@@ -0,0 +1,23 @@
+import json
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from src.openweather_pipeline.payload_encoding import decode_payload, encode_payload
+
+
+class TestPayloadEncoding:
+
+    def setup_method(self):
+        self.body = json.dumps({"date": "2024-01-01", "temperature": {"max": 50}}).encode()
+
+    def test_compressed_and_plain_payloads_decode_alike(self):
+        compressed = encode_payload(self.body, "gzip")
+
+        assert len(compressed) != len(self.body)
+        assert decode_payload(compressed) == self.body
+        assert decode_payload(encode_payload(self.body, "identity")) == self.body
+
+    def test_unknown_encoding_is_rejected(self):
+        with pytest.raises(ValueError, match="Unsupported content encoding"):
+            encode_payload(self.body, "brotli")
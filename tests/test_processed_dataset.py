@@ -0,0 +1,213 @@
+from datetime import date, datetime, timezone
+from unittest.mock import MagicMock
+import hashlib
+import json
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import pyarrow.fs as pafs
+from src.openweather_pipeline.json_codec import STDLIB_CODEC
+from src.openweather_pipeline.parquet_writer import S3MultipartUpload
+from src.openweather_pipeline.processed_dataset import ProcessedDataset, key_partition
+from src.openweather_pipeline.s3_keys import build_raw_object_key
+from src.openweather_pipeline.s3_operations import S3ObjectInfo, S3Operations
+
+
+def day_summary(day, temperature=45):
+    return {"lat": 40.75, "lon": -73.99, "date": day, "temperature": {"afternoon": temperature}}
+
+
+class LocalS3:
+    # S3Operations stand-in over a directory laid out as <root>/<bucket>/<key>, which the
+    # dataset reads back through a local pyarrow filesystem
+
+    def __init__(self, root):
+        self.root = root
+        self.bucket = "bucket"
+        self.jsonCodec = STDLIB_CODEC
+        self.reads = []
+        self.s3_client = MagicMock()
+        self.s3_client.put_object.side_effect = (
+            lambda Bucket, Key, Body, ContentType: self.put_bytes(Key, Body)
+        )
+
+    def path(self, key):
+        return self.root / self.bucket / key
+
+    def object_exists(self, key):
+        return self.path(key).exists()
+
+    def read_file_as_bytes(self, key):
+        self.reads.append(key)
+        return self.path(key).read_bytes()
+
+    def put_bytes(self, key, body, **kwargs):
+        self.path(key).parent.mkdir(parents=True, exist_ok=True)
+        self.path(key).write_bytes(body)
+
+    def put_json(self, key, payload):
+        self.put_bytes(key, json.dumps(payload).encode())
+
+    def delete_objects(self, keys):
+        for key in keys:
+            self.path(key).unlink()
+
+    def keys(self, prefix, extension):
+        base = self.root / self.bucket
+        return sorted(
+            str(path.relative_to(base))
+            for path in (base / prefix).rglob(f"*.{extension}")
+        )
+
+    def iter_objects_parallel(self, prefix, extension, max_workers=8, depth=2):
+        for key in self.keys(prefix, extension):
+            body = self.path(key).read_bytes()
+            yield S3ObjectInfo(
+                key, len(body), hashlib.md5(body).hexdigest(), datetime.now(timezone.utc)
+            )
+
+    def open_multipart_upload(self, key, part_size):
+        return S3MultipartUpload(self.s3_client, self.bucket, key, part_size=part_size)
+
+    def iter_flattened_batches(self, keys, max_workers):
+        return self.flatten_payload_batches(
+            (key, json.loads(self.read_file_as_bytes(key))) for key in keys
+        )
+
+    def flatten_payload_batches(self, records, batch_size=1000):
+        return S3Operations.flatten_payload_batches(self, records, batch_size)
+
+
+class TestProcessedDatasetUpdate:
+
+    def make_dataset(self, tmp_path):
+        self.s3 = LocalS3(tmp_path)
+        self.raw = {
+            day: build_raw_object_key("raw", "US", "10001", day)
+            for day in ("2024-01-01", "2024-01-02", "2024-01-03")
+        }
+        for day, key in self.raw.items():
+            self.s3.put_json(key, day_summary(day))
+        filesystem = pafs.SubTreeFileSystem(str(tmp_path), pafs.LocalFileSystem())
+        return ProcessedDataset(self.s3, "processed", filesystem=filesystem)
+
+    def test_manifest_round_trip(self, tmp_path):
+        dataset = self.make_dataset(tmp_path)
+
+        assert dataset.update("raw") == 3
+
+        manifest = dataset.load_manifest()
+        assert sorted(manifest.processed_keys) == sorted(self.raw.values())
+        assert len(manifest.parts) == 1
+        assert key_partition(manifest.parts[0]) == ("US", "10001", 2024)
+        assert manifest.updated_at is not None
+        assert dataset.read().num_rows == 3
+
+    def test_only_new_and_changed_objects_are_reprocessed(self, tmp_path):
+        dataset = self.make_dataset(tmp_path)
+        dataset.update("raw")
+        added = build_raw_object_key("raw", "US", "10001", "2024-01-04")
+        self.s3.put_json(added, day_summary("2024-01-04"))
+        self.s3.put_json(self.raw["2024-01-02"], day_summary("2024-01-02", temperature=50))
+        self.s3.delete_objects([self.raw["2024-01-03"]])
+        self.s3.reads.clear()
+
+        assert dataset.update("raw") == 2
+
+        raw_reads = [key for key in self.s3.reads if key.startswith("raw/")]
+        assert sorted(raw_reads) == sorted([added, self.raw["2024-01-02"]])
+        manifest = dataset.load_manifest()
+        assert len(manifest.parts) == 2
+        # a removed raw object keeps its processed rows and its manifest entry, and the
+        # changed object has a row in each part until the partition is compacted
+        assert self.raw["2024-01-03"] in manifest.processed_keys
+        assert dataset.read().num_rows == 5
+
+    def test_full_refresh_replaces_the_old_parts(self, tmp_path):
+        dataset = self.make_dataset(tmp_path)
+        dataset.update("raw")
+        old_parts = dataset.load_manifest().parts
+
+        assert dataset.update("raw", full_refresh=True) == 3
+
+        parts = dataset.load_manifest().parts
+        assert len(parts) == 1 and parts != old_parts
+        assert not any(self.s3.object_exists(part) for part in old_parts)
+        assert dataset.read().num_rows == 3
+
+
+class TestProcessedDatasetCompactionAndRead:
+
+    def make_dataset(self, tmp_path):
+        self.s3 = LocalS3(tmp_path)
+        filesystem = pafs.SubTreeFileSystem(str(tmp_path), pafs.LocalFileSystem())
+        return ProcessedDataset(self.s3, "processed", filesystem=filesystem)
+
+    def store(self, zip_code, day, temperature=45, name=None):
+        key = build_raw_object_key("raw", "US", zip_code, day)
+        if name is not None:
+            key = f"{key.rsplit('/', 1)[0]}/{name}.json"
+        self.s3.put_json(key, day_summary(day, temperature))
+        return key
+
+    def temperatures(self, table):
+        return dict(zip(table["date"].to_pylist(), table["temperature"].to_pylist()))
+
+    def test_pruned_partitions_are_never_opened(self, tmp_path):
+        dataset = self.make_dataset(tmp_path)
+        self.store("10001", "2023-12-31")
+        self.store("10001", "2024-01-01")
+        self.store("10002", "2024-01-01")
+        dataset.update("raw")
+        for part in dataset.load_manifest().parts:
+            if key_partition(part) != ("US", "10001", 2024):
+                self.s3.path(part).unlink()
+
+        table = dataset.read(zip_codes=["10001"], country_code="US", start_date=date(2024, 1, 1))
+
+        assert table["date"].to_pylist() == [date(2024, 1, 1)]
+        assert table["zip_code"].to_pylist() == ["10001"]
+
+    def test_date_filter_is_applied_within_a_partition(self, tmp_path):
+        dataset = self.make_dataset(tmp_path)
+        for day in ("2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04"):
+            self.store("10001", day)
+        dataset.update("raw")
+
+        table = dataset.read(
+            start_date=date(2024, 1, 2), end_date=date(2024, 1, 3), columns=["date"]
+        )
+
+        assert table.column_names == ["date"]
+        assert sorted(table["date"].to_pylist()) == [date(2024, 1, 2), date(2024, 1, 3)]
+
+    def test_compaction_keeps_the_newest_part_of_each_date(self, tmp_path):
+        dataset = self.make_dataset(tmp_path)
+        self.store("10001", "2024-01-01")
+        self.store("10001", "2024-01-02")
+        dataset.update("raw")
+        self.store("10001", "2024-01-02", temperature=50)
+        dataset.update("raw")
+        manifest = dataset.load_manifest()
+        old_parts = list(manifest.parts)
+
+        dataset.compact(manifest, force=True)
+
+        assert len(manifest.parts) == 1
+        assert not any(self.s3.object_exists(part) for part in old_parts)
+        assert self.temperatures(dataset.read()) == {date(2024, 1, 1): 45, date(2024, 1, 2): 50}
+
+    def test_compaction_keeps_one_row_per_date_within_a_part(self, tmp_path):
+        dataset = self.make_dataset(tmp_path)
+        self.store("10001", "2024-01-01")
+        # a legacy key for the same day sorts after the canonical one in the same part
+        self.store("10001", "2024-01-01", temperature=40, name="legacy-uuid")
+        dataset.update("raw")
+        self.store("10001", "2024-01-02")
+        dataset.update("raw")
+        manifest = dataset.load_manifest()
+
+        dataset.compact(manifest, force=True)
+
+        assert self.temperatures(dataset.read()) == {date(2024, 1, 1): 40, date(2024, 1, 2): 45}
+        assert dataset.read().num_rows == 2
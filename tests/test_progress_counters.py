@@ -0,0 +1,76 @@
+from unittest.mock import Mock, patch
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from src.openweather_pipeline.models.collection_models import (
+    CollectionProgress,
+    ProgressCounterShard,
+)
+from src.openweather_pipeline.progress_counters import ShardedProgressCounter
+
+
+class TestShardedProgressCounter:
+
+    def setup_method(self):
+        self.dynamodb = Mock()
+        self.counter = ShardedProgressCounter(self.dynamodb, "progress", shard_count=4)
+
+    def test_add_writes_to_a_shard_row(self):
+        self.counter.add(3)
+
+        kwargs = self.dynamodb.update_item.call_args.kwargs
+        assert kwargs["key"]["job_id"] in {f"historical_collection#shard#{n}" for n in range(4)}
+        assert kwargs["expression_attrib_values"] == {":done": 3, ":remaining": -3}
+
+    def test_load_progress_sums_shards_into_base_record(self):
+        self.dynamodb.get_item.return_value = CollectionProgress(
+            zipcodes=[], total_items=10, completed_items=1, remaining_items=9, status="in_progress"
+        )
+        self.dynamodb.batch_get_items.return_value = [
+            ProgressCounterShard(job_id="historical_collection#shard#0", completed_items=2,
+                                 remaining_items=-2),
+            ProgressCounterShard(job_id="historical_collection#shard#3", completed_items=4,
+                                 remaining_items=-4),
+        ]
+
+        progress = self.counter.load_progress()
+
+        assert progress.completed_items == 7
+        assert progress.remaining_items == 3
+        assert len(self.dynamodb.batch_get_items.call_args.args[2]) == 4
+
+    def test_set_totals_folds_shards_into_the_base_record_in_one_transaction(self):
+        self.dynamodb.batch_get_items.return_value = [
+            ProgressCounterShard(job_id="historical_collection#shard#1", completed_items=3,
+                                 remaining_items=-3),
+        ]
+        self.dynamodb.transact_update_items.return_value = {}
+
+        self.counter.set_totals(10, 6, 4)
+
+        updates = self.dynamodb.transact_update_items.call_args.args[1]
+        assert len(updates) == 5
+        assert updates[0].expression_attrib_values == {
+            ":total": 10, ":completed": 3, ":remaining": 7
+        }
+        # shard rows are rewritten unchanged, guarded on the values read
+        assert updates[2].expression_attrib_values == {":done": 3, ":remaining": -3}
+        assert all(update.condition_expression is not None for update in updates[1:])
+        assert self.dynamodb.transact_update_items.call_args.kwargs["max_attempts"] == 1
+        self.dynamodb.update_item.assert_not_called()
+
+    @patch("src.openweather_pipeline.progress_counters.time.sleep")
+    def test_set_totals_rereads_shards_after_a_concurrent_add(self, mock_sleep):
+        self.dynamodb.batch_get_items.side_effect = [
+            [],
+            [ProgressCounterShard(job_id="historical_collection#shard#0", completed_items=1,
+                                  remaining_items=-1)],
+        ]
+        self.dynamodb.transact_update_items.side_effect = [{1: "ConditionalCheckFailed"}, {}]
+
+        self.counter.set_totals(10, 6, 4)
+
+        updates = self.dynamodb.transact_update_items.call_args.args[1]
+        assert updates[0].expression_attrib_values == {
+            ":total": 10, ":completed": 5, ":remaining": 5
+        }
@@ -0,0 +1,71 @@
+from unittest.mock import Mock
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from boto3.dynamodb.conditions import ConditionExpressionBuilder
+from botocore.exceptions import ClientError
+from src.openweather_pipeline.models.collection_models import CollectionQueueItem
+from src.openweather_pipeline.queue_leases import QueueLeaseManager
+
+
+def queue_item(zip_code):
+    return CollectionQueueItem(
+        item_id=f"{zip_code}#US#2024-01-01", zip_code=zip_code, country_code="US", date="2024-01-01"
+    )
+
+
+class TestQueueLeaseManager:
+
+    def test_items_claimed_elsewhere_are_dropped(self):
+        dynamodb = Mock()
+
+        def update_item(**kwargs):
+            if kwargs["key"]["item_id"].startswith("10002"):
+                raise ClientError(
+                    {"Error": {"Code": "ConditionalCheckFailedException", "Message": "taken"}},
+                    "UpdateItem",
+                )
+            return True
+
+        dynamodb.update_item.side_effect = update_item
+        lease_manager = QueueLeaseManager(dynamodb, "queue", lease_seconds=60, max_workers=2)
+
+        claimed = lease_manager.claim([queue_item("10001"), queue_item("10002")], "worker-1")
+
+        assert [item.item_id for item in claimed] == ["10001#US#2024-01-01"]
+        assert claimed[0].status == "in_progress"
+        assert claimed[0].worker_id == "worker-1"
+        assert claimed[0].lease_expires_at is not None
+
+    def test_expired_leases_fill_up_to_the_limit(self):
+        dynamodb = Mock()
+        dynamodb.iter_query.side_effect = [iter([queue_item("10001")]), iter([queue_item("10002")])]
+        lease_manager = QueueLeaseManager(dynamodb, "queue")
+
+        items = lease_manager.claimable_items(2)
+
+        assert len(items) == 2
+        expired_query = dynamodb.iter_query.call_args_list[1]
+        assert expired_query.kwargs["limit"] == 1
+        assert expired_query.kwargs["FilterExpression"] == "lease_expires_at < :now"
+
+    def test_due_retries_filling_the_limit_skip_the_pending_query(self):
+        dynamodb = Mock()
+        retry_scheduler = Mock()
+        retry_scheduler.due_items.return_value = [queue_item("10001")]
+        lease_manager = QueueLeaseManager(dynamodb, "queue", retry_scheduler=retry_scheduler)
+
+        items = lease_manager.claimable_items(1)
+
+        assert [item.item_id for item in items] == ["10001#US#2024-01-01"]
+        dynamodb.iter_query.assert_not_called()
+
+    def test_failed_items_without_a_retry_time_can_be_claimed(self):
+        dynamodb = Mock()
+        lease_manager = QueueLeaseManager(dynamodb, "queue")
+
+        lease_manager.claim([queue_item("10001")], "worker-1")
+
+        condition = dynamodb.update_item.call_args.kwargs["condition_expression"]
+        expression = ConditionExpressionBuilder().build_expression(condition).condition_expression
+        assert "attribute_not_exists" in expression
@@ -0,0 +1,104 @@
+from datetime import date
+from unittest.mock import Mock
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from src.openweather_pipeline.models.collection_models import (
+    CollectionProgress,
+    ProgressCounterShard,
+    QueueItemKey,
+)
+from src.openweather_pipeline.dynamodb_operations import serialize_items
+from src.openweather_pipeline.queue_seeder import QueueSeeder, iter_queue_items, seed_signature
+
+ZIPCODES = [{"zip_code": "10001", "country_code": "US"}, {"zip_code": "10002", "country_code": "US"}]
+START = date(2024, 1, 1)
+END = date(2024, 1, 2)
+
+
+class TestQueueSeeder:
+
+    def setup_method(self):
+        self.dynamodb = Mock()
+        self.progress_counter = Mock()
+        self.seeder = QueueSeeder(self.dynamodb, "queue", "progress", self.progress_counter)
+
+    def progress(self, signature=None):
+        return CollectionProgress(
+            zipcodes=ZIPCODES[:1], total_items=2, remaining_items=2, status="in_progress",
+            seed_signature=signature,
+        )
+
+    def test_unchanged_configuration_skips_the_scan(self):
+        self.dynamodb.get_item.return_value = self.progress(seed_signature(ZIPCODES, START, END))
+
+        assert self.seeder.seed(ZIPCODES, START, END, 950) == 0
+        self.dynamodb.parallel_scan.assert_not_called()
+
+    def test_only_missing_items_are_written_and_added_to_totals(self):
+        self.dynamodb.get_item.return_value = self.progress()
+        self.dynamodb.parallel_scan.return_value = iter([
+            QueueItemKey(item_id="10001#US#2024-01-01", status="completed"),
+            QueueItemKey(item_id="10001#US#2024-01-02", status="pending"),
+        ])
+
+        self.dynamodb.parallel_put_new_items.return_value = 2
+
+        assert self.seeder.seed(ZIPCODES, START, END, 950) == 2
+
+        written = self.dynamodb.parallel_put_new_items.call_args.args[0]
+        assert [item.item_id for item in written] == ["10002#US#2024-01-01", "10002#US#2024-01-02"]
+        values = self.dynamodb.update_item.call_args.kwargs["expression_attrib_values"]
+        assert values[":added"] == 2
+        assert values[":signature"] == seed_signature(ZIPCODES, START, END)
+
+    def test_items_inserted_by_an_overlapping_seed_are_not_counted_twice(self):
+        self.dynamodb.get_item.return_value = self.progress()
+        self.dynamodb.parallel_scan.return_value = iter([])
+        # the other run won the conditional put for three of the four items
+        self.dynamodb.parallel_put_new_items.return_value = 1
+
+        assert self.seeder.seed(ZIPCODES, START, END, 950) == 1
+
+        values = self.dynamodb.update_item.call_args.kwargs["expression_attrib_values"]
+        assert values[":added"] == 1
+
+    def test_initial_record_is_conditional_and_keeps_shard_counts(self):
+        self.dynamodb.get_item.return_value = None
+        self.dynamodb.parallel_scan.return_value = iter([
+            QueueItemKey(item_id="10001#US#2024-01-01", status="completed"),
+            QueueItemKey(item_id="10001#US#2024-01-02", status="completed"),
+        ])
+        self.dynamodb.parallel_put_new_items.return_value = 2
+        self.dynamodb.put_item.return_value = True
+        self.progress_counter.shards.return_value = [
+            ProgressCounterShard(job_id="historical_collection#shard#0", completed_items=1,
+                                 remaining_items=-1),
+        ]
+
+        assert self.seeder.seed(ZIPCODES, START, END, 950) == 2
+
+        record = self.dynamodb.put_item.call_args.args[0]
+        assert (record.total_items, record.completed_items, record.remaining_items) == (4, 1, 3)
+        assert self.dynamodb.put_item.call_args.kwargs["condition_expression"] is not None
+        self.dynamodb.update_item.assert_not_called()
+
+    def test_lost_initial_insert_falls_back_to_adding_to_totals(self):
+        self.dynamodb.get_item.return_value = None
+        self.dynamodb.parallel_scan.return_value = iter([])
+        self.dynamodb.parallel_put_new_items.return_value = 3
+        self.dynamodb.put_item.return_value = False
+        self.progress_counter.shards.return_value = []
+
+        assert self.seeder.seed(ZIPCODES, START, END, 950) == 3
+
+        values = self.dynamodb.update_item.call_args.kwargs["expression_attrib_values"]
+        assert values[":added"] == 3
+
+    def test_seeded_items_leave_index_keys_unset(self):
+        rows = serialize_items(list(iter_queue_items(ZIPCODES, START, END)))
+
+        assert len(rows) == 4
+        assert all("next_attempt_at" not in row for row in rows)
+        assert all("lease_expires_at" not in row for row in rows)
+        assert rows[0]["status"] == "pending"
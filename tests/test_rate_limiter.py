@@ -0,0 +1,117 @@
+from datetime import datetime
+from unittest.mock import patch
+import operator
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import pytest
+from botocore.exceptions import ClientError
+from src.openweather_pipeline.rate_limiter import QuotaExceededError, QuotaLedger
+
+COMPARISONS = {
+    "=": operator.eq, "<>": operator.ne, "<": operator.lt, "<=": operator.le, ">=": operator.ge
+}
+
+
+def holds(condition, row):
+    expression = condition.get_expression()
+    name, values = expression["operator"], expression["values"]
+    if name == "AND":
+        return all(holds(value, row) for value in values)
+    if name == "OR":
+        return any(holds(value, row) for value in values)
+    attribute = values[0].name
+    if name == "attribute_exists":
+        return attribute in row
+    if name == "attribute_not_exists":
+        return attribute not in row
+    return attribute in row and COMPARISONS[name](row[attribute], values[1])
+
+
+class FakeProgressTable:
+    # the progress record as a dict, with the conditional updates the ledger sends applied
+    # the way DynamoDB would
+
+    def __init__(self, **row):
+        self.row = {"job_id": "historical_collection", **row}
+        self.updates = 0
+
+    def update_item(self, table_nm, key, update_expression, expression_attrib_values,
+                    condition_expression=None):
+        if condition_expression is not None and not holds(condition_expression, self.row):
+            raise ClientError(
+                {"Error": {"Code": "ConditionalCheckFailedException", "Message": "failed"}},
+                "UpdateItem",
+            )
+        for assignment in update_expression.removeprefix("SET ").split(", "):
+            attribute, value = assignment.split(" = ")
+            terms = value.split(" ")
+            result = expression_attrib_values[terms[-1]]
+            if len(terms) == 3:
+                result = self.row[terms[0]] + (result if terms[1] == "+" else -result)
+            self.row[attribute] = result
+        self.updates += 1
+        return True
+
+    def get_item(self, model, table_nm, key):
+        return model(zipcodes=[], total_items=0, remaining_items=0, status="in_progress",
+                     **self.row)
+
+
+class TestQuotaLedger:
+
+    def setup_method(self):
+        self.now = patch("src.openweather_pipeline.rate_limiter.datetime").start()
+        self.today(2)
+
+    def teardown_method(self):
+        patch.stopall()
+
+    def today(self, day):
+        self.now.now.return_value = datetime(2024, 1, day)
+
+    def test_first_reservation_of_a_day_restarts_the_count(self):
+        table = FakeProgressTable(last_run="2024-01-01", daily_calls_used=900)
+        ledger = QuotaLedger(table, "progress", daily_limit=950, block_size=20)
+
+        for _ in range(20):
+            ledger.reserve()
+
+        assert table.row["last_run"] == "2024-01-02"
+        assert table.row["daily_calls_used"] == 20
+        assert table.updates == 1
+
+    def test_block_shrinks_near_the_daily_limit_then_quota_is_exceeded(self):
+        table = FakeProgressTable(last_run="2024-01-02", daily_calls_used=40)
+        ledger = QuotaLedger(table, "progress", daily_limit=50, block_size=20)
+
+        for _ in range(10):
+            ledger.reserve()
+        assert table.row["daily_calls_used"] == 50
+
+        with pytest.raises(QuotaExceededError):
+            ledger.reserve()
+        assert table.row["daily_calls_used"] == 50
+
+    def test_unused_calls_are_released_on_the_day_they_were_reserved(self):
+        table = FakeProgressTable(last_run="2024-01-02", daily_calls_used=0)
+        ledger = QuotaLedger(table, "progress", daily_limit=950, block_size=20)
+        ledger.reserve()
+
+        ledger.release()
+
+        assert table.row["daily_calls_used"] == 1
+
+    def test_release_after_the_day_changed_leaves_the_new_day_alone(self):
+        table = FakeProgressTable(last_run="2024-01-02", daily_calls_used=0)
+        ledger = QuotaLedger(table, "progress", daily_limit=950, block_size=20)
+        ledger.reserve()
+        # another collector starts the next day's count before this one releases
+        self.today(3)
+        QuotaLedger(table, "progress", daily_limit=950, block_size=5).reserve()
+
+        ledger.release()
+
+        assert table.row == {
+            "job_id": "historical_collection", "last_run": "2024-01-03", "daily_calls_used": 5
+        }
@@ -0,0 +1,70 @@
+from datetime import date
+from unittest.mock import Mock
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from src.openweather_pipeline.coverage_index import CoverageIndex
+from src.openweather_pipeline.models.collection_models import QueueItemKey
+from src.openweather_pipeline.reconciliation import QueueReconciler, item_id_from_key
+from src.openweather_pipeline.s3_keys import build_raw_object_key
+
+
+class TestQueueReconciler:
+
+    def setup_method(self):
+        self.s3 = Mock()
+        self.dynamodb = Mock()
+        self.progress_counter = Mock()
+        self.reconciler = QueueReconciler(
+            self.s3, self.dynamodb, "queue", "progress", self.progress_counter
+        )
+        keys = [
+            build_raw_object_key("openweather_api", "US", "10001", "2024-01-01"),
+            build_raw_object_key("openweather_api", "US", "10001", "2024-01-02"),
+            build_raw_object_key("openweather_api", "US", "10002", "2024-01-01"),
+            "openweather_api/year=2024/month=01/day=03/zip_code=10002/0b1c2d.json",
+        ]
+        self.s3.iter_objects_parallel.return_value = [Mock(key=key) for key in keys]
+        self.dynamodb.parallel_scan.return_value = iter([
+            QueueItemKey(item_id="10001#US#2024-01-01", status="completed"),
+            QueueItemKey(item_id="10001#US#2024-01-02", status="pending"),
+            QueueItemKey(item_id="10002#US#2024-01-01", status="failed"),
+            QueueItemKey(item_id="10002#US#2024-01-03", status="in_progress"),
+            QueueItemKey(item_id="10002#US#2024-01-04", status="pending"),
+        ])
+        self.dynamodb.transact_update_items.return_value = {}
+
+    def test_item_id_from_legacy_key_defaults_country(self):
+        key = "openweather_api/year=2024/month=01/day=03/zip_code=10002/0b1c2d.json"
+
+        assert item_id_from_key(key) == "10002#US#2024-01-03"
+
+    def test_only_changed_items_are_written_and_counters_set_once(self):
+        summary = self.reconciler.reconcile("openweather_api")
+
+        updates = self.dynamodb.transact_update_items.call_args.args[1]
+        assert [update.key["item_id"] for update in updates] == [
+            "10001#US#2024-01-02",
+            "10002#US#2024-01-01",
+            "10002#US#2024-01-03",
+        ]
+        assert summary.completed_items == 4
+        assert summary.remaining_items == 1
+        self.progress_counter.set_totals.assert_called_once_with(5, 4, 1)
+
+    def test_dry_run_writes_nothing(self):
+        summary = self.reconciler.reconcile("openweather_api", dry_run=True)
+
+        assert summary.to_complete == 3
+        self.dynamodb.transact_update_items.assert_not_called()
+        self.progress_counter.set_totals.assert_not_called()
+
+    def test_coverage_index_replaces_the_s3_listing(self):
+        index = CoverageIndex(date(2024, 1, 1), date(2024, 1, 4))
+        index.update_from_keys(obj.key for obj in self.s3.iter_objects_parallel.return_value)
+
+        summary = self.reconciler.reconcile("openweather_api", coverage_index=index)
+
+        self.s3.iter_objects_parallel.assert_not_called()
+        assert summary.stored_days == 4
+        assert summary.to_complete == 3
@@ -0,0 +1,78 @@
+from datetime import datetime
+from unittest.mock import Mock
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import requests
+from botocore.exceptions import ClientError
+from openweather_pipeline.http_transport import CircuitBreaker, CircuitOpenError
+from src.openweather_pipeline.retry_scheduler import RetryScheduler, classify_failure
+
+
+def http_error(status_code):
+    response = Mock(status_code=status_code)
+    return requests.exceptions.HTTPError(f"{status_code} error", response=response)
+
+
+def condition_failed():
+    return ClientError(
+        {"Error": {"Code": "ConditionalCheckFailedException", "Message": "failed"}}, "UpdateItem"
+    )
+
+
+class TestRetryScheduler:
+
+    def test_failures_are_classified(self):
+        assert classify_failure(http_error(429)) == "rate_limited"
+        assert classify_failure(http_error(503)) == "transient"
+        assert classify_failure(requests.exceptions.Timeout()) == "transient"
+        assert classify_failure(ValueError("date mismatch")) == "data"
+
+    def test_rejected_api_key_spends_attempts(self):
+        breaker = CircuitBreaker()
+        breaker.trip("API key rejected", cause="auth")
+        try:
+            breaker.check()
+        except CircuitOpenError as e:
+            auth_error = e
+        dynamodb = Mock()
+        scheduler = RetryScheduler(dynamodb, "queue", max_attempts=3)
+
+        assert classify_failure(http_error(401)) == "auth"
+        assert classify_failure(auth_error) == "auth"
+        assert classify_failure(CircuitOpenError("quota exhausted")) == "rate_limited"
+        assert scheduler.record_failure("10001#US#2024-01-01", auth_error, 0) == "failed"
+        values = dynamodb.update_item.call_args.kwargs["expression_attrib_values"]
+        assert values[":inc"] == 1
+        assert values[":class"] == "auth"
+
+    def test_backoff_doubles_per_attempt_up_to_the_cap(self):
+        scheduler = RetryScheduler(Mock(), "queue", backoff_seconds={"transient": 60},
+                                   backoff_max_seconds=200)
+        now = datetime(2024, 1, 1)
+
+        assert scheduler.next_attempt_at("transient", 0, now) == "2024-01-01T00:01:00"
+        assert scheduler.next_attempt_at("transient", 1, now) == "2024-01-01T00:02:00"
+        assert scheduler.next_attempt_at("transient", 5, now) == "2024-01-01T00:03:20"
+
+    def test_item_is_dead_lettered_when_attempts_are_used_up(self):
+        dynamodb = Mock()
+        dynamodb.update_item.side_effect = [condition_failed(), True]
+        scheduler = RetryScheduler(dynamodb, "queue", max_attempts=3)
+
+        assert scheduler.record_failure("10001#US#2024-01-01", ValueError("bad payload"), 2) == (
+            "dead_letter"
+        )
+        values = dynamodb.update_item.call_args.kwargs["expression_attrib_values"]
+        assert values[":dead_letter"] == "dead_letter"
+
+    def test_failures_recorded_before_scheduling_are_due(self):
+        dynamodb = Mock()
+        dynamodb.iter_query.side_effect = [iter(["scheduled"]), iter(["legacy"])]
+        scheduler = RetryScheduler(dynamodb, "queue")
+
+        assert scheduler.due_items(3) == ["scheduled", "legacy"]
+        legacy_query = dynamodb.iter_query.call_args_list[1]
+        assert legacy_query.kwargs["index_name"] == "status-date-index"
+        assert legacy_query.kwargs["limit"] == 2
+        assert legacy_query.kwargs["FilterExpression"] == "attribute_not_exists(next_attempt_at)"
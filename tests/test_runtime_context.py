@@ -0,0 +1,79 @@
+from unittest.mock import Mock, patch
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from botocore.exceptions import ClientError
+from src.openweather_pipeline.runtime_context import RuntimeContext, is_stale_client_error
+
+
+def client_error(code):
+    return ClientError({"Error": {"Code": code, "Message": code}}, "GetObject")
+
+
+class TestRuntimeContext:
+
+    def setup_method(self):
+        RuntimeContext._collector = None
+        RuntimeContext._dynamodb = None
+        self.collector_class = patch(
+            "src.openweather_pipeline.runtime_context.WeatherDataCollector",
+            side_effect=lambda: Mock(),
+        ).start()
+        self.get_config = patch("src.openweather_pipeline.runtime_context.get_config").start()
+
+    def teardown_method(self):
+        patch.stopall()
+        RuntimeContext._collector = None
+        RuntimeContext._dynamodb = None
+
+    def test_warm_invocations_reuse_the_collector(self):
+        first = RuntimeContext.get_collector()
+
+        assert RuntimeContext.get_collector() is first
+        assert self.collector_class.call_count == 1
+
+    def test_expired_credentials_in_the_cause_chain_invalidate(self):
+        first = RuntimeContext.get_collector()
+        try:
+            try:
+                raise client_error("ExpiredToken")
+            except ClientError as e:
+                raise ValueError("Could not read key from s3") from e
+        except ValueError as wrapped:
+            error = wrapped
+
+        assert RuntimeContext.invalidate_on_error(error) is True
+
+        self.get_config.return_value.invalidate_api_key.assert_called_once()
+        first.close.assert_called_once()
+        assert RuntimeContext.get_collector() is not first
+        assert self.collector_class.call_count == 2
+
+    def test_other_errors_keep_the_collector(self):
+        first = RuntimeContext.get_collector()
+
+        assert RuntimeContext.invalidate_on_error(client_error("NoSuchKey")) is False
+
+        assert RuntimeContext.get_collector() is first
+        self.get_config.return_value.invalidate_api_key.assert_not_called()
+
+
+class TestIsStaleClientError:
+
+    def test_implicit_context_is_followed(self):
+        try:
+            try:
+                raise client_error("InvalidClientTokenId")
+            except ClientError:
+                raise RuntimeError("batch write failed")
+        except RuntimeError as e:
+            assert is_stale_client_error(e)
+
+    def test_unrelated_chain_is_not_stale(self):
+        try:
+            try:
+                raise client_error("ProvisionedThroughputExceededException")
+            except ClientError as e:
+                raise RuntimeError("batch write failed") from e
+        except RuntimeError as e:
+            assert not is_stale_client_error(e)
@@ -0,0 +1,34 @@
+from datetime import datetime, timezone
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from src.openweather_pipeline.s3_inventory import S3Inventory
+from src.openweather_pipeline.s3_operations import S3ObjectInfo
+
+
+class TestS3Inventory:
+
+    def setup_method(self):
+        modified = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        self.previous = S3Inventory([
+            S3ObjectInfo("raw/a.json", 10, "e1", modified),
+            S3ObjectInfo("raw/b.json", 20, "e2", modified),
+            S3ObjectInfo("raw/c.json", 30, "e3", modified),
+        ])
+        self.current = S3Inventory([
+            S3ObjectInfo("raw/a.json", 10, "e1", modified),
+            S3ObjectInfo("raw/b.json", 25, "e4", modified),
+            S3ObjectInfo("raw/d.json", 40, "e5", modified),
+        ])
+
+    def test_round_trip(self):
+        restored = S3Inventory.from_bytes(self.previous.to_bytes())
+
+        assert restored.objects == self.previous.objects
+
+    def test_diff(self):
+        diff = self.current.diff(self.previous)
+
+        assert [obj.key for obj in diff.added] == ["raw/d.json"]
+        assert [obj.key for obj in diff.changed] == ["raw/b.json"]
+        assert diff.removed == ["raw/c.json"]
@@ -0,0 +1,20 @@
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from src.openweather_pipeline.s3_keys import build_raw_object_key, repartitioned_raw_key
+
+
+class TestRepartitionedRawKey:
+
+    def test_legacy_key_gets_country_partition(self):
+        key = "openweather_api/year=2024/month=01/day=03/zip_code=10002/0b1c2d.json"
+
+        assert repartitioned_raw_key(key, "US") == (
+            "openweather_api/year=2024/month=01/day=03/country_code=US/zip_code=10002/0b1c2d.json"
+        )
+
+    def test_current_layout_maps_to_itself(self):
+        key = build_raw_object_key("openweather_api", "CA", "H2X", "2024-01-03")
+
+        assert repartitioned_raw_key(key, "US") == key
+        assert repartitioned_raw_key("openweather_api/control/state.json") is None
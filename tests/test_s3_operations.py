@@ -0,0 +1,306 @@
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+import hashlib
+import time
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import pytest
+from botocore.exceptions import ClientError
+from src.openweather_pipeline.models.dataset_models import RepartitionCheckpoint
+from src.openweather_pipeline.s3_operations import S3Operations
+
+CHECKPOINT_KEY = "control/repartition_checkpoint.json"
+
+
+class StubS3Client:
+    # the handful of S3 calls repartition_objects makes, over a dict per bucket; events
+    # records checkpoint saves and deletes in the order they happen
+
+    def __init__(self):
+        self.buckets = {"legacy": {}, "store": {}}
+        self.events = []
+        self.fail_copy = set()
+        self.wrong_size = set()
+
+    def put(self, bucket, key, body):
+        self.buckets[bucket][key] = body
+
+    def head_bucket(self, Bucket):
+        pass
+
+    def get_paginator(self, name):
+        paginator = MagicMock()
+        paginator.paginate.side_effect = lambda Bucket, Prefix, StartAfter="": [{
+            "Contents": [
+                {
+                    "Key": key,
+                    "Size": len(body),
+                    "ETag": f'"{hashlib.md5(body).hexdigest()}"',
+                    "LastModified": datetime(2024, 1, 1, tzinfo=timezone.utc),
+                }
+                for key, body in sorted(self.buckets[Bucket].items())
+                if key.startswith(Prefix) and key > StartAfter
+            ]
+        }]
+        return paginator
+
+    def copy_object(self, CopySource, Bucket, Key):
+        if CopySource["Key"] in self.fail_copy:
+            raise ClientError({"Error": {"Code": "InternalError"}}, "CopyObject")
+        self.buckets[Bucket][Key] = self.buckets[CopySource["Bucket"]][CopySource["Key"]]
+
+    def head_object(self, Bucket, Key):
+        body = self.buckets[Bucket][Key]
+        size = len(body) + 1 if Key in self.wrong_size else len(body)
+        return {"ContentLength": size, "ETag": f'"{hashlib.md5(body).hexdigest()}"'}
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.buckets[Bucket]:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        body = MagicMock()
+        body.read.return_value = self.buckets[Bucket][Key]
+        return {"Body": body}
+
+    def put_object(self, Bucket, Key, Body, ContentType):
+        if Key == CHECKPOINT_KEY:
+            checkpoint = RepartitionCheckpoint.model_validate_json(Body)
+            self.events.append(("checkpoint", checkpoint.last_key, checkpoint.pending_deletes))
+        self.buckets[Bucket][Key] = Body
+
+    def delete_objects(self, Bucket, Delete):
+        keys = [obj["Key"] for obj in Delete["Objects"]]
+        self.events.append(("delete", keys))
+        for key in keys:
+            del self.buckets[Bucket][key]
+        return {}
+
+
+class TestRepartitionObjects:
+
+    def setup_method(self):
+        self.client = StubS3Client()
+        with patch("src.openweather_pipeline.s3_operations.boto3.client", return_value=self.client):
+            self.s3 = S3Operations("legacy", "us-east-1")
+        self.sources = [f"flat/{day}.json" for day in ("01", "02", "03", "04")]
+        for key in self.sources:
+            self.client.put("legacy", key, f"payload {key}".encode())
+
+    def repartition(self, **kwargs):
+        return self.s3.repartition_objects(
+            "flat",
+            lambda key: key.replace("flat/", "day="),
+            destination_bucket="store",
+            checkpoint_key=CHECKPOINT_KEY,
+            max_workers=1,
+            checkpoint_interval=1,
+            **kwargs,
+        )
+
+    def test_interrupted_run_resumes_after_the_checkpoint(self):
+        self.client.fail_copy = {self.sources[2]}
+        with pytest.raises(ClientError):
+            self.repartition()
+        assert self.client.events[-1][1] == self.sources[1]
+
+        self.client.fail_copy = set()
+        copied = []
+        copy_object = self.client.copy_object
+        self.client.copy_object = lambda **kwargs: copied.append(kwargs["Key"]) or copy_object(
+            **kwargs
+        )
+        checkpoint = self.repartition()
+
+        assert copied == ["day=03.json", "day=04.json"]
+        assert checkpoint.completed and checkpoint.copied == 4
+        assert sorted(self.client.buckets["store"]) == [
+            CHECKPOINT_KEY, "day=01.json", "day=02.json", "day=03.json", "day=04.json"
+        ]
+
+    def test_failed_verification_stops_before_the_copy_is_recorded_or_deleted(self):
+        self.client.wrong_size = {"day=02.json"}
+
+        with pytest.raises(ValueError, match="does not match the source"):
+            self.repartition(delete_source=True)
+
+        assert self.client.events[-1][1] == self.sources[0]
+        assert self.sources[1] in self.client.buckets["legacy"]
+        deleted = [key for event in self.client.events if event[0] == "delete" for key in event[1]]
+        assert deleted == [self.sources[0]]
+
+    def test_sources_are_deleted_only_after_a_checkpoint_records_them(self):
+        checkpoint = self.repartition(delete_source=True)
+
+        recorded = set()
+        for event in self.client.events:
+            if event[0] == "checkpoint":
+                recorded.update(event[2])
+            else:
+                assert set(event[1]) <= recorded
+        assert checkpoint.deleted == 4 and checkpoint.pending_deletes == []
+        assert not any(key.startswith("flat/") for key in self.client.buckets["legacy"])
+
+    def test_deletes_left_by_an_interrupted_run_are_done_on_resume(self):
+        saved = RepartitionCheckpoint(
+            source_bucket="legacy",
+            source_prefix="flat",
+            destination_bucket="store",
+            last_key=self.sources[3],
+            pending_deletes=self.sources[:2],
+            completed=True,
+        )
+        self.client.put("store", CHECKPOINT_KEY, saved.model_dump_json().encode())
+
+        checkpoint = self.repartition(delete_source=True)
+
+        assert self.client.events[0] == ("delete", self.sources[:2])
+        assert checkpoint.deleted == 2 and checkpoint.copied == 0
+        assert sorted(self.client.buckets["legacy"]) == self.sources[2:]
+
+    def test_cross_bucket_copy_to_the_same_key_deletes_the_source(self):
+        checkpoint = self.s3.repartition_objects(
+            "flat",
+            lambda key: key,
+            destination_bucket="store",
+            checkpoint_key=CHECKPOINT_KEY,
+            max_workers=1,
+            delete_source=True,
+        )
+
+        assert checkpoint.copied == 4 and checkpoint.deleted == 4
+        assert not any(key.startswith("flat/") for key in self.client.buckets["legacy"])
+        assert all(key in self.client.buckets["store"] for key in self.sources)
+
+
+class TestStoreObject:
+
+    def setup_method(self):
+        self.client = MagicMock()
+        with patch("src.openweather_pipeline.s3_operations.boto3.client", return_value=self.client):
+            self.s3 = S3Operations("store", "us-east-1")
+
+    def test_existing_key_on_a_conditional_put_returns_the_key(self):
+        self.client.put_object.side_effect = ClientError(
+            {"Error": {"Code": "PreconditionFailed", "Message": "exists"}}, "PutObject"
+        )
+
+        key = self.s3.store_object_in_s3("raw/day.json", b"{}", if_none_match=True)
+
+        assert key == "raw/day.json"
+        assert self.client.put_object.call_args.kwargs["IfNoneMatch"] == "*"
+
+    def test_precondition_failure_without_if_none_match_raises(self):
+        self.client.put_object.side_effect = ClientError(
+            {"Error": {"Code": "PreconditionFailed", "Message": "exists"}}, "PutObject"
+        )
+
+        with pytest.raises(ValueError, match="PreconditionFailed"):
+            self.s3.store_object_in_s3("raw/day.json", b"{}")
+
+
+class ListingS3Client:
+    # list_objects_v2 over a sorted key list, two keys per page, with delimiter support;
+    # listings of a prefix in failing raise
+
+    def __init__(self, keys):
+        self.keys = sorted(keys)
+        self.failing = set()
+
+    def head_bucket(self, Bucket):
+        pass
+
+    def get_paginator(self, name):
+        paginator = MagicMock()
+        paginator.paginate.side_effect = self.paginate
+        return paginator
+
+    def paginate(self, Bucket, Prefix, Delimiter=None):
+        if Prefix in self.failing:
+            raise ClientError({"Error": {"Code": "InternalError"}}, "ListObjectsV2")
+        contents, prefixes = [], []
+        for key in self.keys:
+            if not key.startswith(Prefix):
+                continue
+            rest = key[len(Prefix):]
+            if Delimiter and Delimiter in rest:
+                common = Prefix + rest.split(Delimiter)[0] + Delimiter
+                if common not in prefixes:
+                    prefixes.append(common)
+                continue
+            contents.append({
+                "Key": key,
+                "Size": 2,
+                "ETag": '"etag"',
+                "LastModified": datetime(2024, 1, 1, tzinfo=timezone.utc),
+            })
+        pages = [{"Contents": contents[start:start + 2]} for start in range(0, len(contents), 2)]
+        return pages + [{"CommonPrefixes": [{"Prefix": prefix} for prefix in prefixes]}]
+
+
+class TestParallelListing:
+
+    def setup_method(self):
+        self.keys = [
+            "raw/_manifest.json",
+            "raw/year=2024/stray.json",
+            "raw/year=2024/month=01/day=01/a.json",
+            "raw/year=2024/month=01/day=02/b.json",
+            "raw/year=2024/month=01/day=03/c.json",
+            "raw/year=2024/month=01/day=03/notes.txt",
+            "raw/year=2024/month=02/",
+            "raw/year=2025/month=01/day=01/d.json",
+        ]
+        self.client = ListingS3Client(self.keys)
+        with patch("src.openweather_pipeline.s3_operations.boto3.client", return_value=self.client):
+            self.s3 = S3Operations("store", "us-east-1")
+
+    def test_objects_above_the_expanded_depth_and_empty_months(self):
+        prefixes, shallow = self.s3._expand_prefixes("raw/", 2)
+
+        assert prefixes == [
+            "raw/year=2024/month=01/", "raw/year=2024/month=02/", "raw/year=2025/month=01/"
+        ]
+        assert [info.key for info in shallow] == ["raw/_manifest.json", "raw/year=2024/stray.json"]
+
+        listed = sorted(info.key for info in self.s3.iter_objects_parallel("raw", "json", 2))
+
+        assert listed == sorted(key for key in self.keys if key.endswith(".json"))
+
+    def test_error_in_one_prefix_is_raised_to_the_reader(self):
+        self.client.failing = {"raw/year=2025/month=01/"}
+
+        with pytest.raises(ClientError):
+            list(self.s3.iter_objects_parallel("raw", "json", 2))
+
+
+class TestFetchObjects:
+
+    def setup_method(self):
+        with patch("src.openweather_pipeline.s3_operations.boto3.client",
+                   return_value=MagicMock()):
+            self.s3 = S3Operations("store", "us-east-1")
+        self.keys = [f"raw/{n}.json" for n in range(20)]
+        self.reads = []
+
+        def read_file_as_bytes(key):
+            self.reads.append(key)
+            # reads finish out of key order
+            time.sleep(0.002 * (20 - int(key[4:-5]) % 4))
+            return key.encode()
+
+        self.s3.read_file_as_bytes = read_file_as_bytes
+
+    def test_contents_come_back_in_key_order(self):
+        fetched = list(self.s3.fetch_objects(self.keys, max_workers=4))
+
+        assert [key for key, _ in fetched] == self.keys
+        assert all(content == key.encode() for key, content in fetched)
+
+    def test_closing_early_stops_submitting_reads(self):
+        fetched = self.s3.fetch_objects(self.keys, max_workers=2)
+
+        assert next(fetched) == (self.keys[0], self.keys[0].encode())
+        fetched.close()
+
+        # the window holds at most 2 * max_workers reads
+        assert len(self.reads) <= 4
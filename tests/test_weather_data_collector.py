@@ -0,0 +1,129 @@
+from unittest.mock import Mock
+import sys
+import threading
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import pytest
+from src.openweather_pipeline.http_transport import CircuitBreaker
+from src.openweather_pipeline.weather_data_collector import WeatherDataCollector
+
+
+class Interrupted(BaseException):
+    pass
+
+
+def queue_item(day):
+    return {
+        "item_id": f"10001#US#2024-01-{day}",
+        "zip_code": "10001",
+        "country_code": "US",
+        "date": f"2024-01-{day}",
+        "status": "in_progress",
+        "retry_count": 0,
+    }
+
+
+class TestCollectBatch:
+
+    def setup_method(self):
+        # the collector is assembled by hand, __init__ reads config and builds AWS clients
+        self.collector = WeatherDataCollector.__new__(WeatherDataCollector)
+        self.collector.max_workers = 1
+        self.collector.control_table_queue = "queue"
+        self.collector.apiManager = Mock()
+        self.collector.apiManager.circuit_breaker = CircuitBreaker()
+        self.collector.collect_weather_data = Mock()
+        self.collector.retryScheduler = Mock()
+        self.collector.dynamodb = Mock()
+        self.collector.dynamodb.transact_update_items.return_value = {}
+        self.collector.progressCounter = Mock()
+        self.items = [queue_item(day) for day in ("01", "02", "03")]
+
+    def test_completions_are_written_with_one_progress_add(self):
+        results = self.collector.collect_batch(self.items)
+
+        assert [result.status for result in results] == ["completed"] * 3
+        self.collector.dynamodb.transact_update_items.assert_called_once()
+        self.collector.progressCounter.add.assert_called_once_with(3)
+        self.collector.apiManager.release_quota.assert_called_once()
+
+    def test_open_circuit_breaker_skips_the_rest_of_the_batch(self):
+        def collect(zip_code, country_code, date, item_id, update_status):
+            self.collector.apiManager.circuit_breaker.trip("HTTP 429")
+            raise RuntimeError("HTTP 429")
+
+        self.collector.collect_weather_data.side_effect = collect
+
+        results = self.collector.collect_batch(self.items)
+
+        assert [result.status for result in results] == ["failed", "skipped", "skipped"]
+        assert self.collector.collect_weather_data.call_count == 1
+        self.collector.progressCounter.add.assert_not_called()
+
+    def test_quota_is_released_when_the_pool_raises(self):
+        self.collector.collect_weather_data.side_effect = Interrupted()
+
+        with pytest.raises(Interrupted):
+            self.collector.collect_batch(self.items)
+
+        self.collector.apiManager.release_quota.assert_called_once()
+
+    def test_warm_batches_reuse_the_worker_threads(self):
+        threads = []
+        self.collector.collect_weather_data.side_effect = (
+            lambda *args, **kwargs: threads.append(threading.get_ident())
+        )
+
+        self.collector.collect_batch(self.items)
+        self.collector.collect_batch(self.items)
+
+        assert len(threads) == 6 and len(set(threads)) == 1
+        self.collector.close()
+
+    def test_on_error_runs_once_after_the_pool_drains(self):
+        self.collector.collect_weather_data.side_effect = [
+            RuntimeError("ExpiredToken"), None, RuntimeError("ExpiredToken")
+        ]
+        calls_seen = []
+
+        def on_error(error):
+            calls_seen.append(self.collector.collect_weather_data.call_count)
+            return True
+
+        results = self.collector.collect_batch(self.items, on_error=on_error)
+
+        assert [result.status for result in results] == ["failed", "completed", "failed"]
+        assert calls_seen == [3]
+
+    def test_failed_progress_add_keeps_the_completed_results(self):
+        self.collector.progressCounter.add.side_effect = RuntimeError("throttled")
+
+        results = self.collector.collect_batch(self.items)
+
+        assert [result.status for result in results] == ["completed"] * 3
+        self.collector.progressCounter.add.assert_called_once_with(3)
+
+
+class TestCollectWeatherData:
+
+    def setup_method(self):
+        self.collector = WeatherDataCollector.__new__(WeatherDataCollector)
+        self.collector.prefix = "openweather_api"
+        self.collector.control_table_queue = "queue"
+        self.collector.control_table_progress = "progress"
+        self.collector.apiManager = Mock()
+        self.collector.s3Operations = Mock()
+        self.collector.dynamodb = Mock()
+        self.collector.progressCounter = Mock()
+        self.collector.retryScheduler = Mock()
+
+    def test_stored_day_completes_without_an_api_call(self):
+        self.collector.s3Operations.object_exists.return_value = True
+
+        self.collector.collect_weather_data("10001", "US", "2024-01-01", "10001#US#2024-01-01")
+
+        self.collector.apiManager.API_get.assert_not_called()
+        self.collector.s3Operations.store_object_in_s3.assert_not_called()
+        key = self.collector.dynamodb.update_item.call_args.kwargs["key"]
+        assert key == {"item_id": "10001#US#2024-01-01"}
+        self.collector.progressCounter.add.assert_called_once_with(1)
@@ -0,0 +1,78 @@
+from datetime import date
+import json
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from src.openweather_pipeline.weather_schema import (
+    DAILY_WEATHER_SCHEMA,
+    extract_raw_date,
+    flatten_day_summaries,
+)
+
+
+def day_summary(day):
+    return {
+        "lat": 40.75,
+        "lon": -73.99,
+        "tz": "-05:00",
+        "date": day,
+        "units": "imperial",
+        "cloud_cover": {"afternoon": 20},
+        "humidity": {"afternoon": 60},
+        "precipitation": {"total": 0.1},
+        "pressure": {"afternoon": 1015},
+        "temperature": {"min": 30, "max": 50, "afternoon": 45, "night": 35},
+        "wind": {"max": {"speed": 10.5, "direction": 270}},
+    }
+
+
+class TestFlattenDaySummaries:
+
+    def test_flattens_nested_fields_into_schema(self):
+        table = flatten_day_summaries(
+            [day_summary("2024-01-01"), day_summary("2024-01-02")],
+            zip_codes=["10001", "10001"],
+            country_codes=["US", "US"],
+        )
+
+        assert table.schema == DAILY_WEATHER_SCHEMA
+        row = table.to_pylist()[0]
+        assert row["date"] == date(2024, 1, 1)
+        assert row["temperature_max"] == 50
+        assert row["wind_direction"] == 270
+        assert row["zip_code"] == "10001"
+
+    def test_missing_fields_are_null(self):
+        payload = day_summary("2024-01-01")
+        del payload["wind"]
+        payload["temperature"] = None
+
+        row = flatten_day_summaries([payload]).to_pylist()[0]
+
+        assert row["wind_speed"] is None
+        assert row["temperature_min"] is None
+        assert row["temperature_morning"] is None
+        assert row["country_code"] is None
+
+
+class TestExtractRawDate:
+
+    def test_reads_date_without_parsing(self):
+        body = json.dumps(day_summary("2024-01-01")).encode()
+
+        assert extract_raw_date(body, lambda content: pytest.fail("body was parsed")) == "2024-01-01"
+
+    def test_repeated_date_falls_back_to_full_parse(self):
+        payload = day_summary("2024-01-01")
+        payload["alerts"] = [{"date": "2023-12-31"}]
+
+        assert extract_raw_date(json.dumps(payload).encode(), json.loads) == "2024-01-01"
+
+    def test_rejects_truncated_or_incomplete_bodies(self):
+        body = json.dumps(day_summary("2024-01-01")).encode()
+
+        with pytest.raises(ValueError, match="Expected a JSON object"):
+            extract_raw_date(body[:-5], json.loads)
+        with pytest.raises(ValueError, match="missing"):
+            extract_raw_date(b'{"date": "2024-01-01"}', json.loads)